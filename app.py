@@ -1,26 +1,42 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, send_from_directory, send_file, redirect, url_for, flash, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 import os
 import json
 import shutil
 import tempfile
 import zipfile
-from werkzeug.utils import secure_filename
-import subprocess
+from werkzeug.utils import secure_filename, safe_join
 import threading
 import time
 import uuid
 import glob
+import mimetypes
 import pandas as pd
 import math
 import numpy as np
-import base64
-import queue
-import re
-from datetime import datetime
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from werkzeug.http import is_resource_modified
+import pyarrow as pa
 import auth
-
-app = Flask(__name__)
+import compression
+from metadata_store import MetadataStore
+from job_store import JobStore
+from pipeline_worker import PipelinePool
+from plot_worker import PlotRenderer
+from upload_store import UploadStore, UploadError
+from storage_manager import StorageManager
+from job_scheduler import JobScheduler, QuotaExceeded, PRIORITIES
+from capgenie.store import result_store
+from capgenie.spreadsheet import spreadsheet
+from capgenie.bubble import bubble_data, BUBBLE_PEPTIDES
+from capgenie.curves import rank_abundance, CURVE_POINTS
+from capgenie import plots
+
+# /static is served by static_files, which adds the cache headers
+app = Flask(__name__, static_folder=None)
+STATIC_FOLDER = os.path.join(app.root_path, 'static')
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['DATASETS_FOLDER'] = 'datasets'
@@ -42,26 +58,431 @@ def load_user(user_id):
 # Ensure directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['DATASETS_FOLDER'], exist_ok=True)
+
+# Chunked, resumable uploads are staged here until they are complete
+upload_store = UploadStore(os.path.join(app.config['UPLOAD_FOLDER'], 'chunked'))
 os.makedirs('misc', exist_ok=True)  # For CSV files used in barcode evaluation
 
 # Use a Linux-compatible cache path for production
 CACHE_ROOT = os.path.expanduser('~/.cache/capgenie')
 
-# Global variable to store processing status and output
-processing_status = {}
-processing_output = {}  # Store real-time output for each dataset
+# Dataset metadata (owner, status, files, ...) indexed in SQLite; datasets
+# created before the store existed are imported from misc/datasets/
+metadata_store = MetadataStore(os.path.join('misc', 'datasets.sqlite3'))
+metadata_store.import_legacy(os.path.join('misc', 'datasets'))
 
 # Security: Track access attempts to prevent enumeration
-from collections import defaultdict
-access_attempts = defaultdict(list)  # user_id -> [timestamp, ...]
 MAX_FAILED_ATTEMPTS = 10  # Max failed dataset access attempts per hour
 ATTEMPT_WINDOW = 3600  # 1 hour in seconds
 
+# Status and event log of processing jobs, shared by all gunicorn workers.
+# Finished jobs are kept for CAPGENIE_JOB_STATE_TTL seconds.
+job_store = JobStore(os.path.join('misc', 'jobs.sqlite3'),
+                     ttl=int(os.environ.get('CAPGENIE_JOB_STATE_TTL', '3600')),
+                     attempt_window=ATTEMPT_WINDOW)
+
+def update_status(dataset_id, **fields):
+    """Update a job's status and push the new status to its viewers"""
+    return job_store.update_status(dataset_id, **fields)
+
+def report_queue_position(dataset_id, position):
+    """Scheduler callback: show a waiting job where it stands in the queue"""
+    if (job_store.status(dataset_id) or {}).get('status') == 'queued':
+        update_status(dataset_id, queue_position=position, message=f'Queued (position {position})')
+
+def report_abandoned_job(dataset_id):
+    """Scheduler callback: fail a job whose gunicorn worker stopped while running it"""
+    if update_status(dataset_id, status='error', message='Processing stopped unexpectedly, please run it again', progress=0):
+        job_store.close(dataset_id)
+        metadata_store.update(dataset_id, status='error', error='Processing stopped unexpectedly')
+
+# Processing jobs run on a bounded pool shared by all gunicorn workers; each
+# job gets CAPGENIE_JOB_CPUS cores and the number of concurrent jobs defaults
+# to the cores available / that
+job_scheduler = JobScheduler(
+    os.path.join('misc', 'job_queue.sqlite3'),
+    max_workers=int(os.environ.get('CAPGENIE_MAX_JOBS', '0')) or None,
+    cpus_per_job=int(os.environ.get('CAPGENIE_JOB_CPUS', '4')),
+    max_running_per_user=int(os.environ.get('CAPGENIE_USER_RUNNING_JOBS', '1')),
+    max_queued_per_user=int(os.environ.get('CAPGENIE_USER_QUEUED_JOBS', '5')),
+    on_queue_change=report_queue_position,
+    on_abandoned=report_abandoned_job
+)
+
+# Warm processes that run the pipeline, started as this worker claims jobs
+pipeline_pool = PipelinePool(job_scheduler.max_workers)
+
+# Plots are drawn when first viewed, by CAPGENIE_PLOT_WORKERS warm processes,
+# and saved with the dataset until its tables change
+plot_renderer = PlotRenderer(int(os.environ.get('CAPGENIE_PLOT_WORKERS', '1')),
+                             timeout=int(os.environ.get('CAPGENIE_PLOT_TIMEOUT', '120')))
+
+def is_dataset_busy(dataset_id):
+    """Whether a dataset is being uploaded, queued or processed, so its files must stay"""
+    if (job_store.status(dataset_id) or {}).get('status') in ('queued', 'processing'):
+        return True
+    return (metadata_store.get(dataset_id) or {}).get('status') == 'uploading'
+
+# Disk budget of datasets/ and CACHE_ROOT. Over CAPGENIE_STORAGE_BUDGET_GB the
+# least recently used files are evicted: intermediates, then inputs, then datasets.
+STORAGE_CHECK_INTERVAL = int(os.environ.get('CAPGENIE_STORAGE_CHECK_INTERVAL', '600'))
+storage_manager = StorageManager(
+    os.path.join('misc', 'storage.sqlite3'), app.config['DATASETS_FOLDER'], CACHE_ROOT,
+    budget=int(float(os.environ.get('CAPGENIE_STORAGE_BUDGET_GB', '50')) * 1024 ** 3),
+    is_busy=is_dataset_busy,
+    remove_dataset=lambda dataset_id: remove_dataset(dataset_id)
+)
+
+def record_storage(dataset_id):
+    """Record a dataset's new size and evict other data if that went over budget"""
+    try:
+        storage_manager.measure(dataset_id)
+        storage_manager.enforce()
+    except Exception as e:
+        print(f"Could not update storage usage for {dataset_id}: {e}")
+
+def watch_storage():
+    """Re-measure everything (including sessions made outside the app) and enforce the budget"""
+    while True:
+        try:
+            storage_manager.reconcile()
+            storage_manager.enforce()
+        except Exception as e:
+            print(f"Error while enforcing the storage budget: {e}")
+        time.sleep(STORAGE_CHECK_INTERVAL)
+
+threading.Thread(target=watch_storage, daemon=True).start()
+
+# Assembled /api/dataset/<id>/data responses, kept as serialized JSON so the
+# memory bound is exact and cache hits skip both parsing and encoding.
+# Compressed variants are cached next to the plain body.
+PAYLOAD_CACHE_MAX_BYTES = int(os.environ.get('CAPGENIE_PAYLOAD_CACHE_MB', '256')) * 1024 * 1024
+# Bump when the payload layout changes so clients drop revalidated copies
+PAYLOAD_VERSION = 5
+
+class PayloadCache:
+    """Thread-safe LRU of dataset payloads bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # dataset_path -> (fingerprint, {encoding: body})
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, dataset_path, fingerprint, encoding=None):
+        with self.lock:
+            entry = self.entries.get(dataset_path)
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self.entries.move_to_end(dataset_path)
+            return entry[1].get(encoding)
+
+    def put(self, dataset_path, fingerprint, body, encoding=None):
+        with self.lock:
+            entry = self.entries.get(dataset_path)
+            if entry is None or entry[0] != fingerprint:
+                self._remove(dataset_path)
+                entry = self.entries[dataset_path] = (fingerprint, {})
+            self.entries.move_to_end(dataset_path)
+            if encoding in entry[1]:
+                self.size -= len(entry[1][encoding])
+            entry[1][encoding] = body
+            self.size += len(body)
+            while self.size > self.max_bytes and self.entries:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= sum(len(variant) for variant in evicted.values())
+
+    def discard(self, dataset_path):
+        with self.lock:
+            self._remove(dataset_path)
+
+    def _remove(self, dataset_path):
+        entry = self.entries.pop(dataset_path, None)
+        if entry is not None:
+            self.size -= sum(len(variant) for variant in entry[1].values())
+
+payload_cache = PayloadCache(PAYLOAD_CACHE_MAX_BYTES)
+
+# Cache lifetime of files requested with their version (?v=), which change URL when they change
+ASSET_MAX_AGE = 365 * 24 * 3600
+# Cache lifetime of unversioned static files, e.g. fonts and videos linked from CSS
+STATIC_MAX_AGE = int(os.environ.get('CAPGENIE_STATIC_MAX_AGE', '3600'))
+
+def file_version(path):
+    """Short version of a file that changes whenever the file does"""
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+def set_asset_max_age(response, versioned, max_age=STATIC_MAX_AGE):
+    """Cache headers of a file response: immutable for a versioned URL, max_age seconds otherwise"""
+    response.headers.pop('Expires', None)
+    if versioned:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    elif max_age > 0:
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+
 def df_to_json_array(df):
     # Replace all NaN, inf, -inf with None for JSON serialization
     df = df.replace([np.nan, np.inf, -np.inf], None)
     return [df.columns.tolist()] + df.values.tolist()
 
+def list_result_tables(dataset_path):
+    """List the average tables of every data directory in a dataset.
+
+    Reads the session's columnar result store when present and falls back to
+    the spreadsheets folder for datasets processed before the store existed.
+    """
+    store = result_store(dataset_path)
+    directories = store.directories()
+    if directories:
+        return {d: [t for t in store.tables(d) if t.startswith('average_')] for d in directories}
+
+    spreadsheets_dir = os.path.join(dataset_path, 'spreadsheets')
+    if not os.path.exists(spreadsheets_dir):
+        return {}
+    listing = {}
+    for subfolder in os.listdir(spreadsheets_dir):
+        subfolder_path = os.path.join(spreadsheets_dir, subfolder)
+        if os.path.isdir(subfolder_path):
+            listing[subfolder] = [f[:-len('.xlsx')] for f in os.listdir(subfolder_path) if f.startswith('average_') and f.endswith('.xlsx')]
+    return listing
+
+def read_result_table(dataset_path, subfolder, name):
+    """Read one result table with the peptide as its first column"""
+    store = result_store(dataset_path)
+    if store.exists(subfolder, name):
+        df = store.read(subfolder, name)
+        return df.reset_index() if df.index.name else df
+    return pd.read_excel(os.path.join(dataset_path, 'spreadsheets', subfolder, f'{name}.xlsx'))
+
+# Largest window the table API returns in one request
+MAX_TABLE_PAGE_ROWS = 1000
+
+# Most points the curve API returns for one window
+MAX_CURVE_POINTS = 5000
+
+def parse_table_name(subfolder, table):
+    """Turn a subfolder/table pair from a URL into a store table name, or None if it is not one"""
+    # Both parts name entries inside the dataset, never paths out of it
+    if {subfolder, table} & {'.', '..'} or '\\' in subfolder + table:
+        return None
+    name = table
+    for known_extension in spreadsheet.WRITERS:
+        if name.endswith(known_extension):
+            name = name[:-len(known_extension)]
+    return result_store.table_name(name)
+
+def query_result_table(dataset_path, subfolder, name, sort=None, descending=True, offset=0, limit=100, minimums=None, top=None):
+    """Return one sorted, filtered window of a result table.
+
+    Rows are ordered with the store's precomputed sort orders, so a page
+    costs a lookup and a take of `limit` rows however large the table is.
+    minimums maps column names to the smallest value a row may have; top
+    keeps only the first N rows of the sorted, filtered table.
+    """
+    store = result_store(dataset_path)
+    if store.exists(subfolder, name):
+        table = store.read_table(subfolder, name)
+        sort_order = lambda column: store.sort_order(subfolder, name, column, descending)
+    else:
+        # Datasets processed before the result store are sorted in memory
+        table = pa.Table.from_pandas(read_result_table(dataset_path, subfolder, name), preserve_index=False)
+        orders = result_store.sort_orders(table)
+        sort_order = lambda column: orders.column(f"{column}:{'desc' if descending else 'asc'}").to_numpy()
+
+    index_columns = result_store.index_columns(table)
+    columns = index_columns + [c for c in table.column_names if c not in index_columns]
+    sort = sort or columns[-1]
+    for column in [sort] + list(minimums or {}):
+        if column not in columns:
+            raise ValueError(f'Unknown column: {column}')
+
+    order = sort_order(sort)
+    if minimums:
+        keep = np.ones(table.num_rows, dtype=bool)
+        for column, minimum in minimums.items():
+            with np.errstate(invalid='ignore'):
+                keep &= table.column(column).to_numpy(zero_copy_only=False) >= minimum
+        order = order[keep[order]]
+    if top is not None:
+        order = order[:top]
+
+    window = table.take(pa.array(order[offset:offset + limit]))
+    rows = pd.DataFrame({c: window.column(c).to_numpy(zero_copy_only=False) for c in columns})
+    return {
+        'columns': columns,
+        'rows': df_to_json_array(rows)[1:],
+        'total': int(len(order)),
+        'offset': offset,
+        'limit': limit,
+        'sort': sort,
+        'order': 'desc' if descending else 'asc'
+    }
+
+
+def query_result_curve(dataset_path, subfolder, name, column=None, start=0, end=None, points=CURVE_POINTS):
+    """Return a downsampled window of a column's rank-abundance curve.
+
+    Values are taken in the store's precomputed descending order and the
+    window [start, end) of ranks is reduced to at most `points` points with
+    LTTB, so the response has the same size however long the table is.
+    """
+    store = result_store(dataset_path)
+    if store.exists(subfolder, name):
+        table = store.read_table(subfolder, name)
+    else:
+        table = pa.Table.from_pandas(read_result_table(dataset_path, subfolder, name), preserve_index=False)
+    index_columns = result_store.index_columns(table)
+    column = column or [c for c in table.column_names if c not in index_columns][-1]
+    if column not in table.column_names:
+        raise ValueError(f'Unknown column: {column}')
+    if store.exists(subfolder, name):
+        order = store.sort_order(subfolder, name, column, descending=True)
+    else:
+        order = result_store.sort_orders(table.select([column])).column(f'{column}:desc').to_numpy()
+
+    values = table.column(column).to_numpy(zero_copy_only=False)
+    if not np.issubdtype(values.dtype, np.number):
+        raise ValueError(f'Column is not numeric: {column}')
+    values = values[order].astype(np.float64)
+    values = values[:np.count_nonzero(~np.isnan(values))]  # NaN sorts last
+    ranks, values = rank_abundance(values, start, end, points)
+    return {
+        'column': column,
+        'total': int(table.num_rows),
+        'start': int(ranks[0]) if len(ranks) else start,
+        'end': int(ranks[-1]) + 1 if len(ranks) else start,
+        'x': ranks.tolist(),
+        'y': values.tolist()
+    }
+
+def top_value(dataset_path, subfolder, name):
+    """Peptide and value of the highest row of a table's value column, as {peptide: value}, or None if it is empty"""
+    rows = query_result_table(dataset_path, subfolder, name, limit=1)['rows']
+    return {rows[0][0]: rows[0][-1]} if rows else None
+
+def build_dataset_payload(dataset_path):
+    """Assemble the tables, quality and motif data shown in the dataset viewer"""
+    listing = list_result_tables(dataset_path)
+    if not listing:
+        return None
+
+    store = result_store(dataset_path)
+    spreadsheets = {}
+    max_values = {}
+    subfolders_dict = {}
+
+    for subfolder, tables in listing.items():
+        enrichment_table = next((t for t in tables if 'enrichment' in t), None)
+        percentage_table = next((t for t in tables if 'enrichment' not in t), None)
+        # Bubble charts of store tables are fetched from the plot API; older
+        # datasets get theirs inline. Both keep the top BUBBLE_PEPTIDES.
+        bubble = None
+        bubble_plot = bool(enrichment_table and percentage_table) and store.exists(subfolder, enrichment_table) \
+            and store.exists(subfolder, percentage_table)
+        if enrichment_table and percentage_table and not bubble_plot:
+            enrichment_df = read_result_table(dataset_path, subfolder, enrichment_table)
+            percentage_df = read_result_table(dataset_path, subfolder, percentage_table)
+            bubble = bubble_data(percentage_df.set_index(percentage_df.columns[0]),
+                                 enrichment_df.set_index(enrichment_df.columns[0]), limit=BUBBLE_PEPTIDES)
+        spreadsheets[subfolder] = {
+            'bubble': bubble,
+            'bubble_plot': bubble_plot
+        }
+        # Rows themselves are paged in through the table API
+        max_values[subfolder] = {
+            'enrichment': top_value(dataset_path, subfolder, enrichment_table) if enrichment_table else None,
+            'percentage': top_value(dataset_path, subfolder, percentage_table) if percentage_table else None
+        }
+        subfolders_dict[subfolder] = [f'{t}.xlsx' for t in tables]
+
+    # Quality: from instruction.json if present
+    quality = None
+    instruction_path = os.path.join(dataset_path, 'instruction.json')
+    if os.path.exists(instruction_path):
+        try:
+            with open(instruction_path, 'r') as f:
+                quality = json.load(f).get('denoise')
+        except Exception:
+            quality = None
+    # Motif: from motifs.json and motif_logo.png if present. The logo is
+    # linked rather than inlined so the browser caches it separately.
+    motif = None
+    motifs_json = os.path.join(dataset_path, 'motifs.json')
+    motif_logo = os.path.join(dataset_path, 'motif_logo.png')
+    if os.path.exists(motifs_json) and os.path.exists(motif_logo):
+        try:
+            with open(motifs_json, 'r') as f:
+                motifs_data = json.load(f)
+            source = 'cache' if os.path.dirname(os.path.abspath(dataset_path)) == os.path.abspath(CACHE_ROOT) else 'web'
+            img = (f'/api/dataset/{os.path.basename(dataset_path)}/motif_logo.png'
+                   f'?source={source}&v={file_version(motif_logo)}')
+            motif = {'motifs': motifs_data.get('0'), 'img': img}
+        except Exception:
+            motif = None
+
+    return {
+        'subfolders': subfolders_dict,
+        'max_values': max_values,
+        'spreadsheets': spreadsheets,
+        'quality': quality,
+        'motif': motif
+    }
+
+def dataset_fingerprint(dataset_path):
+    """Modification times and sizes of every file the dataset payload is built from"""
+    paths = [os.path.join(dataset_path, name) for name in ('instruction.json', 'motifs.json', 'motif_logo.png')]
+    paths += glob.glob(os.path.join(dataset_path, result_store.STORE_DIR, '*', f'average_*{result_store.EXTENSION}'))
+    paths += glob.glob(os.path.join(dataset_path, 'spreadsheets', '*', 'average_*.xlsx'))
+    fingerprint = []
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+def payload_validators(fingerprint):
+    """ETag and Last-Modified of the dataset payload built from the fingerprinted files"""
+    etag = hashlib.sha1(repr((PAYLOAD_VERSION, fingerprint)).encode('utf-8')).hexdigest()
+    last_modified = None
+    if fingerprint:
+        last_modified = datetime.fromtimestamp(max(mtime for _, mtime, _ in fingerprint) / 1e9, timezone.utc)
+    return etag, last_modified
+
+def get_dataset_payload_json(dataset_path, encoding=None, fingerprint=None):
+    """Serialized dataset payload, optionally compressed, served from payload_cache while its files are unchanged"""
+    if fingerprint is None:
+        fingerprint = dataset_fingerprint(dataset_path)
+    body = payload_cache.get(dataset_path, fingerprint, encoding)
+    if body is not None:
+        return body
+    if encoding is not None:
+        body = get_dataset_payload_json(dataset_path, fingerprint=fingerprint)
+        if body is None:
+            return None
+        body = compression.compress(body, encoding)
+        payload_cache.put(dataset_path, fingerprint, body, encoding)
+        return body
+    payload = build_dataset_payload(dataset_path)
+    if payload is None:
+        return None
+    body = app.json.dumps(payload).encode('utf-8')
+    payload_cache.put(dataset_path, fingerprint, body)
+    return body
+
+def forget_dataset_payload(dataset_id):
+    """Drop the cached payloads of a deleted dataset"""
+    payload_cache.discard(os.path.join(app.config['DATASETS_FOLDER'], dataset_id))
+    payload_cache.discard(os.path.join(CACHE_ROOT, dataset_id))
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page"""
@@ -109,11 +530,8 @@ def view_dataset(dataset_id):
         return redirect(url_for('index'))
     
     # Check metadata to determine the best source
-    metadata_path = os.path.join('misc', 'datasets', dataset_id, 'metadata.json')
-    if os.path.exists(metadata_path):
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        
+    metadata = metadata_store.get(dataset_id)
+    if metadata:
         # Use cache if available, otherwise web
         if metadata.get('cache_available', False):
             return redirect(url_for('view_dataset_any', source='cache', dataset_id=dataset_id))
@@ -150,19 +568,12 @@ def view_datasets():
     return render_template('view_datasets.html')
 
 def check_access_rate_limit(user_id):
-    """Check if user has exceeded failed access attempts"""
-    current_time = time.time()
-    user_attempts = access_attempts[user_id]
-    
-    # Remove old attempts (older than 1 hour)
-    user_attempts[:] = [t for t in user_attempts if current_time - t < ATTEMPT_WINDOW]
-    
-    # Check if user has exceeded limit
-    return len(user_attempts) < MAX_FAILED_ATTEMPTS
+    """Check if user has exceeded failed access attempts within the last hour"""
+    return job_store.recent_attempts(user_id) < MAX_FAILED_ATTEMPTS
 
 def record_failed_access(user_id):
     """Record a failed access attempt"""
-    access_attempts[user_id].append(time.time())
+    job_store.record_attempt(user_id)
 
 def verify_dataset_ownership(dataset_id):
     """Verify that the current user owns the specified dataset"""
@@ -175,23 +586,20 @@ def verify_dataset_ownership(dataset_id):
         print(f"SECURITY ALERT: User {current_user.username} rate limited for excessive failed access attempts")
         return False
     
-    metadata_path = os.path.join('misc', 'datasets', dataset_id, 'metadata.json')
-    if not os.path.exists(metadata_path):
+    try:
+        owner_id = metadata_store.owner_of(dataset_id)
+    except KeyError:
         print(f"SECURITY: User {current_user.username} attempted to access non-existent dataset {dataset_id}")
         record_failed_access(current_user.id)
         return False
     
     try:
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        
         # Check if current user is the owner
-        owner_id = metadata.get('owner_id')
         if owner_id == current_user.id:
             return True
         
         # Log unauthorized access attempts and record for rate limiting
-        owner_username = metadata.get('owner_username', 'unknown')
+        owner_username = (metadata_store.get(dataset_id) or {}).get('owner_username', 'unknown')
         print(f"SECURITY ALERT: User {current_user.username} attempted to access dataset {dataset_id} owned by {owner_username}")
         record_failed_access(current_user.id)
         
@@ -204,63 +612,53 @@ def verify_dataset_ownership(dataset_id):
         record_failed_access(current_user.id)
         return False
 
+def remove_dataset(dataset_id, metadata=None):
+    """Delete a dataset's files, metadata and job state; returns True if anything existed"""
+    if metadata is None:
+        metadata = metadata_store.get(dataset_id) or {}
+    removed = False
+
+    # Uploaded files and results (the cache copy too, for security)
+    for path in (os.path.join(app.config['DATASETS_FOLDER'], dataset_id), os.path.join(CACHE_ROOT, dataset_id)):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+            removed = True
+
+    # Associated CSV files in the misc folder
+    for csv_file in metadata.get('csv_files', []):
+        if os.path.exists(csv_file):
+            os.remove(csv_file)
+            removed = True
+
+    # Metadata (and the directory left by older versions)
+    if metadata_store.delete(dataset_id):
+        removed = True
+    metadata_path = os.path.join('misc', 'datasets', dataset_id)
+    if os.path.exists(metadata_path):
+        shutil.rmtree(metadata_path)
+        removed = True
+
+    # Processing status, staged uploads and cached payloads
+    job_scheduler.cancel(dataset_id)
+    job_store.delete(dataset_id)
+    upload_store.discard(dataset_id)
+    forget_dataset_payload(dataset_id)
+    storage_manager.forget(dataset_id)
+    return removed
+
 def cleanup_all_user_datasets():
     """Clean up all datasets owned by current user for security (called on logout or session end)"""
     if not current_user.is_authenticated:
         return
         
     try:
-        user_id = current_user.id
-        datasets_to_cleanup = []
-        
         # Find all datasets owned by current user
-        misc_datasets_dir = os.path.join('misc', 'datasets')
-        if os.path.exists(misc_datasets_dir):
-            for dataset_id in os.listdir(misc_datasets_dir):
-                metadata_path = os.path.join(misc_datasets_dir, dataset_id)
-                if os.path.isdir(metadata_path):
-                    try:
-                        metadata_file = os.path.join(metadata_path, 'metadata.json')
-                        if os.path.exists(metadata_file):
-                            with open(metadata_file, 'r') as f:
-                                metadata = json.load(f)
-                            
-                            # Only clean up datasets owned by current user
-                            if metadata.get('owner_id') == user_id:
-                                datasets_to_cleanup.append((dataset_id, metadata))
-                    except Exception as e:
-                        print(f"Error reading metadata for {dataset_id}: {e}")
+        datasets_to_cleanup = metadata_store.list_for_owner(current_user.id)
         
         # Clean up user's datasets
         for dataset_id, metadata in datasets_to_cleanup:
             try:
-                # Clean up dataset files
-                dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
-                if os.path.exists(dataset_path):
-                    shutil.rmtree(dataset_path)
-                
-                # Clean up cache files
-                cache_path = os.path.join(CACHE_ROOT, dataset_id)
-                if os.path.exists(cache_path):
-                    shutil.rmtree(cache_path)
-                
-                # Clean up CSV files
-                csv_files = metadata.get('csv_files', [])
-                for csv_file in csv_files:
-                    if os.path.exists(csv_file):
-                        os.remove(csv_file)
-                
-                # Clean up metadata
-                metadata_path = os.path.join(misc_datasets_dir, dataset_id)
-                if os.path.exists(metadata_path):
-                    shutil.rmtree(metadata_path)
-                
-                # Clear processing status for this dataset
-                if dataset_id in processing_status:
-                    del processing_status[dataset_id]
-                if dataset_id in processing_output:
-                    del processing_output[dataset_id]
-                    
+                remove_dataset(dataset_id, metadata)
                 print(f"Cleaned up dataset {dataset_id} for user {current_user.username}")
                 
             except Exception as e:
@@ -279,31 +677,12 @@ def determine_available_sections(dataset_path):
         'motif': False
     }
     
-    # Check for spreadsheets directory (required for enrichment and percentage)
-    spreadsheets_dir = os.path.join(dataset_path, 'spreadsheets')
-    if os.path.exists(spreadsheets_dir):
-        subfolders = [f for f in os.listdir(spreadsheets_dir) if os.path.isdir(os.path.join(spreadsheets_dir, f))]
-        
-        # Check if any subfolder has enrichment data
-        has_enrichment = False
-        has_percentage = False
-        
-        for subfolder in subfolders:
-            subfolder_path = os.path.join(spreadsheets_dir, subfolder)
-            files = [f for f in os.listdir(subfolder_path) if f.startswith('average_') and f.endswith('.xlsx')]
-            
-            # Check for enrichment files
-            enrichment_file = next((f for f in files if 'enrichment' in f), None)
-            if enrichment_file:
-                has_enrichment = True
-            
-            # Check for percentage files
-            percentage_file = next((f for f in files if 'enrichment' not in f), None)
-            if percentage_file:
-                has_percentage = True
-        
-        sections['enrichment'] = has_enrichment
-        sections['percentage'] = has_percentage
+    # Check the result tables (required for enrichment and percentage)
+    for tables in list_result_tables(dataset_path).values():
+        if any('enrichment' in t for t in tables):
+            sections['enrichment'] = True
+        if any('enrichment' not in t for t in tables):
+            sections['percentage'] = True
     
     # Check for quality data (instruction.json with denoise info)
     instruction_path = os.path.join(dataset_path, 'instruction.json')
@@ -340,17 +719,13 @@ def view_dataset_any(source, dataset_id):
     if not os.path.exists(dataset_path):
         return redirect(url_for('view_datasets'))
     
+    storage_manager.touch(dataset_id)
     # Determine which sections are actually available based on data content
     sections = determine_available_sections(dataset_path)
     
-    # Get dataset title from metadata.json in misc/datasets/ (for both web and cache datasets)
-    metadata_path = os.path.join('misc', 'datasets', dataset_id, 'metadata.json')
-    if os.path.exists(metadata_path):
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-        dataset_title = metadata.get('name', dataset_id)
-    else:
-        dataset_title = dataset_id
+    # Get dataset title from the metadata store (for both web and cache datasets)
+    metadata = metadata_store.get(dataset_id)
+    dataset_title = metadata.get('name', dataset_id) if metadata else dataset_id
     return render_template('view_dataset.html', dataset_id=dataset_id, dataset_path=dataset_path, sections=sections, source=source, dataset_title=dataset_title)
 
 
@@ -380,14 +755,7 @@ def upload_files():
         dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
         os.makedirs(dataset_path, exist_ok=True)
 
-        # Create misc/datasets directory if it doesn't exist
-        misc_datasets_dir = os.path.join('misc', 'datasets')
-        os.makedirs(misc_datasets_dir, exist_ok=True)
-        
-        # Save dataset metadata in misc/datasets/{dataset_id}/
-        metadata_dir = os.path.join(misc_datasets_dir, dataset_id)
-        os.makedirs(metadata_dir, exist_ok=True)
-        
+        # Save dataset metadata in the metadata store
         metadata = {
             'name': dataset_name,
             'created_at': time.time(),
@@ -397,8 +765,7 @@ def upload_files():
             'owner_username': current_user.username  # For easier debugging
         }
 
-        with open(os.path.join(metadata_dir, 'metadata.json'), 'w') as f:
-            json.dump(metadata, f)
+        metadata_store.put(dataset_id, metadata)
 
         # Handle file uploads
         files = request.files.getlist('files')
@@ -407,43 +774,17 @@ def upload_files():
 
         for file in files:
             if file.filename:
-                # Get the original path from the form data
-                original_path = file.filename  # This will be the webkitRelativePath
-                
-                # Remove the top-level folder name from the path
-                path_parts = original_path.split('/')
-                if len(path_parts) > 1:
-                    # Skip the first part (folder name) and join the rest
-                    relative_path = '/'.join(path_parts[1:])
-                else:
-                    relative_path = original_path
-                
-                # Handle CSV files separately - save to misc folder
-                if file.filename.lower().endswith('.csv'):
-                    # Save CSV files to misc folder for barcode evaluation
-                    csv_filename = secure_filename(file.filename)
-                    csv_path = os.path.join('misc', csv_filename)
-                    file.save(csv_path)
-                    csv_files.append(csv_path)
-                    uploaded_files.append(f'misc/{csv_filename}')
-                else:
-                    # Save other files (including enrichment files) to dataset directory
-                    file_path = os.path.join(dataset_path, relative_path)
-                    
-                    # Ensure the directory exists
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    
-                    # Save the file with its relative path
-                    file.save(file_path)
-                    uploaded_files.append(relative_path)
+                # The filename is the webkitRelativePath
+                file_path, listed_name, is_csv = upload_destination(dataset_path, file.filename)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                file.save(file_path)
+                uploaded_files.append(listed_name)
+                if is_csv:
+                    csv_files.append(file_path)
 
         # Update metadata with uploaded files and CSV files
-        metadata['files'] = uploaded_files
-        metadata['csv_files'] = csv_files
-        metadata['status'] = 'ready'
-
-        with open(os.path.join(metadata_dir, 'metadata.json'), 'w') as f:
-            json.dump(metadata, f)
+        metadata_store.update(dataset_id, files=uploaded_files, csv_files=csv_files, status='ready')
+        record_storage(dataset_id)
 
         return jsonify({
             'success': True,
@@ -454,6 +795,124 @@ def upload_files():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def upload_destination(dataset_path, original_path):
+    """Where an uploaded file is saved: (path on disk, name listed in metadata, is_csv)"""
+    # Remove the top-level folder name from the path
+    path_parts = original_path.split('/')
+    if len(path_parts) > 1:
+        path_parts = path_parts[1:]
+    if any(part in ('', '.', '..') for part in path_parts) or os.path.isabs(original_path):
+        raise UploadError(f'Invalid file path: {original_path}')
+
+    # Handle CSV files separately - save to misc folder for barcode evaluation
+    if original_path.lower().endswith('.csv'):
+        csv_filename = secure_filename(original_path)
+        return os.path.join('misc', csv_filename), f'misc/{csv_filename}', True
+
+    # Save other files (including enrichment files) to dataset directory
+    relative_path = '/'.join(path_parts)
+    return os.path.join(dataset_path, relative_path), relative_path, False
+
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """Start a chunked upload for a new dataset.
+
+    Takes {dataset_name, files: [{path, size}]}, where path is the
+    webkitRelativePath. Chunks are then PUT in any order and in parallel.
+    """
+    try:
+        data = request.get_json()
+        dataset_name = (data.get('dataset_name') or '').strip()
+        if not dataset_name:
+            return jsonify({'error': 'Dataset name is required'}), 400
+        files = data.get('files') or []
+        if not files:
+            return jsonify({'error': 'No files to upload'}), 400
+
+        dataset_id = str(uuid.uuid4())
+        dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
+        files = [{'path': str(f['path']), 'size': int(f['size'])} for f in files]
+        for f in files:
+            upload_destination(dataset_path, f['path'])
+            if f['size'] < 0:
+                raise UploadError(f'Invalid size for {f["path"]}')
+
+        manifest = upload_store.create(dataset_id, files)
+        os.makedirs(dataset_path, exist_ok=True)
+        metadata_store.put(dataset_id, {
+            'name': dataset_name,
+            'created_at': time.time(),
+            'status': 'uploading',
+            'dataset_path': dataset_path,
+            'owner_id': current_user.id,
+            'owner_username': current_user.username
+        })
+
+        return jsonify({'success': True, 'dataset_id': dataset_id, **manifest})
+
+    except (UploadError, KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uploads/<dataset_id>')
+@login_required
+def get_upload(dataset_id):
+    """Manifest of a chunked upload and the chunks received so far, for resuming"""
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    manifest = upload_store.manifest(dataset_id)
+    if manifest is None:
+        return jsonify({'error': 'No upload in progress'}), 404
+    return jsonify({**manifest, 'received': upload_store.received(dataset_id)})
+
+@app.route('/api/uploads/<dataset_id>/<int:index>/<int:chunk>', methods=['PUT'])
+@login_required
+def upload_chunk(dataset_id, index, chunk):
+    """Stream one chunk (raw request body) to disk, verifying the optional X-Chunk-SHA256 header"""
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        digest = upload_store.write_chunk(dataset_id, index, chunk, request.stream,
+                                          request.headers.get('X-Chunk-SHA256'))
+        return jsonify({'success': True, 'sha256': digest})
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/uploads/<dataset_id>/complete', methods=['POST'])
+@login_required
+def complete_upload(dataset_id):
+    """Assemble a chunked upload into the dataset once every chunk has arrived"""
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
+        uploaded_files = []
+        csv_files = []
+
+        def destination(path):
+            file_path, listed_name, is_csv = upload_destination(dataset_path, path)
+            uploaded_files.append(listed_name)
+            if is_csv:
+                csv_files.append(file_path)
+            return file_path
+
+        digests = upload_store.assemble(dataset_id, destination)
+        metadata = metadata_store.update(dataset_id, files=uploaded_files, csv_files=csv_files,
+                                         file_digests=digests, status='ready')
+        record_storage(dataset_id)
+        return jsonify({
+            'success': True,
+            'dataset_id': dataset_id,
+            'message': f'Dataset "{metadata["name"]}" created successfully'
+        })
+
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/process_dataset', methods=['POST'])
 @login_required
 def process_dataset():
@@ -471,51 +930,57 @@ def process_dataset():
         if not os.path.exists(dataset_path):
             return jsonify({'error': 'Dataset not found'}), 404
 
+        if (job_store.status(dataset_id) or {}).get('status') in ('queued', 'processing'):
+            return jsonify({'error': 'Dataset is already being processed'}), 409
+
         # Initialize processing status and output queue
-        processing_status[dataset_id] = {
-            'status': 'processing',
+        job_store.start(dataset_id, {
+            'status': 'queued',
             'progress': 0,
-            'message': 'Initializing...',
-            'start_time': time.time(),
+            'message': 'Waiting for a free worker...',
+            'queued_time': time.time(),
+            'queue_position': None,
             'current_file': '',
             'total_files': 0,
             'processed_files': 0
-        }
-        processing_output[dataset_id] = queue.Queue()
+        })
 
-        # Start processing in background thread
-        thread = threading.Thread(target=process_dataset_background, args=(dataset_id, options))
-        thread.daemon = True
-        thread.start()
+        # Queue processing on the bounded worker pool; only admins may set a
+        # priority, so users cannot jump ahead of each other
+        priority = PRIORITIES.get(options.get('priority'), 0) if auth.is_admin(current_user) else 0
+        try:
+            position = job_scheduler.submit(dataset_id, current_user.id, (dataset_id, options), priority=priority)
+        except QuotaExceeded as e:
+            job_store.delete(dataset_id)
+            return jsonify({'error': str(e)}), 429
 
-        return jsonify({'success': True, 'message': 'Processing started'})
+        return jsonify({'success': True, 'message': 'Processing queued', 'queue_position': position})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def build_capgenie_command(dataset_id, dataset_path, options, output_queue):
-    """Build CapGenie CLI command using the same logic as GUI desktop utility"""
-    command = ['capgenie']
-    
-    # Add dataset path (folder flag)
-    command.extend(['-f', dataset_path])
+def build_pipeline_options(dataset_id, dataset_path, options, output_queue, cpus=None):
+    """Build capgenie.api.PipelineOptions fields using the same logic as GUI desktop utility"""
+    pipeline_options = {'folder': dataset_path, 'session': dataset_id}
+
+    # Count files in parallel on the cores the scheduler gave this job
+    if cpus and len(cpus) > 1:
+        pipeline_options['jobs'] = len(cpus)
     
     # Add CSV file for barcode analysis
     if options.get('analysis_type') == 'barcode':
-        # Load metadata from misc/datasets/{dataset_id}/ to get CSV file path
-        metadata_path = os.path.join('misc', 'datasets', dataset_id, 'metadata.json')
+        # Load metadata from the metadata store to get CSV file path
+        metadata = metadata_store.get(dataset_id)
         csv_file_path = None
         
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-                csv_files = metadata.get('csv_files', [])
-                if csv_files:
-                    csv_file_path = csv_files[0]  # Use the first CSV file (should be in misc/)
+        if metadata:
+            csv_files = metadata.get('csv_files', [])
+            if csv_files:
+                csv_file_path = csv_files[0]  # Use the first CSV file (should be in misc/)
         
         if csv_file_path and os.path.exists(csv_file_path):
-            command.extend(['-cf', csv_file_path])
-            command.extend(['-m', '0'])  # Default to exact matches
+            pipeline_options['capsid_file'] = csv_file_path
+            pipeline_options['mismatches'] = 0  # Default to exact matches
             output_queue.put({
                 'timestamp': datetime.now().isoformat(),
                 'type': 'info',
@@ -530,7 +995,7 @@ def build_capgenie_command(dataset_id, dataset_path, options, output_queue):
     
     elif options.get('analysis_type') == 'selection':
         # Add unknown variants search for selection analysis
-        command.append('-unk')
+        pipeline_options['unknown_variants'] = True
         output_queue.put({
             'timestamp': datetime.now().isoformat(),
             'type': 'info',
@@ -546,7 +1011,7 @@ def build_capgenie_command(dataset_id, dataset_path, options, output_queue):
             enrichment_file_path = os.path.join(dataset_path, options.get('enrichment_file_path'))
         
         if enrichment_file_path and os.path.exists(enrichment_file_path):
-            command.extend(['-e', enrichment_file_path])
+            pipeline_options['enrichment_file'] = enrichment_file_path
             output_queue.put({
                 'timestamp': datetime.now().isoformat(),
                 'type': 'info',
@@ -562,233 +1027,142 @@ def build_capgenie_command(dataset_id, dataset_path, options, output_queue):
     # Add quality threshold if denoising is enabled
     if options.get('denoise'):
         threshold = options.get('threshold', 15)
-        command.extend(['-qual', str(threshold)])
+        pipeline_options['quality_threshold'] = int(threshold)
         output_queue.put({
             'timestamp': datetime.now().isoformat(),
             'type': 'info',
             'message': f'Quality threshold set to: {threshold}'
         })
     
-    # Add visualization flags
+    # Plots are not part of the job: they are rendered when first opened
     if options.get('graphs'):
-        command.append('-b')  # bubble charts
-        command.append('-fd')  # frequency distribution
         output_queue.put({
             'timestamp': datetime.now().isoformat(),
             'type': 'info',
-            'message': 'Visualization enabled (bubble charts and frequency distribution)'
+            'message': 'Visualization enabled (bubble charts and frequency distribution are rendered when first opened)'
         })
     
     # Add motif analysis flag
     if options.get('motif'):
-        command.append('-mot')
+        pipeline_options['motif'] = True
         output_queue.put({
             'timestamp': datetime.now().isoformat(),
             'type': 'info',
             'message': 'Motif analysis enabled'
         })
     
-    # Add session name using dataset_id
-    command.extend(['-ses', dataset_id])
-    
+    # Spreadsheets are exported on demand when the user downloads them
+    pipeline_options['spreadsheet_extension'] = 'none'
+
     output_queue.put({
         'timestamp': datetime.now().isoformat(),
         'type': 'info',
-        'message': f'Final CapGenie command: {" ".join(command)}'
+        'message': f'Final CapGenie options: {json.dumps(pipeline_options)}'
     })
     
-    return command
-
-def process_dataset_background(dataset_id, options):
-    """Background processing function with real-time output capture"""
+    return pipeline_options
+
+def process_dataset_background(dataset_id, options, cpus=None):
+    """Background processing function; runs the pipeline in a warm worker process.
+
+    Runs in whichever gunicorn worker claimed the job from job_scheduler;
+    cpus are the cores reserved for this job.
+    The worker reports progress to the job store itself.
+    """
+    output_queue = job_store.events(dataset_id)
+    if output_queue is None:
+        return  # Cleaned up while it was waiting in the queue
     try:
         dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
-        output_queue = processing_output[dataset_id]
         
         # Update initial status
-        processing_status[dataset_id].update({
-            'message': 'Preparing analysis...',
-            'progress': 5
-        })
+        update_status(dataset_id, status='processing', queue_position=0, start_time=time.time(),
+                      message='Preparing analysis...', progress=5)
         output_queue.put({
             'timestamp': datetime.now().isoformat(),
             'type': 'info',
             'message': 'Starting CapGenie analysis...'
         })
 
-        # Count total files for progress tracking
-        total_files = 0
-        for root, dirs, files in os.walk(dataset_path):
-            for file in files:
-                if file.endswith(('.fastq', '.fq')):
-                    total_files += 1
-        
-        processing_status[dataset_id]['total_files'] = total_files
-        output_queue.put({
-            'timestamp': datetime.now().isoformat(),
-            'type': 'info',
-            'message': f'Found {total_files} FASTQ files to process'
-        })
-
-        # Build CapGenie CLI command using the same logic as GUI
-        command = build_capgenie_command(dataset_id, dataset_path, options, output_queue)
-        
-        output_queue.put({
-            'timestamp': datetime.now().isoformat(),
-            'type': 'info',
-            'message': f'Command: {" ".join(command)}'
-        })
-
-        # Start the subprocess with real-time output capture
-        processing_status[dataset_id].update({
-            'message': 'Starting CapGenie analysis...',
-            'progress': 10
-        })
+        # Build pipeline options using the same logic as GUI
+        pipeline_options = build_pipeline_options(dataset_id, dataset_path, options, output_queue, cpus)
 
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
-        )
-
-        # Read output in real-time
-        file_processing_pattern = re.compile(r'Currently processing (.+?) \(')
-        file_complete_pattern = re.compile(r'Finished (.+)')
-        dir_created_pattern = re.compile(r'Created (.+)')
-        enrichment_pattern = re.compile(r'Calculated enrichment: (.+)')
-        bubble_pattern = re.compile(r'Created bubble charts: (.+)')
-        freq_pattern = re.compile(r'Created frequency distribution charts: (.+)')
-        motif_pattern = re.compile(r'Finding Motifs|Creating Motif Logo|Motif Logo saved to: (.+)')
-
-        processed_files = 0
-        
-        if process.stdout:
-            for line in iter(process.stdout.readline, ''):
-                line = line.strip()
-                if not line:
-                    continue
-                
-            # Add to output queue
-            output_queue.put({
-                'timestamp': datetime.now().isoformat(),
-                'type': 'output',
-                'message': line
-            })
-
-            # Parse progress from output
-            match = file_processing_pattern.search(line)
-            if match:
-                current_file = match.group(1)
-                processing_status[dataset_id]['current_file'] = current_file
-                processing_status[dataset_id]['message'] = f'Processing {current_file}...'
-                
-                # Calculate progress based on files
-                if total_files > 0:
-                    progress = 10 + (processed_files / total_files) * 70
-                    processing_status[dataset_id]['progress'] = min(80, progress)
-                    
-            elif file_complete_pattern.search(line):
-                processed_files += 1
-                processing_status[dataset_id]['processed_files'] = processed_files
-                
-                if total_files > 0:
-                    progress = 10 + (processed_files / total_files) * 70
-                    processing_status[dataset_id]['progress'] = min(80, progress)
-                    
-            elif dir_created_pattern.search(line):
-                processing_status[dataset_id]['message'] = 'Setting up analysis directories...'
-                processing_status[dataset_id]['progress'] = 15
-                
-            elif enrichment_pattern.search(line):
-                processing_status[dataset_id]['message'] = 'Calculating enrichment values...'
-                processing_status[dataset_id]['progress'] = 85
-                
-            elif bubble_pattern.search(line) or freq_pattern.search(line):
-                processing_status[dataset_id]['message'] = 'Generating visualizations...'
-                processing_status[dataset_id]['progress'] = 90
-                
-            elif motif_pattern.search(line):
-                processing_status[dataset_id]['message'] = 'Analyzing motifs...'
-                processing_status[dataset_id]['progress'] = 75
+        update_status(dataset_id, message='Starting CapGenie analysis...', progress=10)
+        error = None
+        try:
+            pipeline_pool.run(job_store.path, dataset_id, pipeline_options, cpus)
+        except Exception as e:
+            error = str(e) or type(e).__name__
 
-        # Wait for process to complete
-        return_code = process.wait()
-        
-        if return_code == 0:
+        if error is None:
             # Check if results are in cache
             cache_path = os.path.join(CACHE_ROOT, dataset_id)
             cache_available = os.path.exists(cache_path)
             
-            processing_status[dataset_id].update({
-                'status': 'completed',
-                'message': 'Analysis completed successfully!',
-                'progress': 100,
-                'cache_available': cache_available,
-                'cache_path': cache_path if cache_available else None
-            })
+            update_status(dataset_id,
+                status='completed',
+                message='Analysis completed successfully!',
+                progress=100,
+                cache_available=cache_available,
+                cache_path=cache_path if cache_available else None
+            )
             output_queue.put({
                 'timestamp': datetime.now().isoformat(),
                 'type': 'success',
                 'message': f'CapGenie analysis completed successfully! Results {"available in cache" if cache_available else "saved to dataset folder"}.'
             })
         else:
-            processing_status[dataset_id].update({
-                'status': 'error',
-                'message': f'CapGenie process failed with return code {return_code}',
-                'progress': 0
-            })
+            update_status(dataset_id,
+                status='error',
+                message=f'CapGenie analysis failed: {error}',
+                progress=0
+            )
             output_queue.put({
                 'timestamp': datetime.now().isoformat(),
                 'type': 'error',
-                'message': f'CapGenie process failed with return code {return_code}'
+                'message': f'CapGenie analysis failed: {error}'
             })
 
-        # Update metadata in misc/datasets/{dataset_id}/
-        metadata_path = os.path.join('misc', 'datasets', dataset_id, 'metadata.json')
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-            metadata['status'] = 'completed' if return_code == 0 else 'error'
-            metadata['completed_at'] = time.time()
-            metadata['options'] = options
-            metadata['return_code'] = return_code
-            
-            # Add cache information if successful
-            if return_code == 0:
-                cache_path = os.path.join(CACHE_ROOT, dataset_id)
-                if os.path.exists(cache_path):
-                    metadata['cache_available'] = True
-                    metadata['cache_path'] = cache_path
-                else:
-                    metadata['cache_available'] = False
-            
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f)
-
-        # Clean up output queue after a delay to allow final messages to be retrieved
-        def cleanup_queue():
-            time.sleep(5)  # Wait 5 seconds for final output retrieval
-            if dataset_id in processing_output:
-                del processing_output[dataset_id]
+        # Update metadata in the metadata store
+        fields = {
+            'status': 'completed' if error is None else 'error',
+            'completed_at': time.time(),
+            'options': options,
+            'error': error
+        }
+        
+        # Add cache information if successful
+        if error is None:
+            cache_path = os.path.join(CACHE_ROOT, dataset_id)
+            if os.path.exists(cache_path):
+                fields['cache_available'] = True
+                fields['cache_path'] = cache_path
+            else:
+                fields['cache_available'] = False
         
-        cleanup_thread = threading.Thread(target=cleanup_queue)
-        cleanup_thread.daemon = True
-        cleanup_thread.start()
+        metadata_store.update(dataset_id, **fields)
+        record_storage(dataset_id)
+
+        # Warm the payload cache so the first view does not wait on table reads
+        if error is None:
+            try:
+                warm_path, _ = resolve_dataset_path(dataset_id, 'cache' if os.path.exists(os.path.join(CACHE_ROOT, dataset_id)) else None)
+                if warm_path:
+                    get_dataset_payload_json(warm_path)
+            except Exception as e:
+                print(f"Could not warm payload cache for {dataset_id}: {e}")
+
+        # The job store drops the final status and output once they expire
+        output_queue.close()
 
     except Exception as e:
-        processing_status[dataset_id].update({
-            'status': 'error',
-            'message': f'Error: {str(e)}',
-            'progress': 0
+        update_status(dataset_id, status='error', message=f'Error: {str(e)}', progress=0)
+        output_queue.put({
+            'timestamp': datetime.now().isoformat(),
+            'type': 'error',
+            'message': f'Processing error: {str(e)}'
         })
-        if dataset_id in processing_output:
-            processing_output[dataset_id].put({
-                'timestamp': datetime.now().isoformat(),
-                'type': 'error',
-                'message': f'Processing error: {str(e)}'
-            })
+        output_queue.close()
 
 @app.route('/api/processing_status/<dataset_id>')
 @login_required
@@ -797,81 +1171,127 @@ def get_processing_status(dataset_id):
     # SECURITY: Verify user owns this dataset
     if not verify_dataset_ownership(dataset_id):
         return jsonify({'error': 'Access denied'}), 403
-    status = processing_status.get(dataset_id, {
+    status = job_store.status(dataset_id) or {
         'status': 'unknown',
         'progress': 0,
         'message': 'Status unknown'
-    })
+    }
     return jsonify(status)
 
 @app.route('/api/processing_output/<dataset_id>')
 @login_required
 def get_processing_output(dataset_id):
-    """Get real-time output from processing"""
+    """Get output messages from processing after the ?since=<event id> cursor"""
     # SECURITY: Verify user owns this dataset
     if not verify_dataset_ownership(dataset_id):
         return jsonify({'error': 'Access denied'}), 403
     try:
-        output_queue = processing_output.get(dataset_id)
-        if not output_queue:
-            return jsonify({'output': []})
-        
-        # Get all available output messages
-        output_messages = []
-        while not output_queue.empty():
-            try:
-                message = output_queue.get_nowait()
-                output_messages.append(message)
-            except queue.Empty:
-                break
-        
-        return jsonify({'output': output_messages})
+        batch, _ = job_store.events_since(dataset_id, request.args.get('since', 0, type=int))
+        return jsonify({
+            'output': [data for _, kind, data in batch if kind == 'output'],
+            'last_event_id': batch[-1][0] if batch else request.args.get('since', 0, type=int)
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Seconds between keep-alive comments on an idle event stream
+EVENT_STREAM_KEEPALIVE = 15
+# Each open stream holds a worker thread, so only some of the threads may
+# stream; viewers past the cap are refused and poll instead
+event_streams = threading.BoundedSemaphore(int(os.environ.get('CAPGENIE_EVENT_STREAMS', '4')))
+
+@app.route('/api/processing_events/<dataset_id>')
+@login_required
+def stream_processing_events(dataset_id):
+    """Server-Sent Events stream of a job's status updates and output lines.
+
+    Ownership is checked once per connection. Clients resume after a
+    reconnect from the Last-Event-ID header (or ?last_event_id=). Once
+    CAPGENIE_EVENT_STREAMS streams are open on this worker, further ones get
+    503 and fall back to /api/processing_status and /api/processing_output.
+    """
+    # SECURITY: Verify user owns this dataset
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    if not event_streams.acquire(blocking=False):
+        return jsonify({'error': 'Too many open event streams, poll /api/processing_output instead'}), 503
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', '0'))
+    last_id = int(last_id) if last_id.isdigit() else 0
+
+    def generate(last_id):
+        if job_store.status(dataset_id) is None:
+            # No job (expired or never started)
+            yield f"event: status\ndata: {json.dumps({'status': 'unknown', 'progress': 0, 'message': 'Status unknown'})}\n\n"
+            return
+        # Replayed status events bring viewers up to date, whichever worker runs the job
+        while True:
+            batch, closed = job_store.events_since(dataset_id, last_id, timeout=EVENT_STREAM_KEEPALIVE)
+            for event_id, kind, data in batch:
+                yield f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+                last_id = event_id
+            if closed and not batch:
+                return
+            if not batch:
+                yield ": keep-alive\n\n"
+
+    response = app.response_class(generate(last_id), mimetype='text/event-stream',
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the stream ends or the client goes away, even if it never started
+    response.call_on_close(event_streams.release)
+    return response
+
 @app.route('/api/datasets')
 @login_required
 def get_datasets():
     """Get list of available datasets for the current user only"""
     datasets = []
 
-    # Look for metadata in misc/datasets/ directory
-    misc_datasets_dir = os.path.join('misc', 'datasets')
-    if os.path.exists(misc_datasets_dir):
-        for dataset_id in os.listdir(misc_datasets_dir):
-            metadata_path = os.path.join(misc_datasets_dir, dataset_id, 'metadata.json')
-
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-
-                    # SECURITY: Only show datasets owned by current user
-                    if metadata.get('owner_id') != current_user.id:
-                        continue
-
-                    # Verify the actual dataset folder still exists
-                    dataset_path = metadata.get('dataset_path', os.path.join(app.config['DATASETS_FOLDER'], dataset_id))
-                    if os.path.exists(dataset_path):
-                        # Determine the best source (cache if available, otherwise web)
-                        cache_available = metadata.get('cache_available', False)
-                        source = 'cache' if cache_available else 'web'
-                        
-                        datasets.append({
-                            'id': dataset_id,
-                            'name': metadata.get('name', 'Unknown'),
-                            'status': metadata.get('status', 'unknown'),
-                            'created_at': metadata.get('created_at', 0),
-                            'source': source,
-                            'cache_available': cache_available
-                        })
-                except:
-                    continue
-
-    # Sort by creation date (newest first)
-    datasets.sort(key=lambda x: x['created_at'], reverse=True)
+    # SECURITY: Only show datasets owned by current user (newest first)
+    for dataset_id, metadata in metadata_store.list_for_owner(current_user.id):
+        # Verify the actual dataset folder still exists
+        dataset_path = metadata.get('dataset_path', os.path.join(app.config['DATASETS_FOLDER'], dataset_id))
+        if os.path.exists(dataset_path):
+            # Determine the best source (cache if available, otherwise web)
+            cache_available = metadata.get('cache_available', False)
+            source = 'cache' if cache_available else 'web'
+            
+            datasets.append({
+                'id': dataset_id,
+                'name': metadata.get('name', 'Unknown'),
+                'status': metadata.get('status', 'unknown'),
+                'created_at': metadata.get('created_at', 0),
+                'source': source,
+                'cache_available': cache_available
+            })
+
     return jsonify(datasets)
 
+@app.route('/api/storage')
+@login_required
+def get_storage_usage():
+    """Disk budget, usage per tier and the usage of the current user's datasets"""
+    own = [dataset_id for dataset_id, _ in metadata_store.list_for_owner(current_user.id)]
+    return jsonify(storage_manager.usage(own))
+
+def resolve_dataset_path(dataset_id, source=None):
+    """Locate a dataset's results in the web uploads or the capgenie cache"""
+    dataset_path = None
+    metadata = None
+    # Try web uploads first if source is not specified or is web
+    if source is None or source == 'web':
+        web_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
+        if os.path.exists(web_path):
+            dataset_path = web_path
+            # Look for metadata in the metadata store
+            metadata = metadata_store.get(dataset_id)
+    # If not found or source is cache, try cache folder
+    if (dataset_path is None or not os.path.exists(dataset_path)) or (source == 'cache'):
+        cache_path = os.path.join(CACHE_ROOT, dataset_id)
+        if os.path.exists(cache_path):
+            dataset_path = cache_path
+            metadata = None  # No metadata.json in cache
+    return dataset_path, metadata
+
 @app.route('/api/dataset/<dataset_id>/data')
 @login_required
 def get_dataset_data(dataset_id):
@@ -880,186 +1300,224 @@ def get_dataset_data(dataset_id):
     if not verify_dataset_ownership(dataset_id):
         return jsonify({'error': 'Access denied'}), 403
     try:
-        source = request.args.get('source')
-        dataset_path = None
-        metadata = None
-        # Try web uploads first if source is not specified or is web
-        if source is None or source == 'web':
-            web_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
-            if os.path.exists(web_path):
-                dataset_path = web_path
-                # Look for metadata in misc/datasets/ directory
-                metadata_path = os.path.join('misc', 'datasets', dataset_id, 'metadata.json')
-                if os.path.exists(metadata_path):
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-        # If not found or source is cache, try cache folder
-        if (dataset_path is None or not os.path.exists(dataset_path)) or (source == 'cache'):
-            cache_path = os.path.join(CACHE_ROOT, dataset_id)
-            if os.path.exists(cache_path):
-                dataset_path = cache_path
-                metadata = None  # No metadata.json in cache
+        dataset_path, metadata = resolve_dataset_path(dataset_id, request.args.get('source'))
         if dataset_path is None or not os.path.exists(dataset_path):
             return jsonify({'error': 'Dataset not found'}), 404
         # If metadata exists, check status
         if metadata and metadata.get('status') != 'ready':
             return jsonify({'error': 'Dataset processing not complete'}), 400
-        import pandas as pd
-        # For cache datasets, mimic FinishedDataset.parse() for all subfolders
-        if dataset_path.startswith(CACHE_ROOT):
-            spreadsheets_dir = os.path.join(dataset_path, 'spreadsheets')
-            if not os.path.exists(spreadsheets_dir):
+        storage_manager.touch(dataset_id)
+        fingerprint = dataset_fingerprint(dataset_path)
+        encoding = compression.choose_encoding(request.accept_encodings)
+        etag, last_modified = payload_validators(fingerprint)
+        if encoding is not None:
+            etag += '-' + encoding
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = app.response_class(status=304)
+        else:
+            body = get_dataset_payload_json(dataset_path, encoding, fingerprint)
+            if body is None:
                 return jsonify({'error': 'No spreadsheets found'}), 404
-            subfolders = [f for f in os.listdir(spreadsheets_dir) if os.path.isdir(os.path.join(spreadsheets_dir, f))]
-            if not subfolders:
-                return jsonify({'error': 'No spreadsheet subfolders found'}), 404
-
-            spreadsheets = {}
-            max_values = {}
-            subfolders_dict = {}
-
-            for subfolder in subfolders:
-                subfolder_path = os.path.join(spreadsheets_dir, subfolder)
-                files = [f for f in os.listdir(subfolder_path) if f.startswith('average_') and f.endswith('.xlsx')]
-                enrichment_file = next((f for f in files if 'enrichment' in f), None)
-                percentage_file = next((f for f in files if 'enrichment' not in f), None)
-                enrichment = None
-                percentage = None
-                if enrichment_file:
-                    df = pd.read_excel(os.path.join(subfolder_path, enrichment_file))
-                    enrichment = df_to_json_array(df)
-                if percentage_file:
-                    df = pd.read_excel(os.path.join(subfolder_path, percentage_file))
-                    percentage = df_to_json_array(df)
-                spreadsheets[subfolder] = {
-                    'enrichment': enrichment,
-                    'percentage': percentage
-                }
-                # Max values logic (like getMax in JS)
-                def get_max(s_data):
-                    if s_data and len(s_data) > 1:
-                        top_peptide_val = s_data[1][-1]
-                        top_peptide_name = s_data[1][0]
-                        return {top_peptide_name: top_peptide_val}
-                    return None
-                max_values[subfolder] = {
-                    'enrichment': get_max(enrichment),
-                    'percentage': get_max(percentage)
-                }
-                subfolders_dict[subfolder] = files
-
-            # Quality: from instruction.json if present
-            quality = None
-            instruction_path = os.path.join(dataset_path, 'instruction.json')
-            if os.path.exists(instruction_path):
-                try:
-                    with open(instruction_path, 'r') as f:
-                        quality = json.load(f).get('denoise')
-                except Exception:
-                    quality = None
-            # Motif: from motifs.json and motif_logo.png if present
-            motif = None
-            motifs_json = os.path.join(dataset_path, 'motifs.json')
-            motif_logo = os.path.join(dataset_path, 'motif_logo.png')
-            if os.path.exists(motifs_json) and os.path.exists(motif_logo):
-                try:
-                    with open(motifs_json, 'r') as f:
-                        motifs_data = json.load(f)
-                    with open(motif_logo, 'rb') as imgf:
-                        base64_img = 'data:image/png;base64,' + base64.b64encode(imgf.read()).decode('utf-8')
-                    motif = {'motifs': motifs_data.get('0'), 'img': base64_img}
-                except Exception:
-                    motif = None
-
-            result = {
-                'subfolders': subfolders_dict,
-                'max_values': max_values,
-                'spreadsheets': spreadsheets,
-                'quality': quality,
-                'motif': motif
-            }
-            return jsonify(result)
-        
-        # For web datasets, use the same logic as cache datasets
-        spreadsheets_dir = os.path.join(dataset_path, 'spreadsheets')
-        if not os.path.exists(spreadsheets_dir):
-            return jsonify({'error': 'No spreadsheets found'}), 404
-        subfolders = [f for f in os.listdir(spreadsheets_dir) if os.path.isdir(os.path.join(spreadsheets_dir, f))]
-        if not subfolders:
-            return jsonify({'error': 'No spreadsheet subfolders found'}), 404
-
-        spreadsheets = {}
-        max_values = {}
-        subfolders_dict = {}
-
-        for subfolder in subfolders:
-            subfolder_path = os.path.join(spreadsheets_dir, subfolder)
-            files = [f for f in os.listdir(subfolder_path) if f.startswith('average_') and f.endswith('.xlsx')]
-            enrichment_file = next((f for f in files if 'enrichment' in f), None)
-            percentage_file = next((f for f in files if 'enrichment' not in f), None)
-            enrichment = None
-            percentage = None
-            if enrichment_file:
-                df = pd.read_excel(os.path.join(subfolder_path, enrichment_file))
-                enrichment = df_to_json_array(df)
-            if percentage_file:
-                df = pd.read_excel(os.path.join(subfolder_path, percentage_file))
-                percentage = df_to_json_array(df)
-            spreadsheets[subfolder] = {
-                'enrichment': enrichment,
-                'percentage': percentage
-            }
-            # Max values logic (like getMax in JS)
-            def get_max(s_data):
-                if s_data and len(s_data) > 1:
-                    top_peptide_val = s_data[1][-1]
-                    top_peptide_name = s_data[1][0]
-                    return {top_peptide_name: top_peptide_val}
-                return None
-            max_values[subfolder] = {
-                'enrichment': get_max(enrichment),
-                'percentage': get_max(percentage)
-            }
-            subfolders_dict[subfolder] = files
-
-        # Quality: from instruction.json if present
-        quality = None
-        instruction_path = os.path.join(dataset_path, 'instruction.json')
-        if os.path.exists(instruction_path):
-            try:
-                with open(instruction_path, 'r') as f:
-                    quality = json.load(f).get('denoise')
-            except Exception:
-                quality = None
-        # Motif: from motifs.json and motif_logo.png if present
-        motif = None
-        motifs_json = os.path.join(dataset_path, 'motifs.json')
-        motif_logo = os.path.join(dataset_path, 'motif_logo.png')
-        if os.path.exists(motifs_json) and os.path.exists(motif_logo):
-            try:
-                with open(motifs_json, 'r') as f:
-                    motifs_data = json.load(f)
-                with open(motif_logo, 'rb') as imgf:
-                    base64_img = 'data:image/png;base64,' + base64.b64encode(imgf.read()).decode('utf-8')
-                motif = {'motifs': motifs_data.get('0'), 'img': base64_img}
-            except Exception:
-                motif = None
-
-        result = {
-            'subfolders': subfolders_dict,
-            'max_values': max_values,
-            'spreadsheets': spreadsheets,
-            'quality': quality,
-            'motif': motif
-        }
-        return jsonify(result)
+            response = app.response_class(body, mimetype='application/json')
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+        # Private to the owner, revalidated on every view
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add('Accept-Encoding')
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/dataset/<dataset_id>/motif_logo.png')
+@login_required
+def get_motif_logo(dataset_id):
+    """Motif logo of a dataset; cached for good when requested with its version"""
+    # SECURITY: Verify user owns this dataset
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    dataset_path, _ = resolve_dataset_path(dataset_id, request.args.get('source'))
+    logo = os.path.join(dataset_path, 'motif_logo.png') if dataset_path else None
+    if logo is None or not os.path.exists(logo):
+        return jsonify({'error': 'Motif logo not found'}), 404
+    response = send_file(os.path.abspath(logo), mimetype='image/png', conditional=True, max_age=0)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    set_asset_max_age(response, request.args.get('v') == file_version(logo), max_age=0)
+    return response
+
+@app.route('/api/dataset/<dataset_id>/table/<subfolder>/<table>')
+@login_required
+def get_dataset_table(dataset_id, subfolder, table):
+    """Get one page of a result table, sorted and filtered on the server"""
+    # SECURITY: Verify user owns this dataset
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    name = parse_table_name(subfolder, table)
+    if name is None:
+        return jsonify({'error': 'Invalid table'}), 400
+    try:
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', 100, type=int), 0), MAX_TABLE_PAGE_ROWS)
+        top = request.args.get('top', type=int)
+        if top is not None and top < 0:
+            raise ValueError('top must not be negative')
+        order = request.args.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            raise ValueError('order must be asc or desc')
+        # min=<column>:<value>, repeatable
+        minimums = {}
+        for item in request.args.getlist('min'):
+            column, _, value = item.rpartition(':')
+            minimums[column] = float(value)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        dataset_path, _ = resolve_dataset_path(dataset_id, request.args.get('source'))
+        if dataset_path is None or not os.path.exists(dataset_path):
+            return jsonify({'error': 'Dataset not found'}), 404
+        storage_manager.touch(dataset_id)
+        return jsonify(query_result_table(dataset_path, subfolder, name, request.args.get('sort'), order == 'desc',
+                                          offset, limit, minimums, top))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Table not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/dataset/<dataset_id>/curve/<subfolder>/<table>')
+@login_required
+def get_dataset_curve(dataset_id, subfolder, table):
+    """Downsampled rank-abundance curve of a result table column, optionally zoomed to a range of ranks"""
+    # SECURITY: Verify user owns this dataset
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    name = parse_table_name(subfolder, table)
+    if name is None:
+        return jsonify({'error': 'Invalid table'}), 400
+    start = max(request.args.get('start', 0, type=int), 0)
+    end = request.args.get('end', type=int)
+    points = min(max(request.args.get('points', CURVE_POINTS, type=int), 3), MAX_CURVE_POINTS)
+    try:
+        dataset_path, _ = resolve_dataset_path(dataset_id, request.args.get('source'))
+        if dataset_path is None or not os.path.exists(dataset_path):
+            return jsonify({'error': 'Dataset not found'}), 404
+        storage_manager.touch(dataset_id)
+        return jsonify(query_result_curve(dataset_path, subfolder, name, request.args.get('column'), start, end, points))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Table not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/dataset/<dataset_id>/plot/<subfolder>/<kind>')
+@login_required
+def get_dataset_plot(dataset_id, subfolder, kind):
+    """A plot of a data directory (bubble.html, bubble.svg, bubble.json, distribution.svg), rendered on first request"""
+    # SECURITY: Verify user owns this dataset
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    if kind not in plots.PLOTS or subfolder in ('.', '..') or '\\' in subfolder:
+        return jsonify({'error': 'Invalid plot'}), 400
+    try:
+        dataset_path, _ = resolve_dataset_path(dataset_id, request.args.get('source'))
+        if dataset_path is None or not os.path.exists(dataset_path):
+            return jsonify({'error': 'Dataset not found'}), 404
+        storage_manager.touch(dataset_id)
+        path, key, rendered = plot_renderer.render(dataset_path, subfolder, kind)
+        if rendered:
+            record_storage(dataset_id)
+        response = send_file(os.path.abspath(path), as_attachment='download' in request.args,
+                             download_name=f'{subfolder}_{kind}', etag=key, max_age=0)
+        # Private to the owner, revalidated on every view
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except FileNotFoundError:
+        return jsonify({'error': 'Plot data not found'}), 404
+    except TimeoutError:
+        return jsonify({'error': 'The plot is still rendering, try again shortly'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/static/<path:filename>')
+@app.route('/api/dataset/<dataset_id>/export/<subfolder>/<table>')
+@login_required
+def export_dataset_table(dataset_id, subfolder, table):
+    """Download one result table, exporting it on first request"""
+    # SECURITY: Verify user owns this dataset
+    if not verify_dataset_ownership(dataset_id):
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        extension = spreadsheet.file_extension(request.args.get('format', 'xlsx'))
+        if extension is None:
+            raise ValueError('An export format is required')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        dataset_path, _ = resolve_dataset_path(dataset_id, request.args.get('source'))
+        if dataset_path is None or not os.path.exists(dataset_path):
+            return jsonify({'error': 'Dataset not found'}), 404
+        name = parse_table_name(subfolder, table)
+        if name is None:
+            return jsonify({'error': 'Invalid table'}), 400
+        download_name = name + extension
+
+        store = result_store(dataset_path)
+        if store.exists(subfolder, name):
+            export_path = os.path.join(dataset_path, 'exports', subfolder, download_name)
+            # Exports are generated lazily and reused until the table changes
+            if not os.path.exists(export_path) or os.path.getmtime(export_path) < os.path.getmtime(store.table_path(subfolder, name)):
+                spreadsheet.export_table(store, subfolder, name, export_path)
+                record_storage(dataset_id)
+        else:
+            # Datasets processed before the result store only have their spreadsheets
+            export_path = os.path.join(dataset_path, 'spreadsheets', subfolder, download_name)
+            if not os.path.exists(export_path):
+                return jsonify({'error': 'Table not found'}), 404
+        storage_manager.touch(dataset_id)
+        return send_file(os.path.abspath(export_path), as_attachment=True, download_name=download_name)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/static/<path:filename>', endpoint='static')
 def static_files(filename):
-    """Serve static files"""
-    return send_from_directory('static', filename)
+    """Serve static files, compressed when worth it; immutable when requested with their version"""
+    path = safe_join(STATIC_FOLDER, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    version = file_version(path)
+    encoding = compression.choose_encoding(request.accept_encodings)
+    mimetype = mimetypes.guess_type(filename)[0]
+    if (encoding is not None and mimetype in compression.COMPRESSIBLE_TYPES
+            and os.path.getsize(path) >= compression.MIN_SIZE):
+        response = app.response_class(compression.compressed_file(path, version, encoding), mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f'{version}-{encoding}')
+        response.last_modified = os.path.getmtime(path)
+        response.vary.add('Accept-Encoding')
+        response.make_conditional(request)
+    else:
+        response = send_from_directory(STATIC_FOLDER, filename, max_age=0)
+    response.cache_control.public = True
+    set_asset_max_age(response, request.args.get('v') == version)
+    return response
+
+@app.url_defaults
+def add_static_version(endpoint, values):
+    """Version url_for('static', ...) links by file so they can be cached for good"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        path = safe_join(STATIC_FOLDER, values['filename'])
+        if path is not None and os.path.isfile(path):
+            values['v'] = file_version(path)
+
+@app.after_request
+def compress_response(response):
+    """gzip/brotli for JSON and other text responses the views did not compress themselves"""
+    return compression.compress_response(response, request.accept_encodings)
 
 @app.route('/uploads/<path:filename>')
 def uploaded_files(filename):
@@ -1074,48 +1532,7 @@ def cleanup_dataset(dataset_id):
     if not verify_dataset_ownership(dataset_id):
         return jsonify({'error': 'Access denied'}), 403
     try:
-        # Get metadata to find all related files
-        metadata_path = os.path.join('misc', 'datasets', dataset_id)
-        csv_files_to_remove = []
-        
-        if os.path.exists(os.path.join(metadata_path, 'metadata.json')):
-            with open(os.path.join(metadata_path, 'metadata.json'), 'r') as f:
-                metadata = json.load(f)
-                csv_files_to_remove = metadata.get('csv_files', [])
-        
-        success = False
-        
-        # 1. Remove web dataset directory
-        dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
-        if os.path.exists(dataset_path):
-            shutil.rmtree(dataset_path)
-            success = True
-            
-        # 2. Remove cache dataset directory (for security)
-        cache_path = os.path.join(CACHE_ROOT, dataset_id)
-        if os.path.exists(cache_path):
-            shutil.rmtree(cache_path)
-            success = True
-            
-        # 3. Remove associated CSV files from misc folder
-        for csv_file in csv_files_to_remove:
-            if os.path.exists(csv_file):
-                os.remove(csv_file)
-                success = True
-                
-        # 4. Remove metadata directory
-        if os.path.exists(metadata_path):
-            shutil.rmtree(metadata_path)
-            success = True
-            
-        # 5. Clear any processing status for this dataset
-        if dataset_id in processing_status:
-            del processing_status[dataset_id]
-            
-        if dataset_id in processing_output:
-            del processing_output[dataset_id]
-            
-        if success:
+        if remove_dataset(dataset_id):
             return jsonify({'success': True, 'message': 'Dataset and all related files cleaned up securely'})
         else:
             return jsonify({'error': 'Dataset not found'}), 404
@@ -1132,49 +1549,13 @@ def periodic_security_cleanup():
             try:
                 current_time = time.time()
                 # Clean up datasets older than 2 hours for security
-                misc_datasets_dir = os.path.join('misc', 'datasets')
-                if os.path.exists(misc_datasets_dir):
-                    for dataset_id in os.listdir(misc_datasets_dir):
-                        metadata_path = os.path.join(misc_datasets_dir, dataset_id, 'metadata.json')
-                        if os.path.exists(metadata_path):
-                            try:
-                                with open(metadata_path, 'r') as f:
-                                    metadata = json.load(f)
-                                created_at = metadata.get('created_at', current_time)
-                                
-                                # If dataset is older than 2 hours, clean it up (security measure)
-                                if current_time - created_at > 7200:  # 2 hours
-                                    owner_username = metadata.get('owner_username', 'unknown')
-                                    print(f"Cleaning up old dataset {dataset_id} (owner: {owner_username}) for security")
-                                    
-                                    # Clean up dataset files
-                                    dataset_path = os.path.join(app.config['DATASETS_FOLDER'], dataset_id)
-                                    if os.path.exists(dataset_path):
-                                        shutil.rmtree(dataset_path)
-                                    
-                                    cache_path = os.path.join(CACHE_ROOT, dataset_id)
-                                    if os.path.exists(cache_path):
-                                        shutil.rmtree(cache_path)
-                                    
-                                    # Clean up CSV files
-                                    csv_files = metadata.get('csv_files', [])
-                                    for csv_file in csv_files:
-                                        if os.path.exists(csv_file):
-                                            os.remove(csv_file)
-                                    
-                                    # Clean up metadata
-                                    metadata_dir = os.path.join(misc_datasets_dir, dataset_id)
-                                    if os.path.exists(metadata_dir):
-                                        shutil.rmtree(metadata_dir)
-                                        
-                                    # Clear processing status
-                                    if dataset_id in processing_status:
-                                        del processing_status[dataset_id]
-                                    if dataset_id in processing_output:
-                                        del processing_output[dataset_id]
-                                        
-                            except Exception as e:
-                                print(f"Error during periodic cleanup of {dataset_id}: {e}")
+                for dataset_id, metadata in metadata_store.list_created_before(current_time - 7200):
+                    try:
+                        owner_username = metadata.get('owner_username', 'unknown')
+                        print(f"Cleaning up old dataset {dataset_id} (owner: {owner_username}) for security")
+                        remove_dataset(dataset_id, metadata)
+                    except Exception as e:
+                        print(f"Error during periodic cleanup of {dataset_id}: {e}")
                 
                 # Sleep for 1 hour before next cleanup
                 time.sleep(3600)
@@ -1186,6 +1567,9 @@ def periodic_security_cleanup():
     cleanup_thread = threading.Thread(target=cleanup_task, daemon=True)
     cleanup_thread.start()
 
+# Claim queued jobs once everything they run is defined
+job_scheduler.start(process_dataset_background)
+
 if __name__ == '__main__':
     # Start periodic security cleanup (only in development)
     if os.environ.get('FLASK_ENV') == 'development':
@@ -15,6 +15,13 @@ USERS = {
     'researcher': User(3, 'researcher', generate_password_hash('science2024'))
 }
 
+# Users allowed to administer the server, e.g. to set job priorities
+ADMINS = {'admin'}
+
+def is_admin(user):
+    """Whether a user is an administrator"""
+    return getattr(user, 'username', None) in ADMINS
+
 def get_user(username):
     """Get user by username"""
     return USERS.get(username)
@@ -0,0 +1,164 @@
+# Throughput of the counting engines on synthetic data.
+# Generates (once) a library and FASTQ file per read count with
+# synthetic.py, then runs every engine on it in a fresh interpreter pinned
+# to 1, 2, 4, ... cores, so each run starts cold and its peak RSS is its
+# own. Reports reads/s, MB/s of FASTQ, peak RSS and the speedup over one
+# core. Loading the reads (for the engines that take them as one string) is
+# timed apart from the engine itself. A run that fails or times out, e.g.
+# an engine that holds all reads in memory at 100M reads, is reported and
+# the suite goes on.
+#
+# Usage: python benchmarks/engines.py [--reads 1M,10M,100M] [--engines NAME,...] [--cores 1,2,4] [--data DIR] [--json FILE]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import synthetic
+
+ENGINES = ["filter_count", "fuzzy_hamming", "fuzzy_levenshtein", "denoise", "count_known_reads", "search_by_flank"]
+
+# Run in a fresh interpreter per engine, read count and core count
+PROBE = """
+import json, os, resource, shutil, sys, tempfile, time
+os.sched_setaffinity(0, set(sorted(os.sched_getaffinity(0))[:{cores}]))
+scratch = tempfile.mkdtemp(prefix="capgenie-bench-")
+os.environ["XDG_CACHE_HOME"] = scratch
+engine, fastq, library = {engine!r}, {fastq!r}, {library!r}
+
+began = time.perf_counter()
+from capgenie.search_aav9 import search_aav9
+if engine in ("fuzzy_hamming", "fuzzy_levenshtein", "count_known_reads"):
+    peptide_map = search_aav9.create_peptide_map(library)
+if engine.startswith("fuzzy"):
+    from capgenie import fuzzy_match
+    dna = search_aav9().load_reads(fastq)[0].encode()
+if engine in ("count_known_reads", "search_by_flank"):
+    instance = search_aav9()
+    instance._override_session("bench")
+if engine == "filter_count":
+    from capgenie import filter_module
+if engine == "denoise":
+    from capgenie import denoise
+prepare = time.perf_counter() - began
+
+began = time.perf_counter()
+if engine == "filter_count":
+    filter_module.filter_count(fastq.encode(), {refseq!r}.encode(), None)
+elif engine.startswith("fuzzy"):
+    fuzzy_match.fuzzy_match(list(peptide_map), dna, {mismatches}, engine == "fuzzy_hamming", None)
+elif engine == "denoise":
+    denoise.denoise(os.path.basename(fastq).encode(), fastq.encode(), scratch.encode(), {threshold}, None)
+elif engine == "count_known_reads":
+    instance.count_known_reads(peptide_map, fastq, "bench", record=False)
+elif engine == "search_by_flank":
+    instance.search_by_flank({flank1!r}, {flank2!r}, fastq, "bench", record=False)
+seconds = time.perf_counter() - began
+
+shutil.rmtree(scratch, ignore_errors=True)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"prepare": prepare, "seconds": seconds, "peak_mb": peak}}))
+"""
+
+"""
+run_engine: str, str, str, int, argparse.Namespace --> dict
+-- Times one engine on one FASTQ file in a fresh interpreter
+* @param [in] engine (str) - One of ENGINES
+* @param [in] fastq (str) - FASTQ file
+* @param [in] library (str) - Capsid CSV of the library the reads were drawn from
+* @param [in] cores (int) - Cores the interpreter may run on
+* @param [in] args (argparse.Namespace) - Mismatches, denoise threshold and timeout
+* @param [out] result (dict) - prepare and engine seconds and peak RSS (MB), or error
+** Native threads only run on the allowed cores, so limiting the cores
+** measures thread scaling without changing the engines
+"""
+def run_engine(engine, fastq, library, cores, args):
+    probe = PROBE.format(cores=cores, engine=engine, fastq=fastq, library=library, refseq=synthetic.REFSEQ,
+                         mismatches=args.mismatches, threshold=args.threshold,
+                         flank1=synthetic.FLANK1, flank2=synthetic.FLANK2)
+    try:
+        completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {args.timeout}s"}
+    if completed.returncode != 0:
+        lines = (completed.stderr.strip() or f"exit code {completed.returncode}").splitlines()
+        return {"error": lines[-1] if lines else f"exit code {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+"""
+core_counts: str --> list
+-- Core counts to run on: the given ones, or 1, 2, 4, ... up to the cores available
+"""
+def core_counts(text):
+    available = len(os.sched_getaffinity(0))
+    if text:
+        return sorted({min(int(c), available) for c in text.split(",")})
+    counts = [1]
+    while counts[-1] * 2 < available:
+        counts.append(counts[-1] * 2)
+    return counts + [available] if available > 1 else counts
+
+"""
+format_rate: float --> str
+-- Human readable rate, e.g. 1.2M
+"""
+def format_rate(value):
+    for scale, suffix in ((1e9, "G"), (1e6, "M"), (1e3, "k")):
+        if value >= scale:
+            return f"{value / scale:.3g}{suffix}"
+    return f"{value:.0f}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the counting engines on synthetic FASTQ files")
+    parser.add_argument("--reads", default="1M,10M,100M", help="Comma separated read counts")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma separated engines to run")
+    parser.add_argument("--cores", help="Comma separated core counts (default 1, 2, 4, ... up to all)")
+    parser.add_argument("--library", type=int, default=100, help="Number of library variants")
+    parser.add_argument("--error-rate", type=float, default=0.001, help="Substitutions per base")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--mismatches", type=int, default=1, help="Mismatches allowed by the fuzzy engines")
+    parser.add_argument("--threshold", type=int, default=20, help="Quality threshold of denoise")
+    parser.add_argument("--timeout", type=int, default=3600, help="Seconds a single run may take")
+    parser.add_argument("--data", default=os.path.join(tempfile.gettempdir(), "capgenie-bench"),
+                        help="Folder for the generated data, reused between runs")
+    parser.add_argument("--json", help="Also save the results to this file")
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)} (choose from {', '.join(ENGINES)})")
+    cores = core_counts(args.cores)
+
+    results = []
+    print(f"{'engine':<18} {'reads':>6} {'cores':>5} {'load s':>7} {'s':>8} {'reads/s':>8} {'MB/s':>7} {'RSS MB':>7} {'speedup':>7}")
+    for reads in map(synthetic.parse_count, args.reads.split(",")):
+        library, fastq = synthetic.dataset(args.data, reads, args.library, args.seed, args.error_rate)
+        megabytes = os.path.getsize(fastq) / 1e6
+        for engine in engines:
+            single = None
+            for count in cores:
+                result = run_engine(engine, fastq, library, count, args)
+                result.update(engine=engine, reads=reads, cores=count, fastq_mb=megabytes)
+                results.append(result)
+                label = f"{engine:<18} {format_rate(reads):>6} {count:>5}"
+                if "error" in result:
+                    print(f"{label} failed: {result['error']}", flush=True)
+                    continue
+                seconds = max(result["seconds"], 1e-9)
+                single = single or (seconds if count == 1 else None)
+                result.update(reads_per_second=reads / seconds, mb_per_second=megabytes / seconds,
+                              speedup=single / seconds if single else None)
+                speedup = f"{result['speedup']:.2f}x" if single else "-"
+                print(f"{label} {result['prepare']:>7.2f} {seconds:>8.2f} {format_rate(result['reads_per_second']):>8} "
+                      f"{result['mb_per_second']:>7.1f} {result['peak_mb']:>7.0f} {speedup:>7}", flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
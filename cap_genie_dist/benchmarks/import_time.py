@@ -0,0 +1,69 @@
+# Import-time budget of the capgenie entry points.
+# Imports each module in a fresh interpreter, the way a CLI run or a web
+# worker does, and fails if it takes longer than the budget or loads one
+# of the heavy modules that only specific stages need.
+#
+# Usage: python benchmarks/import_time.py [--budget SECONDS] [--runs N]
+
+import argparse
+import json
+import subprocess
+import sys
+
+# Entry points and the time they may take to import (seconds)
+BUDGETS = {
+    "capgenie.cli": 1.5,
+    "capgenie.api": 1.5,
+}
+
+# Modules that must only be imported by the stage that uses them
+DEFERRED = ["plotly", "matplotlib", "umap", "sklearn", "logomaker", "scipy", "Bio", "inquirer", "ahocorasick"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split(".")[0] for name in sys.modules}})
+print(json.dumps({{"seconds": elapsed, "modules": loaded}}))
+"""
+
+"""
+measure: str, int --> float, list
+-- Imports a module in fresh interpreters and keeps the fastest run
+* @param [in] module (str) - Module to import
+* @param [in] runs (int) - Number of interpreters to start
+* @param [out] seconds (float) - Fastest import time
+* @param [out] modules (list) - Top-level modules loaded by the import
+** Fresh interpreters so nothing is already imported
+"""
+def measure(module, runs):
+    best = None
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best["seconds"], best["modules"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the capgenie entry points")
+    parser.add_argument("--budget", type=float, help="Budget in seconds for every entry point (overrides the defaults)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per entry point; the fastest counts")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS.items():
+        budget = args.budget or budget
+        seconds, modules = measure(module, args.runs)
+        eager = [name for name in DEFERRED if name in modules]
+        ok = seconds <= budget and not eager
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {module}: {seconds:.3f}s (budget {budget:.2f}s)")
+        if eager:
+            print(f"     imported eagerly: {', '.join(eager)}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# Deterministic synthetic capsid libraries and FASTQ files.
+# Reads follow the layout the counting engines expect: a fixed upstream
+# flank ending in TGCCCAA, a 21 nt (7 codon) insert and a fixed downstream
+# flank starting with GCAC. Most inserts come from the library, drawn with
+# a Zipf-like skew so the counts look like a selection round. The rest are
+# random inserts, i.e. unknown variants. Substitution errors, reverse
+# complemented reads and low-quality reads are added at set rates. The same
+# arguments always produce the same bytes.
+#
+# Usage: python benchmarks/synthetic.py OUT_DIR [--reads N] [--library N] [--error-rate R] [--seed N]
+
+import argparse
+import os
+
+import numpy as np
+
+# Read layout: UPSTREAM + insert + DOWNSTREAM, 100 nt
+UPSTREAM = "TGGCCAGTAGATCTTCCCAACATAGCCTAGCTGTGCCCAA"
+DOWNSTREAM = "GCACAGGCGCAGACATATTCACTAAACCGAACAATCTAT"
+INSERT_LENGTH = 21
+READ_LENGTH = len(UPSTREAM) + INSERT_LENGTH + len(DOWNSTREAM)
+# Flank bases kept on each side of the insert in the library file
+LIBRARY_FLANK = 11
+
+# Reference sequence for filter_count (the read without its insert) and the
+# flanks for search_by_flank
+REFSEQ = UPSTREAM[-7:] + DOWNSTREAM
+FLANK1 = UPSTREAM[-7:]
+FLANK2 = DOWNSTREAM[:6]
+
+# One codon per amino acid
+CODONS = {
+    "A": "GCT", "R": "CGT", "N": "AAT", "D": "GAT", "C": "TGT", "E": "GAA", "Q": "CAA",
+    "G": "GGT", "H": "CAT", "I": "ATT", "L": "CTG", "K": "AAA", "M": "ATG", "F": "TTT",
+    "P": "CCT", "S": "TCT", "T": "ACT", "W": "TGG", "Y": "TAT", "V": "GTT",
+}
+AMINO_ACIDS = "".join(CODONS)
+# Motifs the engines use to classify reads; an insert must not create them
+RESERVED = ["CCAAGCAC", "GTGCTTGG", "TGCCCAA", "TTGGGCA", "CCTGTG"]
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+COMPLEMENT = np.zeros(256, dtype=np.uint8)
+COMPLEMENT[BASES] = np.frombuffer(b"TGCA", dtype=np.uint8)
+BASE_INDEX = np.zeros(256, dtype=np.uint8)
+BASE_INDEX[BASES] = np.arange(4)
+
+# Reads generated per chunk; fixed so the output does not depend on memory
+CHUNK_READS = 1 << 18
+# Phred ranges of good and low-quality reads
+GOOD_QUALITY = (30, 41)
+LOW_QUALITY = (2, 13)
+HEADER_DIGITS = 12
+
+"""
+creates_motif: str --> bool
+-- Whether a reserved motif overlaps the insert once it sits between the flanks
+* @param [in] insert (str) - Insert nucleotides
+* @param [out] found (bool) - True if the read would contain an extra motif
+** The flanks themselves contain TGCCCAA, so only matches reaching into the insert count
+"""
+def creates_motif(insert):
+    pad = max(map(len, RESERVED)) - 1
+    context = UPSTREAM[-pad:] + insert + DOWNSTREAM[:pad]
+    for motif in RESERVED:
+        start = context.find(motif)
+        while start != -1:
+            if start + len(motif) > pad and start < pad + len(insert):
+                return True
+            start = context.find(motif, start + 1)
+    return False
+
+"""
+make_library: int, int --> list
+-- Random distinct 7-mer peptides and their inserts
+* @param [in] size (int) - Number of variants
+* @param [in] seed (int) - Random seed
+* @param [out] library (list) - (peptide, insert) pairs, most abundant first
+** Peptides whose insert would create a reserved motif in a read are skipped
+"""
+def make_library(size, seed=0):
+    rng = np.random.default_rng([seed, 0])
+    library, seen = [], set()
+    while len(library) < size:
+        for codes in rng.integers(0, len(AMINO_ACIDS), (max(size, 64), INSERT_LENGTH // 3)):
+            peptide = "".join(AMINO_ACIDS[c] for c in codes)
+            insert = "".join(CODONS[aa] for aa in peptide)
+            if peptide in seen or creates_motif(insert):
+                continue
+            seen.add(peptide)
+            library.append((peptide, insert))
+            if len(library) == size:
+                break
+    return library
+
+"""
+write_library: str, list --> None
+-- Saves a library as a capsid file (peptide,nucleotides per line)
+* @param [in] path (str) - CSV file to write
+* @param [in] library (list) - Output of make_library
+"""
+def write_library(path, library):
+    with open(path, "w") as f:
+        for peptide, insert in library:
+            f.write(f"{peptide},{UPSTREAM[-LIBRARY_FLANK:]}{insert}{DOWNSTREAM[:LIBRARY_FLANK]}\n")
+
+"""
+write_fastq: str, int, list, int, float, float, float, float, float --> None
+-- Writes synthetic reads of a library
+* @param [in] path (str) - FASTQ file to write
+* @param [in] reads (int) - Number of reads
+* @param [in] library (list) - Output of make_library
+* @param [in] seed (int) - Random seed
+* @param [in] error_rate (float) - Substitutions per base
+* @param [in] library_fraction (float) - Share of reads carrying a library insert
+* @param [in] reverse_fraction (float) - Share of reads that are reverse complemented
+* @param [in] low_quality_fraction (float) - Share of reads with low base qualities
+* @param [in] skew (float) - Zipf exponent of the variant abundances (0 for uniform)
+* @param [out] None - Writes the file
+** Vectorized in chunks of CHUNK_READS, so 100M reads take minutes
+"""
+def write_fastq(path, reads, library, seed=0, error_rate=0.001, library_fraction=0.9,
+                reverse_fraction=0.0, low_quality_fraction=0.05, skew=1.0):
+    inserts = np.frombuffer("".join(insert for _, insert in library).encode(), dtype=np.uint8).reshape(-1, INSERT_LENGTH)
+    weights = 1.0 / np.arange(1, len(inserts) + 1) ** skew
+    cumulative = np.cumsum(weights / weights.sum())
+    template = np.frombuffer((UPSTREAM + "N" * INSERT_LENGTH + DOWNSTREAM).encode(), dtype=np.uint8)
+    start = len(UPSTREAM)
+
+    header_length = 1 + 1 + HEADER_DIGITS + 1  # "@r" + digits + newline
+    record_length = header_length + READ_LENGTH + 1 + 2 + READ_LENGTH + 1
+    powers = 10 ** np.arange(HEADER_DIGITS - 1, -1, -1, dtype=np.int64)
+
+    with open(path, "wb") as f:
+        for chunk, first in enumerate(range(0, reads, CHUNK_READS)):
+            n = min(CHUNK_READS, reads - first)
+            rng = np.random.default_rng([seed, 1, chunk])
+
+            seqs = np.tile(template, (n, 1))
+            from_library = rng.random(n) < library_fraction
+            variants = np.minimum(np.searchsorted(cumulative, rng.random(int(from_library.sum()))), len(inserts) - 1)
+            seqs[from_library, start:start + INSERT_LENGTH] = inserts[variants]
+            seqs[~from_library, start:start + INSERT_LENGTH] = BASES[rng.integers(0, 4, (int((~from_library).sum()), INSERT_LENGTH))]
+
+            flat = seqs.reshape(-1)
+            errors = rng.integers(0, flat.size, rng.binomial(flat.size, error_rate))
+            flat[errors] = BASES[(BASE_INDEX[flat[errors]] + rng.integers(1, 4, errors.size)) % 4]
+
+            reverse = rng.random(n) < reverse_fraction
+            seqs[reverse] = COMPLEMENT[seqs[reverse, ::-1]]
+
+            quality = rng.integers(*GOOD_QUALITY, (n, READ_LENGTH), dtype=np.uint8)
+            low = rng.random(n) < low_quality_fraction
+            quality[low] = rng.integers(*LOW_QUALITY, (int(low.sum()), READ_LENGTH), dtype=np.uint8)
+
+            record = np.empty((n, record_length), dtype=np.uint8)
+            ids = np.arange(first, first + n, dtype=np.int64)
+            record[:, 0:2] = np.frombuffer(b"@r", dtype=np.uint8)
+            record[:, 2:2 + HEADER_DIGITS] = (ids[:, None] // powers) % 10 + ord("0")
+            offset = header_length
+            record[:, offset - 1] = ord("\n")
+            record[:, offset:offset + READ_LENGTH] = seqs
+            offset += READ_LENGTH
+            record[:, offset:offset + 3] = np.frombuffer(b"\n+\n", dtype=np.uint8)
+            offset += 3
+            record[:, offset:offset + READ_LENGTH] = quality + 33
+            record[:, -1] = ord("\n")
+            record.tofile(f)
+
+"""
+dataset: str, int, int, int, float --> str, str
+-- Library and FASTQ for a benchmark, generated once and reused
+* @param [in] folder (str) - Folder holding generated data
+* @param [in] reads (int) - Number of reads
+* @param [in] library_size (int) - Number of variants
+* @param [in] seed (int) - Random seed
+* @param [in] error_rate (float) - Substitutions per base
+* @param [out] library_path (str) - Capsid CSV
+* @param [out] fastq_path (str) - FASTQ file
+** File names carry the arguments, so different settings never collide
+"""
+def dataset(folder, reads, library_size, seed=0, error_rate=0.001):
+    os.makedirs(folder, exist_ok=True)
+    tag = f"lib{library_size}-seed{seed}"
+    library_path = os.path.join(folder, f"{tag}.csv")
+    fastq_path = os.path.join(folder, f"{tag}-reads{reads}-err{error_rate:g}.fastq")
+    library = make_library(library_size, seed)
+    if not os.path.exists(library_path):
+        write_library(library_path + ".tmp", library)
+        os.replace(library_path + ".tmp", library_path)
+    if not os.path.exists(fastq_path):
+        write_fastq(fastq_path + ".tmp", reads, library, seed, error_rate)
+        os.replace(fastq_path + ".tmp", fastq_path)
+    return library_path, fastq_path
+
+"""
+parse_count: str --> int
+-- Parses a read count such as 1M, 250k or 1000000
+"""
+def parse_count(text):
+    text = text.strip().lower()
+    scale = {"k": 10 ** 3, "m": 10 ** 6, "g": 10 ** 9}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic capsid library and FASTQ file")
+    parser.add_argument("out", help="Folder to write the library CSV and FASTQ file to")
+    parser.add_argument("--reads", type=parse_count, default=parse_count("1M"), help="Number of reads, e.g. 1M")
+    parser.add_argument("--library", type=int, default=100, help="Number of library variants")
+    parser.add_argument("--error-rate", type=float, default=0.001, help="Substitutions per base")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    library_path, fastq_path = dataset(args.out, args.reads, args.library, args.seed, args.error_rate)
+    print(f"library: {library_path}")
+    print(f"reads:   {fastq_path} ({os.path.getsize(fastq_path) / 1e6:.0f} MB)")
+    print(f"refseq:  {REFSEQ}")
+    print(f"flanks:  {FLANK1} {FLANK2}")
+
+if __name__ == "__main__":
+    main()
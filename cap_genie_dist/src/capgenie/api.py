@@ -0,0 +1,65 @@
+# Library entry point of the pipeline.
+# run() takes a PipelineOptions instead of command line arguments and
+# reports progress as progress.ProgressEvent objects, so the pipeline can
+# run inside a long-lived process (e.g. a web app worker) without building
+# argv or parsing printed output.
+
+from argparse import Namespace
+from dataclasses import dataclass
+
+from capgenie.cli import cap_genie # See cli.py for implementation
+
+
+@dataclass
+class PipelineOptions:
+    # Nested folder of FASTQ studies and the session to write results to
+    folder: str
+    session: str
+    # Known variants: library CSV and allowed mismatches
+    capsid_file: str = None
+    mismatches: int = 0
+    mismatch_type: str = None
+    # Unknown variants: flanks or a reference sequence
+    unknown_variants: bool = False
+    flank1: str = None
+    flank2: str = None
+    refseq: str = None
+    enrichment_file: str = None
+    quality_threshold: int = None
+    spreadsheet_extension: str = "none"
+    bubble: bool = False
+    bubble_export: bool = False
+    freq_distribution: bool = False
+    motif: bool = False
+    motif_clustering: str = "auto"
+    output: str = None
+    count_cache_mb: int = 2048
+    jobs: int = 1
+
+    """
+    to_args: None --> Namespace
+    -- Converts the options to the arguments cli.parser would produce
+    * @param [out] args (Namespace) - Arguments for cap_genie
+    ** Maps option names to command line destinations
+    """
+    def to_args(self):
+        return Namespace(capsidfile=self.capsid_file, mismatches=self.mismatches or None, mtype=self.mismatch_type,
+                         folder=self.folder, output=self.output, unknownvariants=self.unknown_variants,
+                         flank1=self.flank1, flank2=self.flank2, refseq=self.refseq,
+                         spreadsheet_extension=self.spreadsheet_extension, enrichment=self.enrichment_file,
+                         bubble=self.bubble, bubble_export=self.bubble_export, freq_distribution=self.freq_distribution,
+                         quality_threshold=self.quality_threshold or False, clear_cache=False,
+                         session=self.session, motif=self.motif, motif_clustering=self.motif_clustering,
+                         count_cache=self.count_cache_mb, jobs=self.jobs)
+
+
+"""
+run: PipelineOptions, callable --> str
+-- Runs the pipeline in this process
+* @param [in] options (PipelineOptions) - What to count and which outputs to create
+* @param [in] on_progress (callable) - Optional, called with each progress.ProgressEvent
+* @param [out] session_path (str) - Folder of the session's results
+** Raises ValueError for invalid options
+"""
+def run(options, on_progress=None):
+    return cap_genie(options.to_args(), progress=on_progress).run_pipeline()
@@ -1,9 +1,11 @@
 import pandas as pd
 #import plotly.graph_objects as px 
-from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 from base64 import b64encode
 import os
 import numpy as np
+from capgenie.store import result_store
+from capgenie.curves import rank_abundance
 
 """
  * gen_bio_graphs: str, str, str, str --> None
@@ -13,22 +15,34 @@ import numpy as np
  * @param [in] dir (str) - Data directory name
  * @param [in] cache_folder (str) - Cache folder path
  * @param [out] None - Saves SVG files to freq_dir
-** Creates log-scale biodistribution plots for peptide frequency data
+** Creates log-scale rank-abundance plots for peptide frequency data,
+** drawn from at most curves.CURVE_POINTS points so the SVG size does not
+** grow with the library
 """
 def gen_bio_graphs(freq_dir, session_folder, dir, cache_folder):
-    normal_df = pd.read_pickle(os.path.join(cache_folder, session_folder, "pkl_files", dir, f"average_{dir}.pkl"))
-    normal_cols = normal_df.columns.tolist()
-
-    y = list(normal_df[normal_cols[-1]])
-    y = [f*100 for f in y]
-    x = range(len(y))
-    plt.figure(figsize=(10,6))
-    plt.title(f"average_{dir}.svg")
-    plt.plot(x,y)
-    plt.yscale("log")
-    plt.ylim(0.001, 10)
-    plt.ylabel("Percentage of Reads")
-    plt.xlabel("Peptide")
-    plt.fill_between(x, 0, y)
-    plt.savefig(os.path.join(freq_dir, f"average_{dir}.svg"), format="svg")
+    average = result_store(os.path.join(cache_folder, session_folder)).read_table(dir, f"average_{dir}")
+    draw_bio_graph(average, f"average_{dir}.svg", os.path.join(freq_dir, f"average_{dir}.svg"))
 
+"""
+ * draw_bio_graph: pa.Table, str, str --> None
+-- Draws the rank-abundance curve of an average table
+ * @param [in] average (pa.Table) - Average table with an "Average Decimal" column
+ * @param [in] title (str) - Chart title
+ * @param [in] path (str) - SVG file to write
+ * @param [out] None - Saves the SVG
+"""
+def draw_bio_graph(average, title, path):
+    y = average.column("Average Decimal").to_numpy(zero_copy_only=False) * 100
+    y = y[np.argsort(-y, kind="stable")]  # Most abundant first, NaN last
+    x, y = rank_abundance(y[~np.isnan(y)])
+    # A figure of its own rather than pyplot's global one, so charts can be drawn from several threads
+    figure = Figure(figsize=(10,6))
+    ax = figure.add_subplot()
+    ax.set_title(title)
+    ax.plot(x,y)
+    ax.set_yscale("log")
+    ax.set_ylim(0.001, 10)
+    ax.set_ylabel("Percentage of Reads")
+    ax.set_xlabel("Peptide")
+    ax.fill_between(x, 0, y)
+    figure.savefig(path, format="svg")
@@ -1,23 +1,17 @@
 import pandas as pd
-import plotly.graph_objects as px 
-from base64 import b64encode
 import os
+import json
 import random
 import numpy as np
 import warnings
+from capgenie.store import result_store
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-"""
- * kv_dict: pd.DataFrame, float --> dict
--- Converts a pandas DataFrame to a dictionary with optional factor multiplication
- * @param [in] df (pd.DataFrame) - DataFrame to convert
- * @param [in] factor (float) - Multiplication factor for values
- * @param [out] result (dict) - Dictionary with first column as keys and second column as values
-** Converts DataFrame to key-value dictionary
-"""
-def kv_dict(df, factor=1):
-    return {row[0]:row[1]*float(factor) for index,row in df.iterrows()}
+# Peptides shown in a bubble chart written by the pipeline
+BUBBLE_PEPTIDES = 500
+# Decimals kept in the JSON; plenty for plotting and keeps the file small
+BUBBLE_DECIMALS = 6
 
 """
  * Set_Color: any --> str
@@ -26,48 +20,111 @@ def kv_dict(df, factor=1):
  * @param [out] color (str) - Color string ("gray")
 ** Returns consistent color for plotting
 """
-def Set_Color(x):    
+def Set_Color(x):
     return "gray"
 
 """
- * gen_bubble_plots: str, str, str, str --> None
--- Generates bubble plots for enrichment data visualization
+ * bubble_data: pd.DataFrame, pd.DataFrame, int --> dict
+-- Joins an average table with its enrichment table into the columns of
+-- a bubble chart: one entry per peptide found in both
+ * @param [in] average_df (pd.DataFrame) - Average table indexed by peptide
+ * @param [in] enrichment_df (pd.DataFrame) - Average enrichment table indexed by peptide
+ * @param [in] limit (int) - Keep only the first rows of the average table (None for all)
+ * @param [out] data (dict) - {"peptides", "average", "enrichment"} lists in average table order
+** The last column of each table is plotted. Columnar lists map straight
+** onto typed arrays on the client.
+"""
+def bubble_data(average_df, enrichment_df, limit=None):
+    average = average_df.iloc[:limit, -1]
+    enrichment = enrichment_df.iloc[:, -1]
+    enrichment = enrichment[~enrichment.index.duplicated()]
+    joined = pd.DataFrame({"average": pd.to_numeric(average, errors="coerce"),
+                           "enrichment": pd.to_numeric(enrichment.reindex(average.index), errors="coerce")})
+    joined = joined[np.isfinite(joined["average"]) & np.isfinite(joined["enrichment"])]
+    return {
+        "peptides": joined.index.astype(str).tolist(),
+        "average": joined["average"].round(BUBBLE_DECIMALS).tolist(),
+        "enrichment": joined["enrichment"].round(BUBBLE_DECIMALS).tolist(),
+    }
+
+"""
+ * gen_bubble_plots: str, str, str, str, bool --> None
+-- Writes the bubble chart data of a data directory as compact JSON,
+-- which the viewer renders itself
  * @param [in] bubble_dir (str) - Directory to save bubble plots
  * @param [in] session_dir (str) - Session directory path
  * @param [in] dir (str) - Data directory name
  * @param [in] cache_folder (str) - Cache folder path
- * @param [out] None - Saves HTML and SVG files to bubble_dir
-** Creates interactive bubble plots for peptide enrichment data
+ * @param [in] export (bool) - Also save the chart as HTML and SVG
+ * @param [out] None - Saves <dir>_data.json (and HTML and SVG files) to bubble_dir
+** SVG export starts a headless renderer (kaleido), so it is opt-in
 """
-def gen_bubble_plots(bubble_dir, session_dir, dir, cache_folder):
-    
-    enrich_df = pd.read_pickle(os.path.join(cache_folder, session_dir, "pkl_files", dir, f"average_enrichment_{dir}.pkl"))
-    normal_df = pd.read_pickle(os.path.join(cache_folder, session_dir, "pkl_files", dir, f"average_{dir}.pkl"))
-    peptides = normal_df.index.tolist()[:500]
+def gen_bubble_plots(bubble_dir, session_dir, dir, cache_folder, export=False):
 
-    enrich_df = enrich_df.iloc[:, -1].to_dict()
-    normal_df = normal_df.iloc[:, -1].to_dict()
+    store = result_store(os.path.join(cache_folder, session_dir))
+    enrich_df = store.read(dir, f"average_enrichment_{dir}")
+    normal_df = store.read(dir, f"average_{dir}")
+    data = bubble_data(normal_df, enrich_df, limit=BUBBLE_PEPTIDES)
+    title = f"{dir}_data"
+
+    write_bubble_json(data, os.path.join(bubble_dir, title) + ".json")
+
+    if export:
+        export_bubble_plot(data, bubble_dir, title)
+
+"""
+ * write_bubble_json: dict, str --> None
+-- Saves bubble chart data as compact JSON
+ * @param [in] data (dict) - Output of bubble_data
+ * @param [in] path (str) - File to write
+"""
+def write_bubble_json(data, path):
+    with open(path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
 
-    temp =list(zip(peptides, [enrich_df[x] if x in enrich_df else 0 for x in peptides], [normal_df[x]*100 if x in normal_df else 0 for x in peptides]))
+"""
+ * export_bubble_plot: dict, str, str --> None
+-- Saves bubble chart data as an interactive HTML page and an SVG image
+ * @param [in] data (dict) - Output of bubble_data
+ * @param [in] bubble_dir (str) - Directory to save the files to
+ * @param [in] title (str) - Chart title and file name
+ * @param [out] None - Saves <title>.html and <title>.svg
+"""
+def export_bubble_plot(data, bubble_dir, title):
+    plot = bubble_figure(data, title)
+    plot.write_html(os.path.join(bubble_dir, title) + ".html")
+    plot.write_image(os.path.join(bubble_dir, title) + ".svg", format="svg", width=1920, height=1080)
+
+"""
+ * bubble_figure: dict, str --> plotly.graph_objects.Figure
+-- Builds the plotly bubble chart of bubble chart data
+ * @param [in] data (dict) - Output of bubble_data
+ * @param [in] title (str) - Chart title
+ * @param [out] plot (Figure) - The chart
+** Peptides are shuffled along the hidden x axis so bubbles spread out
+"""
+def bubble_figure(data, title):
+    import plotly.graph_objects as px # Only needed for static exports
+
+    temp = list(zip(data["peptides"], data["enrichment"], [x * 100 for x in data["average"]]))
     random.shuffle(temp)
 
-    peptides, enrichment, normals = zip(*temp)
+    peptides, enrichment, normals = zip(*temp) if temp else ((), (), ())
 
-    scale_factor = 10/np.mean(enrichment)
+    scale_factor = 10/np.mean(enrichment) if temp and np.mean(enrichment) else 1
 
-    plot = px.Figure(data=[px.Scatter( 
-        x = list(peptides), 
-        y = normals, 
+    plot = px.Figure(data=[px.Scatter(
+        x = list(peptides),
+        y = normals,
         mode = 'markers',
         marker_size = [x*scale_factor for x in list(enrichment)],
         marker_color=list(map(Set_Color, list(peptides))),
-        text = [f"{enrich_df[x]}" if x in enrich_df else "0" for x in peptides],
+        text = [f"{x}" for x in enrichment],
         hovertemplate =
-        '<b>Peptide</b>: %{x}<br>' + 
-        '<b>Enrichment Factor</b>: %{text}<br>'+ 
+        '<b>Peptide</b>: %{x}<br>' +
+        '<b>Enrichment Factor</b>: %{text}<br>'+
         '<b>Percentage</b>: %{y}<br>')
     ])
-    title = f"{dir}_data"
 
     plot.update_layout(
         title=dict(text=title, font=dict(size=35), automargin=True, yref='paper'),
@@ -85,6 +142,4 @@ def gen_bubble_plots(bubble_dir, session_dir, dir, cache_folder):
         plot_bgcolor='rgb(243, 243, 243)'
     )
     plot.update_xaxes(visible=False)
-
-    plot.write_html(os.path.join(bubble_dir, title) + ".html")
-    plot.write_image(os.path.join(bubble_dir, title) + ".svg", format="svg", width=1920, height=1080)
\ No newline at end of file
+    return plot
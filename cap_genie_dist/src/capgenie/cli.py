@@ -1,11 +1,20 @@
-from capgenie.bubble import gen_bubble_plots # See bubble.py for implementation
-from capgenie.biodistribution import gen_bio_graphs # See biodistribution.py for implementation
-from capgenie.motif import Motif
+# Plotting and motif modules (plotly, matplotlib, umap, sklearn, logomaker)
+# are imported by the stages that use them, see plot_bubbles/plot_distribution
 import os
+import sys
+import json
+import time
 import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
 from capgenie.search_aav9 import search_aav9 # See search_aav9.py for implementation
 from capgenie.enrichment import enrichment # See enrichment.py for implementation
 from capgenie.spreadsheet import spreadsheet # See spreadsheet.py for implementation
+from capgenie.count_cache import count_cache # See count_cache.py for implementation
+from capgenie import progress # See progress.py for implementation
+from capgenie.stages import stage_graph, CPU, IO, LOCAL # See stages.py for implementation
 from capgenie import mani # See mani.cpp for implementation
 from capgenie import denoise # See denoise.cpp for implementation
 
@@ -30,14 +39,23 @@ parser.add_argument("-f1", "--flank1", help="Optional flag 1 for unknown variant
 parser.add_argument("-f2", "--flank2", help="Optional flag 2 for unknown variants")
 parser.add_argument("-rf", "--refseq", help="Optional flag 2 for unknown variants")
 
-parser.add_argument("-s", "--spreadsheet_extension", help="File extension of spreadsheet files (Excel or CSV)", default="Excel")
+parser.add_argument("-s", "--spreadsheet_extension", help="File format of spreadsheet files (Excel, CSV, Parquet or none)", default="Excel")
 parser.add_argument("-e", "--enrichment", help="Enrichment File path")
 parser.add_argument("-b", "--bubble", help="Generate bubble charts", action="store_true")
+parser.add_argument("-bx", "--bubble_export", help="Also export bubble charts as HTML and SVG (starts a headless renderer)", action="store_true")
 parser.add_argument("-fd", "--freq_distribution", help="Generate frequency distribution charts", action="store_true")
 parser.add_argument("-qual", "--quality_threshold", help="Quality threshold for denoising fastq files", default=False)
 parser.add_argument("-cls", "--clear_cache", help="This option clears all cache", action="store_true")
 parser.add_argument("-ses", "--session", help="DESKTOP: overrides the session name so no command utility is asked")
 parser.add_argument("-mot", "--motif", help="Find motifs in capsid file", action="store_true")
+parser.add_argument("-mcl", "--motif_clustering", help="Motif clustering: umap, hamming (scales to large libraries) or auto (umap up to 20000 sequences)", choices=["auto", "umap", "hamming"], default="auto")
+parser.add_argument("-cc", "--count_cache", help="Size limit of the per-file count cache in MB, 0 disables it", type=int, default=2048)
+parser.add_argument("-j", "--jobs", help="Number of worker processes for counting, averages, enrichment and denoising; exports and plots run alongside on up to 4 threads", type=int, default=1)
+
+# Threads of the IO stages (exports and plots), at most one per job
+IO_THREADS = 4
+# Per-stage timings of the last run, in the session folder
+STAGE_TIMINGS = "stage_timings.json"
 
 class color:
    PURPLE = '\033[95m'
@@ -52,8 +70,10 @@ class color:
    END = '\033[0m'
 
 class cap_genie:
-    def __init__(self, args):
+    def __init__(self, args, progress=None):
         self.args = args
+        # Optional callable that receives a progress.ProgressEvent for every step
+        self.progress = progress
 
         # Processes all the args
 
@@ -63,17 +83,30 @@ class cap_genie:
         self.spreadsheet_extension = self.args.spreadsheet_extension
         self.quality_threshold = self.args.quality_threshold
         self.bubble = self.args.bubble
+        self.bubble_export = self.args.bubble_export
         self.freq_distribution = self.args.freq_distribution
         self.session_name = self.args.session
         self.run_motif = self.args.motif
+        self.motif_clustering = self.args.motif_clustering
+        self.jobs = self.args.jobs
+
+        if self.jobs < 1:
+            raise ValueError("-j/--jobs must be at least 1.")
+
+        spreadsheet.file_extension(self.spreadsheet_extension)
+
+        self.count_cache = None
+        if self.args.count_cache > 0:
+            self.count_cache = count_cache(self.count_cache_root(), self.args.count_cache * 1024 * 1024)
 
         if self.args.clear_cache:
             mani.clear_cache_folder()
+            count_cache(self.count_cache_root(), 0).clear()
             print("Cleared Cache!")
             quit()
 
         if not self.args.capsidfile and not self.args.unknownvariants:
-            parser.error("Either -cf/--capsidfile or -unk/--unknownvariants must be provided.")
+            raise ValueError("Either -cf/--capsidfile or -unk/--unknownvariants must be provided.")
         else:
             self.capsid_file = self.args.capsidfile
             self.unknown_variants = self.args.unknownvariants
@@ -94,6 +127,133 @@ class cap_genie:
 
         self.denoised_dirs = []
 
+        # Running totals of the current stage, see progress.ProgressEvent.
+        # Bytes and reads scanned are shared with worker processes, which
+        # add to them as the native engines report progress.
+        self.stage = None
+        self.files_done = self.files_total = 0
+        self.bytes_total = 0
+        self.stage_started = None
+        self.counters = multiprocessing.Array("q", 2)
+        self.watcher = None
+
+    """
+    __getstate__: None --> dict
+    -- Leaves the progress callback, the shared counters and the watcher
+    -- out when the pipeline is sent to worker processes; workers get the
+    -- counters from _init_worker and the parent process reports progress
+    * @param [out] state (dict) - Picklable attributes
+    ** Pickling support for --jobs
+    """
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["progress"] = None
+        state["counters"] = None
+        state["watcher"] = None
+        return state
+
+    """
+    report: str, str, **any --> None
+    -- Sends a progress event with the current counting totals to the
+    -- progress callback, if there is one
+    * @param [in] stage (str) - Pipeline stage, see progress.py
+    * @param [in] message (str) - Human readable description
+    * @param [in] fields (dict) - Other ProgressEvent fields, e.g. file
+    * @param [out] None - Calls the progress callback
+    ** Structured progress reporting
+    """
+    def report(self, stage, message="", **fields):
+        if self.progress is None:
+            return
+        bytes_done, reads_done = self.counters[:]
+        bytes_per_second = eta_seconds = None
+        if stage == self.stage and bytes_done:
+            elapsed = time.monotonic() - self.stage_started
+            bytes_per_second = bytes_done / elapsed if elapsed else None
+            if bytes_per_second:
+                eta_seconds = max(self.bytes_total - bytes_done, 0) / bytes_per_second
+        self.progress(progress.ProgressEvent(stage, message, files_done=self.files_done, files_total=self.files_total,
+                                             bytes_done=bytes_done, bytes_total=self.bytes_total, reads_done=reads_done,
+                                             bytes_per_second=bytes_per_second, eta_seconds=eta_seconds, **fields))
+
+    """
+    start_stage: str, list --> None
+    -- Resets the running totals for a stage that scans the given files
+    * @param [in] stage (str) - Pipeline stage, see progress.py
+    * @param [in] file_paths (list) - FASTQ files the stage reads
+    * @param [out] None - Resets files, bytes and reads done
+    ** Throughput and ETA are measured from here
+    """
+    def start_stage(self, stage, file_paths):
+        self.stage = stage
+        self.files_done = 0
+        self.files_total = len(file_paths)
+        self.bytes_total = sum(os.path.getsize(path) for path in file_paths)
+        with self.counters.get_lock():
+            self.counters[:] = [0, 0]
+        self.stage_started = time.monotonic()
+
+    """
+    watch_progress: threading.Event --> None
+    -- Reports the shared counters of the current stage every
+    -- progress.TICK_INTERVAL seconds while they change
+    * @param [in] stop (threading.Event) - Set when the run is over
+    * @param [out] None - Calls the progress callback
+    ** Runs in a thread of the parent process
+    """
+    def watch_progress(self, stop):
+        last = None
+        while not stop.wait(progress.TICK_INTERVAL):
+            current = (self.stage, *self.counters[:])
+            if self.stage in (progress.DENOISE, progress.COUNT) and current[1] and current != last:
+                last = current
+                self.report(self.stage, tick=True)
+
+    """
+    file_counted: search_aav9, str, str, str --> None
+    -- Adds a counted file to the running totals and reports it
+    * @param [in] instance (search_aav9) - Search AAV9 instance
+    * @param [in] file (str) - FASTQ file name
+    * @param [in] file_path (str) - Path to the FASTQ file
+    * @param [in] data_directory (str) - Data directory name
+    * @param [out] None - Updates totals and calls the progress callback
+    ** Runs in the parent process, also for --jobs
+    """
+    def file_counted(self, instance, file, file_path, data_directory):
+        self.files_done += 1
+        self.report(progress.COUNT, f"Finished {file}", directory=data_directory, file=file, finished=True)
+
+    """
+    count_cache_root: None --> str
+    -- Returns the folder of the count cache, next to the session cache
+    -- so it is shared by every session
+    * @param [out] path (str) - Count cache folder
+    ** Resolves the count cache location
+    """
+    def count_cache_root(self):
+        return os.path.join(os.path.dirname(os.path.expanduser(mani.get_cache_folder())), count_cache.DIR_NAME)
+
+    """
+    count_key: str --> str
+    -- Builds the count cache key of a FASTQ file from everything its
+    -- count table depends on
+    * @param [in] file_path (str) - Path to the FASTQ file being counted
+    * @param [out] key (str) - Cache key
+    ** Content address of a file's count table
+    """
+    def count_key(self, file_path):
+        if self.capsid_file:
+            mode = "count_known_reads" if self.mismatches else "fuzzy_match"
+            options = {"library": self.library_digest, "mismatches": self.mismatches}
+        elif self._run_flank:
+            mode = "search_by_flank"
+            options = {"flanks": [self.upstream, self.downstream]}
+        else:
+            mode = "filter_count"
+            options = {"refseq": self.ref_seq}
+        return count_cache.key(file=count_cache.file_digest(file_path), mode=mode,
+                               quality_threshold=self.quality_threshold or None, **options)
+
     """
     get_files: None --> list
     -- Gets all FASTQ files from the nested directory structure
@@ -124,36 +284,320 @@ class cap_genie:
         else:
             self.dirs = [os.path.basename(dir) for dir in os.listdir(self.nested_dir) if dir != ".DS_Store"]
     """
+    fastq_files: str --> list
+    -- Lists the FASTQ files of a data directory in directory order
+    * @param [in] dir (str) - Data directory, relative to the nested folder or absolute
+    * @param [out] files (list) - FASTQ file names
+    ** Lists the files a directory contributes to the run
+    """
+    def fastq_files(self, dir):
+        return [file for file in os.listdir(os.path.join(self.nested_dir, dir)) if file.endswith(".fastq")]
+
+    """
     denoise_files: search_aav9 --> None
-    -- Denoises FASTQ files using quality threshold
+    -- Denoises FASTQ files using quality threshold. With --jobs the
+    -- files are denoised in a process pool; results are recorded in
+    -- file order so the session matches a serial run.
     * @param [in] instance (search_aav9) - Search AAV9 instance
     * @param [out] None - Denoises files and saves results
     ** Filters low-quality reads from FASTQ files
     """
     def denoise_files(self, instance):
+        tasks = []
         for dir in self.dirs:
-            for file in os.listdir(os.path.join(self.nested_dir, dir)):
-                if file.endswith(".fastq"):
-                    file_path = os.path.join(self.nested_dir, dir, file)
-                    new_dir = os.path.join(instance._cache_folder, instance.save_dir, "denoised_"+ dir)
-                    print(new_dir)
-                    if not os.path.exists(new_dir):
-                        os.makedirs(new_dir)
-                        self.denoised_dirs.append(new_dir)
-                    
-                    result = denoise.denoise(file.encode(), file_path.encode(), new_dir.encode(), int(self.quality_threshold))
-                    spliced_enrichment_file = os.path.normpath(self.enrichment_file).split(os.sep)
-                    if os.path.join(*spliced_enrichment_file[-2:]) == os.path.join(dir, file):
-                        self.enrichment_file = result.output_filename
-                    instance.save_denoise_result(result, file)
-                    print(f"Denoised {file}, saved under {os.path.join(new_dir, file)}.")
-    """
-    run_pipeline: None --> None
+            for file in self.fastq_files(dir):
+                file_path = os.path.join(self.nested_dir, dir, file)
+                new_dir = os.path.join(instance._cache_folder, instance.save_dir, "denoised_"+ dir)
+                print(new_dir)
+                if not os.path.exists(new_dir):
+                    os.makedirs(new_dir)
+                    self.denoised_dirs.append(new_dir)
+                tasks.append((dir, file, file_path, new_dir))
+
+        self.start_stage(progress.DENOISE, [file_path for _, _, file_path, _ in tasks])
+        args = [(file, file_path, new_dir, int(self.quality_threshold)) for _, file, file_path, new_dir in tasks]
+        if self.jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(self.counters,)) as pool:
+                results = list(pool.map(_denoise_file, *zip(*args)))
+        else:
+            results = [_denoise_file(*arg, counters=self.counters) for arg in args]
+
+        for (dir, file, file_path, new_dir), result in zip(tasks, results):
+            if self.enrichment_file:
+                spliced_enrichment_file = os.path.normpath(self.enrichment_file).split(os.sep)
+                if os.path.join(*spliced_enrichment_file[-2:]) == os.path.join(dir, file):
+                    self.enrichment_file = result.output_filename
+            instance.save_denoise_result(result, file)
+            self.files_done += 1
+            print(f"Denoised {file}, saved under {os.path.join(new_dir, file)}.")
+            self.report(progress.DENOISE, f"Denoised {file}", directory=dir, file=file, finished=True)
+
+    """
+    count_file: search_aav9, dict, str, str, bool --> str
+    -- Counts the reads of one FASTQ file with the counting method
+    -- selected on the command line. Files whose contents and counting
+    -- options are unchanged are restored from the count cache.
+    * @param [in] instance (search_aav9) - Search AAV9 instance
+    * @param [in] peptide_map (dict) - Map of peptides to sequences, None for unknown variants
+    * @param [in] file_path (str) - Path to the FASTQ file
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] record (bool) - Whether to record the table in the run manifest
+    * @param [in] tracker (_progress_tracker) - Optional, adds the bytes and reads scanned to the totals
+    * @param [out] table_path (str) - Session-relative path of the count table
+    ** Dispatches a file to the matching counting method
+    """
+    def count_file(self, instance, peptide_map, file_path, data_directory, record=True, tracker=None):
+        if self.count_cache is None:
+            return self._count_file(instance, peptide_map, file_path, data_directory, record, tracker)
+
+        file_ext = "variants_" if self.capsid_file else "unknown_variants_"
+        name = f"{file_ext}{os.path.basename(file_path)}"
+        key = self.count_key(file_path)
+        if self.count_cache.get(key, instance.store.table_path(data_directory, name)):
+            print(f"Reused cached counts for {os.path.basename(file_path)}")
+            table_path = instance.store.relative_path(data_directory, name)
+            if record:
+                instance.record_result("count_known_reads" if self.capsid_file else "unknown_reads", table_path)
+            return table_path
+
+        table_path = self._count_file(instance, peptide_map, file_path, data_directory, record, tracker)
+        self.count_cache.put(key, instance.store.table_path(data_directory, name))
+        return table_path
+
+    """
+    _count_file: search_aav9, dict, str, str, bool --> str
+    -- Counts a FASTQ file without consulting the count cache
+    * @param [in] instance (search_aav9) - Search AAV9 instance
+    * @param [in] peptide_map (dict) - Map of peptides to sequences, None for unknown variants
+    * @param [in] file_path (str) - Path to the FASTQ file
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] record (bool) - Whether to record the table in the run manifest
+    * @param [in] tracker (_progress_tracker) - Optional, adds the bytes and reads scanned to the totals
+    * @param [out] table_path (str) - Session-relative path of the count table
+    ** Dispatches a file to the matching counting method
+    """
+    def _count_file(self, instance, peptide_map, file_path, data_directory, record=True, tracker=None):
+        if self.capsid_file:
+            if self.mismatches:
+                return instance.count_known_reads(peptide_map, file_path, data_directory, record=record, progress=tracker)
+            return instance._cpp_fuzzy_match(peptide_map, file_path, data_directory, 0, subOnly=True, record=record, progress=tracker)
+        if self._run_flank:
+            return instance.search_by_flank(self.upstream, self.downstream, file_path, data_directory, record=record, progress=tracker)
+        return instance._cpp_filter_count(data_directory, file_path, self.ref_seq, record=record, progress=tracker)
+
+    """
+    process_file: search_aav9, dict, str, str, str --> str
+    -- Count stage: counts one FASTQ file
+    * @param [in] instance (search_aav9) - Search AAV9 instance
+    * @param [in] peptide_map (dict) - Map of peptides to sequences, None for unknown variants
+    * @param [in] file (str) - FASTQ file name
+    * @param [in] file_path (str) - Path to the FASTQ file
+    * @param [in] data_directory (str) - Data directory name
+    * @param [out] table_path (str) - Session-relative path of the count table
+    ** Runs in a worker process with --jobs. The table is recorded in the
+    ** run manifest later, in directory order, see build_stages.
+    """
+    def process_file(self, instance, peptide_map, file, file_path, data_directory):
+        tracker = _progress_tracker(file_path, self.counters if self.counters is not None else _counters)
+        table_path = self.count_file(instance, peptide_map, file_path, data_directory, False, tracker)
+        # Cached files are not scanned; count them as done in one step
+        tracker.finish()
+        return table_path
+
+    """
+    plot_bubbles: str, str, str --> None
+    -- Plot stage: bubble charts of a data directory
+    * @param [in] session_folder (str) - Session folder name
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] cache_folder (str) - Cache folder path
+    """
+    def plot_bubbles(self, session_folder, data_directory, cache_folder):
+        from capgenie.bubble import gen_bubble_plots # See bubble.py for implementation
+        gen_bubble_plots(self.bubble_dir, session_folder, data_directory, cache_folder, export=self.bubble_export)
+
+    """
+    plot_distribution: str, str, str --> None
+    -- Plot stage: frequency distribution chart of a data directory
+    * @param [in] session_folder (str) - Session folder name
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] cache_folder (str) - Cache folder path
+    """
+    def plot_distribution(self, session_folder, data_directory, cache_folder):
+        from capgenie.biodistribution import gen_bio_graphs # See biodistribution.py for implementation
+        gen_bio_graphs(self.freq_dir, session_folder, data_directory, cache_folder)
+
+    """
+    build_stages: search_aav9, spreadsheet, enrichment, str, dict, list, str --> stage_graph
+    -- Lays the counting and reduction of every directory out as stages:
+    -- count each file (CPU) and export its table (IO); once a directory
+    -- is counted, record its tables, then average (CPU) and enrichment
+    -- (CPU, also after the pre-insert file), their exports (IO) and the
+    -- plots (IO)
+    * @param [in] instance (search_aav9) - Search AAV9 instance
+    * @param [in] spreadsheet_instance (spreadsheet) - Spreadsheet exporter
+    * @param [in] enrichment_instance (enrichment) - Enrichment calculator
+    * @param [in] session_folder (str) - Session folder name
+    * @param [in] peptide_map (dict) - Map of peptides to sequences, None for unknown variants
+    * @param [in] dirs_to_use (list) - Data directories to process
+    * @param [in] instructions_link (str) - Manifest key of the count tables
+    * @param [out] graph (stage_graph) - Stages of the run
+    ** Count tables are recorded directory by directory in file order, so
+    ** the session is identical whatever order the stages finish in
+    """
+    def build_stages(self, instance, spreadsheet_instance, enrichment_instance, session_folder, peptide_map, dirs_to_use, instructions_link):
+        graph = stage_graph()
+        counted = {}
+        directories = [(os.path.basename(dir), dir, self.fastq_files(dir)) for dir in dirs_to_use]
+
+        def file_done(data_directory, file, file_path, table_path):
+            counted[data_directory][file] = table_path
+            print(f"Finished {file}", flush=True)
+            self.file_counted(instance, file, file_path, data_directory)
+
+        def record(data_directory, files):
+            for file in files:
+                instance.record_result(instructions_link, counted[data_directory][file])
+            self.report(progress.REDUCE, f"Reducing {data_directory}", directory=data_directory)
+
+        def announce(message):
+            return lambda _: print(message, flush=True)
+
+        def file_started(data_directory, file, file_path):
+            print(f"Currently processing {file} ({mani.fastq_file_size(file_path)})", flush=True)
+            self.report(progress.COUNT, f"Processing {file}", directory=data_directory, file=file)
+
+        # Every count first, as the enrichment of a directory may need a file
+        # of a later one. Priorities keep the stages of earlier directories
+        # ahead, so a counted directory is reduced before later ones count.
+        for priority, (data_directory, dir, files) in enumerate(directories):
+            counted[data_directory] = {}
+            for file in files:
+                file_path = os.path.join(self.nested_dir, dir, file)
+                graph.add(f"count:{data_directory}/{file}", self.process_file, instance, peptide_map, file, file_path, data_directory,
+                          priority=priority, on_start=lambda d=data_directory, f=file, p=file_path: file_started(d, f, p),
+                          on_done=lambda table_path, d=data_directory, f=file, p=file_path: file_done(d, f, p, table_path))
+
+        # Enrichment of every directory needs the pre-insert file's counts
+        pre_insert = ()
+        if self.enrichment_file:
+            name = f"count:{os.path.basename(os.path.dirname(self.enrichment_file))}/{os.path.basename(self.enrichment_file)}"
+            pre_insert = (name,) if name in graph.stages else ()
+
+        previous = ()
+        for priority, (data_directory, dir, files) in enumerate(directories):
+            def add(name, func, *args, **kwargs):
+                reductions.append(graph.add(name, func, *args, priority=priority, **kwargs))
+                return reductions[-1]
+
+            reductions = []
+            counts = [f"count:{data_directory}/{file}" for file in files]
+            for file, count in zip(files, counts):
+                add(f"export:{data_directory}/{file}", spreadsheet_instance.save_file, instance.store, file, data_directory, instructions_link,
+                    after=(count,), pool=IO)
+            # Chained, so directories are recorded in order
+            recorded = add(f"record:{data_directory}", record, data_directory, files, after=(*counts, *previous), pool=LOCAL)
+            previous = (recorded,)
+
+            tables = []
+            if len(files) > 1:
+                tables.append(add(f"average:{data_directory}", instance.create_avg_pkl, data_directory, files, instructions_link, after=(recorded,),
+                                  on_done=announce(f"Created average table/xlsx: {data_directory}")))
+                add(f"export:{data_directory}/average", spreadsheet_instance.save_file, instance.store, f"average_{data_directory}.fastq",
+                    data_directory, instructions_link, avg_file=True, after=tables[-1:], pool=IO)
+            if self.enrichment_file:
+                tables.append(add(f"enrichment:{data_directory}", enrichment_instance.calc_enrichment, self.enrichment_file, session_folder, files,
+                                  data_directory, instructions_link, after=(recorded, *pre_insert),
+                                  on_done=announce(f"Calculated enrichment: {data_directory}")))
+                add(f"export:{data_directory}/average_enrichment", spreadsheet_instance.save_file, instance.store, f"average_enrichment_{data_directory}.fastq",
+                    data_directory, instructions_link, avg_file=True, after=tables[-1:], pool=IO,
+                    on_done=announce(f"Created average enrichment table/xlsx: {data_directory}"))
+            if self.bubble:
+                add(f"bubble:{data_directory}", self.plot_bubbles, session_folder, data_directory, instance._cache_folder, after=(recorded, *tables),
+                    pool=IO, on_done=announce(f"Created bubble charts: {data_directory}"))
+            if self.freq_distribution:
+                add(f"distribution:{data_directory}", self.plot_distribution, session_folder, data_directory, instance._cache_folder, after=(recorded, *tables),
+                    pool=IO, on_done=announce(f"Created frequency distribution charts: {data_directory}"))
+
+            graph.add(f"reduced:{data_directory}", self.report, progress.REDUCE, f"Reduced {data_directory}", directory=data_directory,
+                      finished=True, after=reductions, pool=LOCAL, priority=priority)
+        return graph
+
+    """
+    run_stages: stage_graph, str --> None
+    -- Runs the stages on a CPU pool of --jobs workers and an IO thread pool
+    -- and saves how long each stage took
+    * @param [in] graph (stage_graph) - Stages of the run
+    * @param [in] session_path (str) - Session folder, receives stage_timings.json
+    * @param [out] None - Runs every stage
+    ** With --jobs 1 the CPU stages run on one thread instead of a process
+    """
+    def run_stages(self, graph, session_path):
+        io_threads = min(self.jobs, IO_THREADS)
+        if self.jobs > 1:
+            cpu = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(self.counters,))
+        else:
+            cpu = ThreadPoolExecutor(max_workers=1)
+        with cpu, ThreadPoolExecutor(max_workers=io_threads) as io:
+            graph.run({CPU: (cpu, self.jobs), IO: (io, io_threads)})
+
+        with open(os.path.join(session_path, STAGE_TIMINGS), "w") as f:
+            json.dump([{"stage": t.name, "pool": t.pool, "start": round(t.start, 3), "seconds": round(t.seconds, 3)}
+                       for t in graph.timings], f, indent=1)
+        print(color.BOLD + "Stage timings" + color.END)
+        for kind, count, seconds in graph.summary():
+            print(f"-- {kind}: {seconds:.2f}s over {count} stage{'s' if count != 1 else ''}")
+
+    """
+    run_pipeline: None --> str
     -- Main pipeline execution method that processes all selected files
-    * @param [out] None - Executes the complete pipeline workflow
+    * @param [out] session_path (str) - Folder of the session's results
     ** Orchestrates the entire CAPGENIE pipeline workflow
     """
     def run_pipeline(self):
+        if self.progress is None:
+            return self._run_pipeline()
+        stop = threading.Event()
+        self.watcher = threading.Thread(target=self.watch_progress, args=(stop,), daemon=True)
+        self.watcher.start()
+        try:
+            return self._run_pipeline()
+        finally:
+            stop.set()
+            self.watcher.join()
+            self.watcher = None
+
+    """
+    motif_weights: search_aav9, list, list --> np.ndarray
+    -- Weight of each library peptide in the motif logo: its share of the
+    -- reads, averaged over every counted file
+    * @param [in] instance (search_aav9) - Session the counts were saved to
+    * @param [in] peptides (list) - Peptides of the library, in motif order
+    * @param [in] dirs_to_use (list) - Counted data directories
+    * @param [out] weights (np.ndarray) - One weight per peptide
+    ** Uniform when no peptide was read, so the logo still shows the library
+    """
+    def motif_weights(self, instance, peptides, dirs_to_use):
+        import numpy as np
+        totals = dict.fromkeys(peptides, 0.0)
+        files = 0
+        for dir in dirs_to_use:
+            data_directory = os.path.basename(dir)
+            for file in self.fastq_files(dir):
+                table = instance.store.read(data_directory, f"variants_{file}", columns=["Peptide", "Decimal"])
+                for peptide, share in zip(table.Peptide, table.Decimal):
+                    if peptide in totals:
+                        totals[peptide] += share
+                files += 1
+        weights = np.array([totals[peptide] for peptide in peptides]) / max(files, 1)
+        return weights if weights.sum() > 0 else None
+
+    """
+    _run_pipeline: None --> str
+    -- Runs the stages of the pipeline, see run_pipeline
+    * @param [out] session_path (str) - Folder of the session's results
+    ** Orchestrates the entire CAPGENIE pipeline workflow
+    """
+    def _run_pipeline(self):
         instance = search_aav9()
 
         if self.session_name:
@@ -167,8 +611,8 @@ class cap_genie:
                 self.ref_seq = self.args.refseq
             else:
                 self._run_flank = True
-                upstream = self.flanks[0]
-                downstream = self.flanks[1]
+                self.upstream = self.flanks[0]
+                self.downstream = self.flanks[1]
 
         session_folder = instance.save_dir
 
@@ -180,7 +624,7 @@ class cap_genie:
 
         new_dirs.extend([self.sheets_dir, self.bubble_dir, self.freq_dir])
 
-        spreadsheet_instance = spreadsheet(session_folder, self.sheets_dir, instance._cache_folder)
+        spreadsheet_instance = spreadsheet(session_folder, self.sheets_dir, instance._cache_folder, self.spreadsheet_extension)
         enrichment_instance = enrichment(session_folder, self.sheets_dir, instance._cache_folder)
 
         for new_dir in new_dirs:
@@ -194,22 +638,23 @@ class cap_genie:
             self.denoise_files(instance)
 
         instructions_link = ""
+        peptide_map = None
 
         if self.capsid_file:
             instructions_link = "count_known_reads"
             peptide_map = search_aav9.create_peptide_map(self.capsid_file)
+            self.library_digest = count_cache.file_digest(self.capsid_file)
             print("Here's the capsid file imported: ")
             mani.pprint_csv(self.capsid_file)
             #input("Press enter to run pipeline: ")
             print(self.run_motif)
             if self.run_motif:
                 print(color.BOLD + "Finding Motifs" + color.END)
+                self.report(progress.MOTIF, "Finding motifs")
                 save_dir = os.path.join(instance._cache_folder, instance._save_dir)
-                motif = Motif(list(peptide_map.values()), True)
-                motif.get_motifs(save_dir)
-                print(color.BOLD + "Creating Motif Logo" + color.END)
-                motif.createMotifLogo(f"{save_dir}")
-                print(f"Motif Logo saved to: {save_dir}")
+                from capgenie.motif import Motif # See motif.py for implementation
+                motif = Motif(list(peptide_map.values()), True, self.motif_clustering)
+                motif.get_motifs(save_dir, jobs=self.jobs)
             print(color.BOLD + "Searching for known reads" + color.END)
 
         else:
@@ -218,50 +663,112 @@ class cap_genie:
 
         dirs_to_use = self.denoised_dirs if self.quality_threshold else self.dirs
 
-        for dir in dirs_to_use: # Goes through every directory
-            files = []
-            data_directory = os.path.basename(dir)
-            for file in os.listdir(os.path.join(self.nested_dir, dir)):
-                if file.endswith(".fastq"):
-                    file_path = os.path.join(self.nested_dir, dir, file)
-                    print(f"Currently processing {file} ({mani.fastq_file_size(file_path)})")
-                    if self.capsid_file:
-                        if self.mismatches:
-                            instance.count_known_reads(peptide_map, file_path, data_directory)
-                        else:
-                            instance._cpp_fuzzy_match(peptide_map, file_path, data_directory, 0, subOnly=True)
-                    else:
-                        if self._run_flank:
-                            instance.search_by_flank(upstream, downstream, file_path, data_directory)
-                        else:
-                            instance._cpp_filter_count(data_directory, file_path, self.ref_seq)
-                    print(f"Finished {file}")
-                    files.append(file)
-                    spreadsheet_instance.save_file(instance.pkl_file_path, file, data_directory, instructions_link)
-            if len(files) > 1:
-                avg_file = instance.create_avg_pkl(data_directory, files, instructions_link)
-                print(f"Created average pkl/xlsx: {data_directory}")
-                spreadsheet_instance.save_file(instance.pkl_file_path, avg_file, data_directory, instructions_link, avg_file=True)
-            if self.enrichment_file:
-                print(self.enrichment_file)
-                avg_enrichment_file = enrichment_instance.calc_enrichment(self.enrichment_file, session_folder, files, data_directory, instructions_link)
-                print(f"Calculated enrichment: {data_directory}")
-                spreadsheet_instance.save_file(instance.pkl_file_path, avg_enrichment_file, data_directory, instructions_link, avg_file=True)
-                print(f"Created average enrichment pkl/xlsx: {data_directory}")
-            if self.bubble:
-                gen_bubble_plots(self.bubble_dir, session_folder, data_directory, instance._cache_folder)
-                print(f"Created bubble charts: {data_directory}")
-            if self.freq_distribution:
-                gen_bio_graphs(self.freq_dir, session_folder, data_directory, instance._cache_folder)
-                print(f"Created frequency distribution charts: {data_directory}")
-            
+        fastq_paths = [os.path.join(self.nested_dir, dir, file) for dir in dirs_to_use for file in self.fastq_files(dir)]
+        self.start_stage(progress.COUNT, fastq_paths)
+
+        graph = self.build_stages(instance, spreadsheet_instance, enrichment_instance, session_folder, peptide_map, dirs_to_use, instructions_link)
+        self.run_stages(graph, os.path.join(instance._cache_folder, session_folder))
+
+        self.stage = None
+        if self.capsid_file and self.run_motif:
+            # Drawn once the reads are counted, so residues are weighted by how often their peptides were read
+            print(color.BOLD + "Creating Motif Logo" + color.END)
+            motif.createMotifLogo(save_dir, weights=self.motif_weights(instance, motif.seqs, dirs_to_use))
+            print(f"Motif Logo saved to: {save_dir}")
+            self.report(progress.MOTIF, "Created motif logo", finished=True)
         instance._serialize_pkl()
         if self.args.output:
             instance.save_to_output(self.output_dir)
+        self.report(progress.DONE, "Pipeline finished", finished=True)
+        return os.path.join(instance._cache_folder, session_folder)
+
+# Bytes and reads scanned, shared with the parent process (see _init_worker)
+_counters = None
+
+"""
+_init_worker: multiprocessing.Array --> None
+-- Process pool initializer. Line-buffers stdout so progress lines
+-- printed by workers reach the desktop app as they happen, and keeps
+-- the parent's progress counters, which can only be inherited.
+* @param [in] counters (multiprocessing.Array) - Bytes and reads scanned
+* @param [out] None - Reconfigures sys.stdout
+** Runs once in every worker process
+"""
+def _init_worker(counters=None):
+    global _counters
+    _counters = counters
+    sys.stdout.reconfigure(line_buffering=True)
+
+"""
+_progress_tracker: str, multiprocessing.Array --> _progress_tracker
+-- Progress callback of one file. The engines report running totals
+-- for the file; the tracker adds what is new to the shared counters.
+* @param [in] file_path (str) - FASTQ file being scanned
+* @param [in] counters (multiprocessing.Array) - Bytes and reads scanned, or None
+** Called as tracker(bytes_done, reads_done)
+"""
+class _progress_tracker:
+    def __init__(self, file_path, counters):
+        self.file_size = os.path.getsize(file_path)
+        self.counters = counters
+        self.bytes_done = self.reads_done = 0
+
+    def __call__(self, bytes_done, reads_done):
+        bytes_done = min(bytes_done, self.file_size)
+        if self.counters is None or (bytes_done, reads_done) == (self.bytes_done, self.reads_done):
+            return
+        with self.counters.get_lock():
+            self.counters[0] += bytes_done - self.bytes_done
+            self.counters[1] += max(reads_done - self.reads_done, 0)
+        self.bytes_done = bytes_done
+        self.reads_done = max(reads_done, self.reads_done)
+
+    """
+    finish: None --> None
+    -- Counts the rest of the file as scanned
+    """
+    def finish(self):
+        self(self.file_size, self.reads_done)
+
+"""
+_denoise_file: str, str, str, int, multiprocessing.Array --> SimpleNamespace
+-- Denoises one FASTQ file. The native result is copied into a
+-- plain namespace so it can be returned from a worker process.
+* @param [in] file (str) - FASTQ file name
+* @param [in] file_path (str) - Path to the FASTQ file
+* @param [in] new_dir (str) - Output directory of denoised files
+* @param [in] threshold (int) - Quality threshold
+* @param [in] counters (multiprocessing.Array) - Progress counters, the worker's by default
+* @param [out] result (SimpleNamespace) - Denoise statistics and output file name
+** Picklable wrapper around denoise.denoise
+"""
+def _denoise_file(file, file_path, new_dir, threshold, counters=None):
+    tracker = _progress_tracker(file_path, counters if counters is not None else _counters)
+    result = denoise.denoise(file.encode(), file_path.encode(), new_dir.encode(), threshold, tracker)
+    tracker.finish()
+    return SimpleNamespace(avg_quality=result.avg_quality, total_chars=result.total_chars,
+                           low_quality_reads=result.low_quality_reads, num_reads=result.num_reads,
+                           threshold=result.threshold, output_filename=result.output_filename)
+
+"""
+_print_progress: progress.ProgressEvent --> None
+-- Progress callback of the command line: prints the periodic
+-- updates of the denoise and counting stages
+* @param [in] event (progress.ProgressEvent) - Progress event
+* @param [out] None - Prints a progress line
+** Other steps already print their own messages
+"""
+def _print_progress(event):
+    if event.tick:
+        print(progress.describe(event), flush=True)
 
 def main():
     args = parser.parse_args()
-    cap_genie(args).run_pipeline()
+    try:
+        pipeline = cap_genie(args, progress=_print_progress)
+    except ValueError as e:
+        parser.error(str(e))
+    pipeline.run_pipeline()
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,204 @@
+# Content-addressed cache of per-file count tables.
+# A count table only depends on the FASTQ contents, the library and the
+# counting options, so it is stored under a hash of exactly those inputs.
+# Runs that only change the enrichment baseline, plots or motif flags reuse
+# the cached tables instead of recounting. Entries are Arrow files from the
+# result store; the least recently used ones are evicted past a size budget.
+
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Bytes read per chunk when hashing input files
+HASH_CHUNK_BYTES = 1 << 20
+# ioctl that clones a file's extents (Btrfs, XFS): a copy that shares blocks until written
+FICLONE = 0x40049409
+
+
+class count_cache:
+    DIR_NAME = "capgenie_counts"
+    EXTENSION = ".arrow"
+    # Bump when the layout of count tables changes so old entries miss
+    VERSION = 1
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    """
+    file_digest: cls, str --> str
+    -- Hashes a file's contents in fixed-size chunks
+    * @param [in] path (str) - File to hash
+    * @param [out] digest (str) - Hex SHA-256 of the contents
+    ** Content hash of a FASTQ or library file
+    """
+    @classmethod
+    def file_digest(cls, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    """
+    key: cls, **any --> str
+    -- Builds a cache key from the inputs of a count table
+    * @param [in] parts (dict) - JSON serializable inputs, e.g. file hash,
+    -- library hash, mode, mismatches, flanks/refseq, quality threshold
+    * @param [out] key (str) - Hex SHA-256 of the canonical inputs
+    ** Content address of a count table
+    """
+    @classmethod
+    def key(cls, **parts):
+        parts["version"] = cls.VERSION
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    """
+    entry_path: str --> str
+    -- Returns the path of a cache entry
+    * @param [in] key (str) - Cache key
+    * @param [out] path (str) - Path to the cached .arrow file
+    ** Resolves a key to its file
+    """
+    def entry_path(self, key):
+        return os.path.join(self.root, key[:2], key + self.EXTENSION)
+
+    """
+    get: str, str --> bool
+    -- Places the cached table for key at dest and marks it as
+    -- recently used
+    * @param [in] key (str) - Cache key
+    * @param [in] dest (str) - Destination path of the table
+    * @param [out] hit (bool) - True if the table was in the cache
+    ** Restores a count table from the cache
+    """
+    def get(self, key, dest):
+        path = self.entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            self._place(path, dest)
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    """
+    put: str, str --> None
+    -- Adds a table to the cache, then evicts entries over the budget
+    * @param [in] key (str) - Cache key
+    * @param [in] src (str) - Path of the table to cache
+    * @param [out] None - Stores the entry
+    ** Caches a count table
+    """
+    def put(self, key, src):
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._place(src, path)
+        self.evict()
+
+    """
+    entries: None --> list
+    -- Lists cache entries, least recently used first
+    * @param [out] entries (list) - (mtime, size, path) tuples
+    ** Scans the cache folder
+    """
+    def entries(self):
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for bucket in os.scandir(self.root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if not entry.name.endswith(self.EXTENSION):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    """
+    usage: None --> int
+    -- Returns the number of bytes held by the cache
+    * @param [out] size (int) - Total size of all entries
+    ** Reports cache size
+    """
+    def usage(self):
+        return sum(size for _, size, _ in self.entries())
+
+    """
+    evict: None --> None
+    -- Removes least recently used entries until the cache fits in
+    -- max_bytes. Entries removed concurrently by another run are skipped.
+    * @param [out] None - Deletes cache entries
+    ** Size-bounded LRU eviction
+    """
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    """
+    clear: None --> None
+    -- Removes every cache entry
+    * @param [out] None - Deletes the cache folder
+    ** Used by -cls/--clear_cache
+    """
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    """
+    _place: str, str --> None
+    -- Atomically places a copy of src at dest. The copy is a reflink
+    -- where the file system supports it and a kernel-side copy
+    -- otherwise, never a hard link: a link would share the inode, so
+    -- touching a cache entry would change the session table's mtime and
+    -- evicting it would free nothing while a session still links it.
+    * @param [in] src (str) - Source file
+    * @param [in] dest (str) - Destination file
+    * @param [out] None - Writes dest
+    ** Copies a table into place
+    """
+    def _place(self, src, dest):
+        tmp_path = f"{dest}.{os.getpid()}.tmp"
+        try:
+            if not self._reflink(src, tmp_path):
+                shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    """
+    _reflink: str, str --> bool
+    -- Clones src to dest where the file system shares blocks between files
+    * @param [in] src (str) - Source file
+    * @param [in] dest (str) - Destination file, created or truncated
+    * @param [out] cloned (bool) - False if cloning is not supported here
+    ** Costs no space until either file is rewritten
+    """
+    def _reflink(self, src, dest):
+        if fcntl is None:
+            return False
+        with open(src, "rb") as source, open(dest, "wb") as target:
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            except OSError:
+                return False
+        return True
@@ -0,0 +1,72 @@
+# Shape-preserving downsampling of the rank-abundance curves.
+# A biodistribution curve has one point per variant, which for unknown
+# variant runs means millions of points. Largest-Triangle-Three-Buckets
+# keeps the points that shape the curve, so a plot of any table (or any
+# zoomed window of it) is drawn from a fixed number of points.
+
+import numpy as np
+
+# Points kept when a curve is drawn
+CURVE_POINTS = 2000
+# Values below this are clipped before taking the log (lowest percentage the charts show)
+LOG_FLOOR = 1e-5
+
+"""
+lttb: np.ndarray, np.ndarray, int --> np.ndarray
+-- Largest-Triangle-Three-Buckets: picks threshold points of a curve
+-- that keep its visual shape. The first and last points are kept and
+-- every bucket in between keeps the point forming the largest triangle
+-- with the previous pick and the average of the next bucket.
+* @param [in] x (np.ndarray) - Increasing x values
+* @param [in] y (np.ndarray) - y values
+* @param [in] threshold (int) - Number of points to keep
+* @param [out] indices (np.ndarray) - Sorted indices of the kept points
+** O(n); one Python step per bucket, the points of a bucket are handled together
+"""
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # threshold - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # The bucket after the last one is the last point
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        area = np.abs((x[previous] - mean_x[bucket]) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (mean_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+"""
+rank_abundance: np.ndarray, int, int, int, bool --> np.ndarray, np.ndarray
+-- Downsampled window of a rank-abundance curve
+* @param [in] values (np.ndarray) - Values sorted from most to least abundant
+* @param [in] start (int) - First rank of the window
+* @param [in] end (int) - Rank after the last one of the window (None for the end)
+* @param [in] points (int) - Points to keep
+* @param [in] log (bool) - Preserve the shape on a log y axis
+* @param [out] ranks (np.ndarray) - Ranks of the kept points
+* @param [out] values (np.ndarray) - Values of the kept points
+** Zoomed windows are downsampled on their own, so detail appears as the window narrows
+"""
+def rank_abundance(values, start=0, end=None, points=CURVE_POINTS, log=True):
+    end = len(values) if end is None else min(max(end, 0), len(values))
+    start = min(max(start, 0), end)
+    window = np.asarray(values[start:end], dtype=np.float64)
+    ranks = np.arange(start, end)
+    shape = np.log10(np.maximum(window, LOG_FLOOR)) if log else window
+    keep = lttb(ranks, shape, points)
+    return ranks[keep], window[keep]
@@ -15,6 +15,7 @@
 #include <cstdint>
 #include <pybind11/pybind11.h>
 #include "platform_compat.h"
+#include "progress.h"
 
 namespace py = pybind11;
 
@@ -26,6 +27,7 @@ std::atomic<long long> total_quality_sum(0);
 std::atomic<size_t> total_chars(0);
 std::atomic<size_t> low_quality_reads(0);
 std::atomic<size_t> num_reads(0);
+std::atomic<size_t> bytes_done(0);
 // Variables for storing read quality data
 
 /**
@@ -109,6 +111,7 @@ void process_chunk(const char* data, size_t start, size_t end, std::ofstream& ou
             low_quality_reads++;
         }
         num_reads++;
+        bytes_done += std::min(i, end) - entry_start;
     }
 
     std::lock_guard<std::mutex> lock(output_mutex);
@@ -137,19 +140,23 @@ void clear_pointers() {
     total_chars = 0;
     low_quality_reads = 0;
     num_reads = 0;
+    bytes_done = 0;
 }
 
 /**
- * denoise: const char*, const char*, const char*, int --> DenoiseResult
+ * denoise: const char*, const char*, const char*, int, py::object --> DenoiseResult
 -- Filters low-quality reads from a FASTQ file based on quality threshold
  * @param [in] filename (const char*) - Name of the output file
  * @param [in] file_path (const char*) - Path to the input FASTQ file
  * @param [in] output_path (const char*) - Path for output directory
  * @param [in] threshold (int) - Quality threshold for filtering
+ * @param [in] progress (py::object) - Optional progress(bytes_done, reads_done) callable
  * @param [out] result (DenoiseResult) - Statistics about the denoising process
 ** Main denoising function that filters FASTQ reads by quality
 */
-DenoiseResult denoise(const char* filename, const char* file_path, const char* output_path, int threshold) {
+DenoiseResult denoise(const char* filename, const char* file_path, const char* output_path, int threshold, py::object progress) {
+    ProgressReporter reporter(progress);
+    py::gil_scoped_release release;
     clear_pointers();
     std::string output_filename = joinPaths(output_path, filename);
     std::cout << file_path << std::endl;
@@ -192,6 +199,7 @@ DenoiseResult denoise(const char* filename, const char* file_path, const char* o
     // Determine chunk size for threads
     size_t chunk_size = file_size / NUM_THREADS;
     std::vector<std::thread> threads;
+    std::atomic<size_t> threads_done(0);
 
     for (int i = 0; i < NUM_THREADS; ++i) {
         size_t start = i * chunk_size;
@@ -202,13 +210,23 @@ DenoiseResult denoise(const char* filename, const char* file_path, const char* o
 
         //run process_chunk for each chunk and connect it to mutex output
         
-        threads.emplace_back(process_chunk, data, start, end, std::ref(output));
+        threads.emplace_back([&output, &threads_done, data, start, end]() {
+            process_chunk(data, start, end, output);
+            threads_done++;
+        });
+    }
+
+    // Report the shared counters while the threads work
+    while (reporter.enabled() && threads_done < threads.size()) {
+        std::this_thread::sleep_for(std::chrono::milliseconds(20));
+        reporter.update(bytes_done, num_reads);
     }
 
     // Join threads
     for (auto& t : threads) {
         t.join();
     }
+    reporter.update(file_size, num_reads, true);
     output.close();
     munmap(data, file_size);
 
@@ -240,5 +258,6 @@ PYBIND11_MODULE(denoise, m) {
         .def_readwrite("low_quality_reads", &DenoiseResult::low_quality_reads);
 
     m.def("denoise", &denoise, "Filter low-quality reads from a FASTQ file",
-          py::arg("filename"), py::arg("file_path"), py::arg("output_path"), py::arg("threshold"));
+          py::arg("filename"), py::arg("file_path"), py::arg("output_path"), py::arg("threshold"),
+          py::arg("progress") = py::none());
 }
\ No newline at end of file
@@ -2,7 +2,7 @@
 from pandas import DataFrame
 import pandas as pd
 import os
-import pickle as pkl
+from capgenie.store import result_store
 
 class enrichment:
 
@@ -10,6 +10,7 @@ class enrichment:
         self.session_folder = session_folder
         self.sheets_dir = sheets_dir
         self.cache_folder = cache_folder
+        self.store = result_store(os.path.join(cache_folder, session_folder))
 
     """
     process_dict: dict --> dict
@@ -38,7 +39,7 @@ class enrichment:
     """
     calc_enrichment: str, str, list, str, str --> str
     -- Calculates the enrichment of all fastq files and saves them into 
-    excel sheets and .pkl
+    the result store
     * @param [in] pre_insert (str) - The pre insert file used for calculating enrichment
     * @param [in] session_folder (str) - Session folder path
     * @param [in] files (list) - List of files to process
@@ -53,8 +54,8 @@ class enrichment:
             file_ext = "variants_"
         else:
             file_ext = "unknown_variants_"
-        pre_insert_path = os.path.join(os.path.basename(os.path.dirname(pre_insert)), f"{file_ext}{os.path.basename(pre_insert)}").replace(".fastq", ".pkl")
-        pre_insert_dict = pkl.load(open(os.path.join(self.cache_folder, session_folder, "pkl_files", pre_insert_path), "rb"))
+        pre_insert_dir = os.path.basename(os.path.dirname(pre_insert))
+        pre_insert_dict = self.store.read(pre_insert_dir, f"{file_ext}{os.path.basename(pre_insert)}", columns=["Peptide", "Decimal"])
         pre_insert_dict = dict(zip(pre_insert_dict.Peptide, pre_insert_dict.Decimal))
         pre_insert_dict = {x:y for x,y in pre_insert_dict.items() if y != 0}
 
@@ -63,7 +64,7 @@ class enrichment:
 
         for file in files:
             if os.path.basename(pre_insert).replace(".fastq", "") not in file:
-                file_dict = pd.read_pickle(os.path.join(self.cache_folder, session_folder, "pkl_files", data_directory, f"{file_ext}{file}").replace(".fastq", ".pkl"))
+                file_dict = self.store.read(data_directory, f"{file_ext}{file}", columns=["Peptide", "Decimal"])
                 obj_dict = dict(zip(file_dict.Peptide, file_dict.Decimal))
 
                 for key, pre_insert_value in pre_insert_dict.items():
@@ -82,6 +83,6 @@ class enrichment:
         cols = df.columns.tolist()
         df = df[cols]
         df['Average_Enrichment'] = df[cols].mean(axis=1)
-        df = df.sort_values("Average_Enrichment", ascending=False)
-        df.to_pickle(os.path.join(self.cache_folder, session_folder, "pkl_files", data_directory, f"average_enrichment_{data_directory}.pkl")) 
+        df = df.sort_values("Average_Enrichment", ascending=False, kind="stable")
+        self.store.write(data_directory, f"average_enrichment_{data_directory}", df)
         return f"average_enrichment_{data_directory}.fastq"
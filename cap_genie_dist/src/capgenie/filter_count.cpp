@@ -6,6 +6,7 @@
 #include <fstream>
 #include <iostream>
 #include "platform_compat.h"
+#include "progress.h"
 
 namespace py = pybind11;
 
@@ -205,14 +206,18 @@ void reset_pointers(char*& mapped_data, char*& line_start, char*& current_pos) {
 }
 
 /**
-filter_count: char*, char* --> FilterResult
+filter_count: char*, char*, py::object --> FilterResult
 -- Runs process_line over the FastQ file and returns FilterResult
  * @param [in] file (const char*) - The path to the FastQ file
  * @param [in] refseq (char*) - The reference sequence
+ * @param [in] progress (py::object) - Optional progress(bytes_done, reads_done) callable
  * @param [out] result (FilterResult) - The result struct to populate
+** Runs without the GIL; progress.h takes it to report
 */
-FilterResult filter_count(const char* file, char* refseq) {
+FilterResult filter_count(const char* file, char* refseq, py::object progress) {
     reset_result(result);
+    ProgressReporter reporter(progress);
+    py::gil_scoped_release release;
 
     int fd = open(file, O_RDONLY);
     if (fd == -1) {
@@ -248,15 +253,17 @@ FilterResult filter_count(const char* file, char* refseq) {
                 result.total_reads++;
                 std::string line(line_start, current_pos - line_start);
                 process_line(line, refseq);
+                if ((result.total_reads & 4095) == 0) {
+                    reporter.update(current_pos - mapped_data, result.total_reads);
+                }
             }
             line_start = current_pos + 1;
-            if ((line_number) % 1000000 == 0) {
-                std::cout << line_number << std::endl;
-            }
             line_number++;
         }
         current_pos++;
     }
+    reporter.update(file_size, result.total_reads, true);
+
         // Handle the last line if it doesn't end with a newline
     if (current_pos == end_pos && *line_start != '\n') {
         if ((line_number + 3) % 4 == 0) {
@@ -296,5 +303,5 @@ PYBIND11_MODULE(filter_module, m) {
         .def_readwrite("null_count", &FilterResult::null_count);
 
     m.def("filter_count", &filter_count, "Filter reads from file",
-          py::arg("file"), py::arg("refseq"));
+          py::arg("file"), py::arg("refseq"), py::arg("progress") = py::none());
 }
\ No newline at end of file
@@ -11,9 +11,29 @@
 #include <pybind11/stl.h>
 #include <edlib.h>
 #include <algorithm>
+#include "progress.h"
+#ifdef __linux__
+#include <sched.h>
+#endif
 
 namespace py = pybind11;
 
+/**
+ * available_threads: void --> size_t
+-- Number of CPUs this process may run on. A job scheduler that pins
+-- the process to a subset of cores limits the threads started here.
+ * @param [out] count (size_t) - At least 1
+*/
+static size_t available_threads() {
+#ifdef __linux__
+    cpu_set_t set;
+    if (sched_getaffinity(0, sizeof(set), &set) == 0 && CPU_COUNT(&set) > 0)
+        return CPU_COUNT(&set);
+#endif
+    size_t count = std::thread::hardware_concurrency();
+    return count ? count : 1;
+}
+
 /**
  * hamming_distance: std::string, std::string --> int
 -- Calculates the hamming distance between two strings
@@ -89,7 +109,7 @@ int count_hamming_matches(const std::string& query, const std::string& dna_seq,
 
     int match_count = 0;
     std::mutex mtx;
-    size_t num_threads = std::thread::hardware_concurrency();
+    size_t num_threads = available_threads();
     std::vector<std::thread> threads;
 
     auto worker = [&](size_t start, size_t end) {
@@ -195,25 +215,33 @@ int count_levenstein_matches(const std::string& query, const std::string& dna_se
     return total_count;
 }
 /**
- * fuzzy_match: std::vector<std::string>, std::string, int, bool --> std::unordered_map<std::string, int>
+ * fuzzy_match: std::vector<std::string>, std::string, int, bool, py::object, size_t --> std::unordered_map<std::string, int>
 -- Finds all the fuzzy matches of all queries in dna_seq. Has two modes,
 substitutions w/o indels, that are dictated by the boolean subOnly.
  * @param [in] queries (std::vector<std::string>&) - Vector of query sequences to search for
  * @param [in] dna_seq (std::string) - DNA sequence to search in
  * @param [in] max_mismatch (int) - Maximum number of allowed mismatches
  * @param [in] subOnly (bool) - If true, only allow substitutions; if false, allow indels too
+ * @param [in] progress (py::object) - Optional progress(bytes_done, reads_done) callable. Every
+ * query scans all of dna_seq, so bytes_done is the share of the total work in bytes of dna_seq
+ * and reads_done the same share of num_reads.
+ * @param [in] num_reads (size_t) - Reads concatenated in dna_seq, which does not delimit them
  * @param [out] counts (std::unordered_map<std::string, int>) - Map of query sequences to their match counts
-** Function that is exported to PYBIND11
+** Function that is exported to PYBIND11; runs without the GIL
 */
-std::unordered_map<std::string, int> fuzzy_match(std::vector<std::string>& queries, const std::string& dna_seq, int max_mismatch, bool subOnly) {
+std::unordered_map<std::string, int> fuzzy_match(std::vector<std::string>& queries, const std::string& dna_seq, int max_mismatch, bool subOnly, py::object progress, size_t num_reads) {
     std::unordered_map<std::string, int> counts;
+    ProgressReporter reporter(progress);
+    py::gil_scoped_release release;
 
-    for (const auto& query : queries) {
+    for (size_t i = 0; i < queries.size(); ++i) {
+        const auto& query = queries[i];
         if (subOnly) {
             counts[query] = count_hamming_matches(query, dna_seq, max_mismatch);
         } else {
             counts[query] = count_levenstein_matches(query, dna_seq, max_mismatch);
         }
+        reporter.update(dna_seq.size() * (i + 1) / queries.size(), num_reads * (i + 1) / queries.size(), i + 1 == queries.size());
     }
     return counts;
 }
@@ -221,7 +249,8 @@ std::unordered_map<std::string, int> fuzzy_match(std::vector<std::string>& queri
 PYBIND11_MODULE(fuzzy_match, m) {
     m.doc() = "FASTQ fuzzy matching using C++";
     m.def("fuzzy_match", &fuzzy_match, "Fuzzy matches with sub/sub+indels",
-        py::arg("queries"), py::arg("dna_seq"), py::arg("max_mismatch"), py::arg("subOnly"));
+        py::arg("queries"), py::arg("dna_seq"), py::arg("max_mismatch"), py::arg("subOnly"),
+        py::arg("progress") = py::none(), py::arg("num_reads") = 0);
     m.def("peptide_levenshtein_distance", &peptide_levenshtein_distance, "Native Levenshtein",
     py::arg("s1"), py::arg("s2"));
 }
\ No newline at end of file
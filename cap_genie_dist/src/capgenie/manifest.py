@@ -0,0 +1,120 @@
+# Append-only run manifest for a capgenie session.
+# Every pipeline step records what it produced as one JSON line appended to
+# <session>/manifest.jsonl. Appends are a single O_APPEND write followed by
+# fsync, so parallel per-file workers can record results without locks and
+# without rewriting what is already there. compact() folds the log into a
+# single snapshot record once the workers are done.
+
+import json
+import os
+
+
+class run_manifest:
+    FILE_NAME = "manifest.jsonl"
+
+    def __init__(self, session_path):
+        self.session_path = session_path
+        self.path = os.path.join(session_path, self.FILE_NAME)
+
+    """
+    create: str --> None
+    -- Starts a new manifest for a session, replacing any previous one
+    * @param [in] session_name (str) - Name of the session
+    * @param [out] None - Writes the initial snapshot record
+    ** Initializes the manifest for a new session
+    """
+    def create(self, session_name):
+        self._write_snapshot({"Session": session_name})
+
+    """
+    exists: None --> bool
+    -- Checks whether the session already has a manifest
+    * @param [out] result (bool) - True if the manifest file exists
+    ** Checks for the manifest file
+    """
+    def exists(self):
+        return os.path.exists(self.path)
+
+    """
+    append: str, any --> None
+    -- Appends a value to the list stored under key. The record is
+    -- written with one write() on an O_APPEND descriptor and fsynced,
+    -- so concurrent writers never interleave or overwrite each other.
+    -- It starts with a newline, so it never runs on from a torn line
+    -- left by an interrupted writer.
+    * @param [in] key (str) - Manifest key, e.g. "count_known_reads"
+    * @param [in] value (any) - JSON serializable value to append
+    * @param [out] None - Appends one line to the manifest
+    ** Records one pipeline result
+    """
+    def append(self, key, value):
+        line = "\n" + json.dumps({"op": "append", "key": key, "value": value}) + "\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    """
+    materialize: None --> dict
+    -- Replays the manifest into the instructions dictionary. Blank
+    -- lines and a torn line left by an interrupted writer are ignored.
+    * @param [out] content (dict) - Session instructions
+    ** Builds the instructions dictionary from the log
+    """
+    def materialize(self):
+        content = {}
+        if not self.exists():
+            return content
+        with open(self.path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("op") == "snapshot":
+                    content = record["value"]
+                elif record.get("op") == "append":
+                    content.setdefault(record["key"], []).append(record["value"])
+        return content
+
+    """
+    compact: None --> dict
+    -- Folds the log into a single snapshot record. Must only run once
+    -- no worker is appending, e.g. at the end of run_pipeline.
+    * @param [out] content (dict) - Session instructions
+    ** Rewrites the manifest as one snapshot record
+    """
+    def compact(self):
+        content = self.materialize()
+        self._write_snapshot(content)
+        return content
+
+    """
+    replace: dict --> None
+    -- Replaces the manifest with the given instructions, e.g. those
+    -- of a session created before manifests existed
+    * @param [in] content (dict) - Session instructions
+    * @param [out] None - Writes a single snapshot record
+    ** Seeds or overwrites the instructions of a session
+    """
+    def replace(self, content):
+        self._write_snapshot(content)
+
+    """
+    _write_snapshot: dict --> None
+    -- Atomically replaces the manifest with a single snapshot record
+    * @param [in] content (dict) - Instructions to store
+    * @param [out] None - Writes the manifest file
+    ** Writes to a temporary file, fsyncs and renames it into place
+    """
+    def _write_snapshot(self, content):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"op": "snapshot", "value": content}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,16 +1,32 @@
 import numpy as np
 from sklearn.cluster import DBSCAN
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 import umap.umap_ as umap
-from collections import defaultdict, Counter
+from collections import defaultdict
 import math
 from collections import defaultdict
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import logomaker
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import combinations
 import os
 import json
 
+# Above this many sequences "auto" clustering uses the Hamming neighbour
+# graph, and UMAP is fit on a stratified sample of this size
+UMAP_MAX_SEQS = 20000
+# Sequences one-hot encoded at a time when UMAP transforms a large library
+UMAP_BATCH_SEQS = 50000
+CLUSTERING_METHODS = ("auto", "umap", "hamming")
+
+# Windows encoded per batch while counting motifs; bounds the memory of
+# the (windows x wildcard patterns) code matrix
+MOTIF_BATCH_WINDOWS = 1 << 18
+
 ## JUST FOR TEMPLATE
 @dataclass
 class MotifScore:
@@ -20,9 +36,12 @@ class MotifScore:
     score: float
 
 class Motif:
-    def __init__(self, seqs, isProtein=True):
+    def __init__(self, seqs, isProtein=True, clustering="auto"):
+        if clustering not in CLUSTERING_METHODS:
+            raise ValueError(f"Unknown motif clustering method: {clustering}")
         self.seqs = seqs # List of any sequences
         self.isProtein = isProtein
+        self.clustering = clustering
         if self.isProtein:
             self.aa_list = 'ACDEFGHIKLMNPQRSTVWY'
         else:
@@ -37,36 +56,116 @@ class Motif:
     ** Converts sequence to flattened one-hot encoding
     """
     def one_hot_encode(self, seq):
-        length = len(seq)
+        return self.one_hot_encode_all(self.encode_seqs([seq]))[0]
+
+    """
+    encode_seqs: list --> np.ndarray
+    -- Integer-encodes sequences in one pass, padded to the longest one
+    * @param [in] seqs (list) - Sequences to encode, self.seqs by default
+    * @param [out] codes (np.ndarray) - (sequences, length) int8 codes
+    ** Residues are 0..len(aa_list)-1, other characters len(aa_list) and padding len(aa_list)+1
+    """
+    def encode_seqs(self, seqs=None):
+        seqs = self.seqs if seqs is None else seqs
         depth = len(self.aa_list)
-        one_hot = np.zeros((length, depth))
-        for i, aa in enumerate(seq):
-            if aa in self.aa_to_index:
-                one_hot[i, self.aa_to_index[aa]] = 1
-        return one_hot.flatten()
+        width = max((len(seq) for seq in seqs), default=0)
+        lookup = np.full(128, depth, dtype=np.int8)
+        lookup[[ord(aa) for aa in self.aa_list]] = np.arange(depth)
+        lookup[0] = depth + 1
+        padded = "".join(seq.ljust(width, "\0") for seq in seqs).encode("ascii", "replace")
+        return lookup[np.frombuffer(padded, dtype=np.uint8)].reshape(len(seqs), width)
+
+    """
+    one_hot_encode_all: np.ndarray --> np.ndarray
+    -- One-hot encodes the output of encode_seqs
+    * @param [in] codes (np.ndarray) - (sequences, length) codes
+    * @param [out] one_hot (np.ndarray) - (sequences, length * len(aa_list)) flattened encodings
+    ** Other characters and padding encode as all zeros
+    """
+    def one_hot_encode_all(self, codes):
+        depth = len(self.aa_list)
+        return np.eye(depth + 2, depth, dtype=np.float32)[codes].reshape(len(codes), -1)
 
     """
     cluster_motifs: None --> defaultdict
-    -- Clusters sequences using UMAP dimensionality reduction and DBSCAN
+    -- Clusters sequences with the configured method: UMAP and DBSCAN, or
+    -- the Hamming neighbour graph ("auto" picks UMAP for libraries of up
+    -- to UMAP_MAX_SEQS sequences)
     * @param [out] clusters (defaultdict) - Dictionary of cluster labels to sequences
-    ** Uses UMAP and DBSCAN to cluster similar sequences
+    ** Noise and unclustered sequences are left out
     """
     def cluster_motifs(self):
-        #if self.isProtein:
-        encoded_seqs = np.array([self.one_hot_encode(seq) for seq in self.seqs])
-        reducer = umap.UMAP(n_neighbors=5, min_dist=0.3, random_state=42)
-        reduced = reducer.fit_transform(encoded_seqs)
-
-        db = DBSCAN(eps=0.5, min_samples=2)
-        labels = db.fit_predict(reduced)
+        method = self.clustering
+        if method == "auto":
+            method = "umap" if len(self.seqs) <= UMAP_MAX_SEQS else "hamming"
+        codes = self.encode_seqs()
+        if method == "hamming":
+            labels = self.hamming_clusters(codes)
+        else:
+            labels = self.umap_clusters(codes)
 
         clusters = defaultdict(list)
-        for seq, label in zip(self.seqs, labels):
-            print(type(seq), type(label))
+        for seq, label in zip(self.seqs, labels.tolist()):
             if label != -1:  # skip noise
                 clusters[label].append(seq)
 
         return clusters
+
+    """
+    umap_clusters: np.ndarray, int --> np.ndarray
+    -- Reduces one-hot encodings with UMAP and clusters them with DBSCAN
+    * @param [in] codes (np.ndarray) - Output of encode_seqs
+    * @param [in] sample_size (int) - Larger libraries fit UMAP on a stratified sample
+    * @param [out] labels (np.ndarray) - Cluster label of each sequence, -1 for noise
+    ** The rest of a sampled library is projected with the fitted reducer in batches
+    """
+    def umap_clusters(self, codes, sample_size=UMAP_MAX_SEQS):
+        reducer = umap.UMAP(n_neighbors=5, min_dist=0.3, random_state=42)
+        if len(codes) <= sample_size:
+            reduced = reducer.fit_transform(self.one_hot_encode_all(codes))
+        else:
+            # Strata: sequence length and first residue
+            lengths = (codes != len(self.aa_list) + 1).sum(axis=1)
+            strata = lengths * 256 + codes[:, 0] if codes.shape[1] else lengths
+            reducer.fit(self.one_hot_encode_all(codes[stratified_sample(strata, sample_size)]))
+            reduced = np.concatenate([reducer.transform(self.one_hot_encode_all(codes[start:start + UMAP_BATCH_SEQS]))
+                                      for start in range(0, len(codes), UMAP_BATCH_SEQS)])
+
+        db = DBSCAN(eps=0.5, min_samples=2)
+        return db.fit_predict(reduced)
+
+    """
+    hamming_clusters: np.ndarray, int, int --> np.ndarray
+    -- Clusters sequences as connected components of the graph linking
+    -- sequences at most max_distance substitutions apart
+    * @param [in] codes (np.ndarray) - Output of encode_seqs
+    * @param [in] max_distance (int) - Substitutions allowed between neighbours
+    * @param [in] min_size (int) - Smaller components are noise
+    * @param [out] labels (np.ndarray) - Cluster label of each sequence, -1 for noise
+    ** Neighbours are found by masking every combination of max_distance
+    ** positions and grouping equal rows, so there is no pairwise comparison
+    ** and the work grows linearly with the library. Padding counts as a
+    ** residue, so a shorter sequence can neighbour a longer one.
+    """
+    def hamming_clusters(self, codes, max_distance=1, min_size=2):
+        count, width = codes.shape
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        rows, cols = [], []
+        for positions in combinations(range(width), min(max_distance, width)):
+            masked = codes.copy()
+            masked[:, list(positions)] = -1
+            _, first, inverse = np.unique(masked, axis=0, return_index=True, return_inverse=True)
+            # Link each sequence to the first one with the same masked row
+            rows.append(np.arange(count))
+            cols.append(first[inverse.reshape(-1)])
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(count, count))
+        _, components = connected_components(graph, directed=False)
+
+        sizes = np.bincount(components)
+        labels = np.cumsum(sizes >= min_size) - 1
+        return np.where(sizes[components] >= min_size, labels[components], -1)
     
     """
     extract_wildcard_motifs: list, int, int, int, int --> dict
@@ -80,40 +179,26 @@ class Motif:
     ** Extracts motifs with wildcards from sequence clusters
     """
     def extract_wildcard_motifs(self, cluster_seqs, min_len=3, max_len=7, max_wildcards=2, min_count=2):
-        motif_counter = Counter()
-        for seq in cluster_seqs:
-            for length in range(min_len, max_len + 1):
-                for i in range(len(seq) - length + 1):
-                    window = seq[i:i+length]
-                    
-                    wildcard_positions = [
-                        format(idx, f"0{length}b")
-                        for idx in range(2**length)
-                        if 0 < bin(idx).count('1') <= max_wildcards
-                    ]
-
-                    for pattern in wildcard_positions:
-                        motif = ''.join(
-                            window[j] if pattern[j] == '0' else 'X'
-                            for j in range(length)
-                        )
-                        motif_counter[motif] += 1
-
-                    motif_counter[window] += 1
-        return {str(motif): int(count) for motif, count in motif_counter.items() if count >= min_count}
+        return count_wildcard_motifs(cluster_seqs, min_len, max_len, max_wildcards, min_count)
     
     """
-    get_motifs: str --> None
+    get_motifs: str, int --> None
     -- Gets motifs from clustered sequences and saves to JSON
     * @param [in] file_path (str) - Path to save motifs JSON file
+    * @param [in] jobs (int) - Worker processes for counting clusters in parallel
     * @param [out] None - Saves motifs to motifs.json file
     ** Processes clusters and saves motifs to file
     """
-    def get_motifs(self, file_path):
+    def get_motifs(self, file_path, jobs=1):
         clusters = self.cluster_motifs()
+        labels = list(clusters.keys())
+        if jobs > 1 and len(labels) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(labels))) as pool:
+                results = list(pool.map(count_wildcard_motifs, [clusters[label] for label in labels]))
+        else:
+            results = [self.extract_wildcard_motifs(clusters[label]) for label in labels]
         motifClusters = {}
-        for label, cluster_seqs in clusters.items():
-            motifs = self.extract_wildcard_motifs(cluster_seqs)
+        for label, motifs in zip(labels, results):
             sorted_motifs = sorted(motifs.items(), key=lambda x: -x[1])
             motifClusters[int(label)] = sorted_motifs
 
@@ -121,71 +206,81 @@ class Motif:
             json.dump(motifClusters, f, indent=4)
 
     """
-    compute_frequencies: None --> list
-    -- Computes frequency of each character at each position
-    * @param [out] freqs (list) - List of frequency dictionaries for each position
-    ** Calculates position-wise character frequencies
+    align_codes: np.ndarray, str --> np.ndarray
+    -- Aligns encoded sequences of different lengths on their first or last residue
+    * @param [in] codes (np.ndarray) - Output of encode_seqs (left-aligned)
+    * @param [in] align (str) - "left" or "right"
+    * @param [out] codes (np.ndarray) - Codes with the padding moved to the start for "right"
+    """
+    def align_codes(self, codes, align="left"):
+        if align == "left":
+            return codes
+        if align != "right":
+            raise ValueError(f"Unknown alignment: {align}")
+        pad = len(self.aa_list) + 1
+        width = codes.shape[1]
+        shift = (codes == pad).sum(axis=1)
+        source = np.arange(width) - shift[:, None]
+        aligned = codes[np.arange(len(codes))[:, None], np.clip(source, 0, None)]
+        return np.where(source >= 0, aligned, pad).astype(codes.dtype)
+
+    """
+    compute_frequencies: np.ndarray, str --> np.ndarray
+    -- Builds the position weight matrix: the weighted frequency of each
+    -- residue at each position
+    * @param [in] weights (np.ndarray) - Weight of each sequence (e.g. read counts or enrichment), uniform by default
+    * @param [in] align (str) - Aligns sequences of different lengths on their "left" or "right" end
+    * @param [out] freqs (np.ndarray) - (positions, len(aa_list) + 1) frequencies; the last column holds other characters
+    ** A position's frequencies are over the sequences long enough to cover it
     """
-    def compute_frequencies(self):
-        L = len(self.seqs[0])
-        freqs = [defaultdict(float) for _ in range(L)]
-        for seq in self.seqs:
-            for i in range(L):
-                freqs[i][seq[i]] += 1.0
+    def compute_frequencies(self, weights=None, align="left"):
+        codes = self.align_codes(self.encode_seqs(), align)
+        count, width = codes.shape
+        depth = len(self.aa_list) + 2
+        if weights is None:
+            weights = np.ones(count)
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (count,):
+            raise ValueError(f"Expected {count} weights, got {weights.size}")
 
-        for pos_freq in freqs:
-            for k in pos_freq:
-                pos_freq[k] /= len(self.seqs)
-        return freqs
+        # Weighted count of every (position, code) pair in one pass
+        cells = (codes.astype(np.int64) + np.arange(width) * depth).ravel()
+        counts = np.bincount(cells, weights=np.repeat(weights, width), minlength=width * depth).reshape(width, depth)
+        counts = counts[:, :-1]  # Padding
+        totals = counts.sum(axis=1, keepdims=True)
+        return np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
 
     """
-    compute_info_content: list --> list
+    compute_info_content: np.ndarray --> np.ndarray
     -- Computes information content at each position
-    * @param [in] freqs (list) - List of frequency dictionaries
-    * @param [out] info (list) - List of information content scores
+    * @param [in] freqs (np.ndarray) - Output of compute_frequencies
+    * @param [out] info (np.ndarray) - Information content of each position
     ** Calculates information content using entropy
     """
     def compute_info_content(self, freqs):
-        info = []
-        alphabet_size = len(self.aa_list)
-        max_entropy = math.log2(alphabet_size)
-        for pos_freq in freqs:
-            entropy = 0.0
-            for p in pos_freq.values():
-                if p > 0:
-                    entropy -= p * math.log2(p)
-            info.append(max_entropy - entropy)
-        return info
-
-    """
-    createMotifLogo: str --> None
+        max_entropy = math.log2(len(self.aa_list))
+        logs = np.log2(freqs, out=np.zeros_like(freqs), where=freqs > 0)
+        return max_entropy + (freqs * logs).sum(axis=1)
+
+    """
+    createMotifLogo: str, np.ndarray, str --> None
     -- Creates and saves a motif logo visualization
     * @param [in] file_path (str) - Path to save the motif logo
+    * @param [in] weights (np.ndarray) - Weight of each sequence, uniform by default
+    * @param [in] align (str) - Alignment of sequences of different lengths, see compute_frequencies
     * @param [out] None - Saves motif logo plot to file
     ** Creates sequence logo visualization using logomaker
     """
-    def createMotifLogo(self, file_path):
-        freqs = self.compute_frequencies()
+    def createMotifLogo(self, file_path, weights=None, align="left"):
+        freqs = self.compute_frequencies(weights, align)
         infoScores = self.compute_info_content(freqs)
 
-        AMINO_ACIDS = self.aa_list
-
-        scores = []
-
-        for idx, val in enumerate(freqs):
-            for aa in AMINO_ACIDS:
-                f = val.get(aa, 0.0)
-                s = f * infoScores[idx]
-                
-                if s > 0.001:
-                    scores.append([idx, aa, f, s])
-
-        logo_df = pd.DataFrame(scores, columns=["position", "aa", "freq", "score"])
-
-        print(logo_df)
-
-        logo_df = logo_df.pivot_table(index='position', columns='aa', values='score', fill_value=0.0)
-        logo_df = logo_df.sort_index()
+        scores = freqs[:, :len(self.aa_list)] * infoScores[:, None]
+        scores[scores <= 0.001] = 0.0
+        logo_df = pd.DataFrame(scores, columns=pd.Index(list(self.aa_list), name="aa"))
+        logo_df.index.name = "position"
+        # Only positions and residues that show up in the logo
+        logo_df = logo_df.loc[(logo_df > 0).any(axis=1), (logo_df > 0).any(axis=0)]
 
         # COLOR SCHEME FROM CHATGPT
         if self.isProtein:
@@ -205,7 +300,9 @@ class Motif:
                 'T': 'red'
             }
 
-        fig, ax = plt.subplots(figsize=(10, 6))
+        # Not registered with pyplot, so nothing stays alive in long-lived workers
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
 
         logo = logomaker.Logo(
             logo_df,
@@ -216,5 +313,153 @@ class Motif:
 
         ax.set_xlabel("Position")
         ax.set_ylabel("Motif Score")
-        plt.tight_layout()
-        plt.savefig(os.path.join(file_path, "motif_logo.png"), dpi=300)
\ No newline at end of file
+        fig.tight_layout()
+        fig.savefig(os.path.join(file_path, "motif_logo.png"), dpi=300)
+
+"""
+stratified_sample: np.ndarray, int --> np.ndarray
+-- Indices of about size items, drawn from every stratum in proportion
+-- to its share of the items
+* @param [in] strata (np.ndarray) - Stratum key of each item
+* @param [in] size (int) - Number of items to draw
+* @param [out] indices (np.ndarray) - Sorted indices of the sample
+** Seeded, so the same input always gives the same sample
+"""
+def stratified_sample(strata, size):
+    rng = np.random.default_rng(42)
+    _, strata = np.unique(strata, return_inverse=True)
+    strata = strata.reshape(-1)
+    order = np.argsort(strata, kind="stable")
+    bounds = np.r_[0, np.cumsum(np.bincount(strata))]
+    sample = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        take = max(1, round(size * (end - start) / len(strata)))
+        sample.append(rng.choice(order[start:end], size=min(take, end - start), replace=False))
+    return np.sort(np.concatenate(sample))
+
+"""
+wildcard_masks: int, int --> np.ndarray
+-- Wildcard patterns of a window length, in the order motifs are
+-- listed: every pattern with 1..max_wildcards wildcards by increasing
+-- bitmask (first position = highest bit), then the plain window
+* @param [in] length (int) - Window length
+* @param [in] max_wildcards (int) - Maximum number of wildcards
+* @param [out] masks (np.ndarray) - (patterns, length) array, 1 where the window gets an X
+** Computed once per length instead of once per window
+"""
+@lru_cache(maxsize=None)
+def wildcard_masks(length, max_wildcards):
+    bits = [idx for idx in range(1, 2 ** length) if bin(idx).count("1") <= max_wildcards]
+    masks = [[(idx >> (length - 1 - j)) & 1 for j in range(length)] for idx in bits]
+    masks.append([0] * length)
+    return np.array(masks, dtype=np.int64)
+
+"""
+count_wildcard_motifs: list, int, int, int, int --> dict
+-- Counts every window of min_len..max_len residues and its wildcard
+-- variants (up to max_wildcards positions replaced by X). Windows are
+-- integer-encoded, so a motif is one int64 and counting is a sort.
+* @param [in] seqs (list) - Sequences of one cluster
+* @param [in] min_len (int) - Minimum motif length
+* @param [in] max_len (int) - Maximum motif length
+* @param [in] max_wildcards (int) - Maximum number of wildcards
+* @param [in] min_count (int) - Minimum count threshold
+* @param [out] motifs (dict) - Motifs with at least min_count occurrences, in order of first occurrence
+** Module-level so clusters can be counted in worker processes
+"""
+def count_wildcard_motifs(seqs, min_len=3, max_len=7, max_wildcards=2, min_count=2):
+    if not seqs:
+        return {}
+    # A literal X reads the same as a wildcard, so they share a code
+    alphabet = np.array([ord(c) for c in sorted(set("".join(seqs)) | {"X"})], dtype=np.uint32)
+    wildcard = int(np.searchsorted(alphabet, ord("X")))
+    base = len(alphabet)
+    if base ** max_len >= 2 ** 63:
+        raise ValueError("Alphabet too large to encode motifs of this length")
+    lookup = np.zeros(int(alphabet[-1]) + 1, dtype=np.int64)
+    lookup[alphabet] = np.arange(base)
+
+    # Group sequences by length so their windows come from one 2D array
+    by_length = {}
+    for index, seq in enumerate(seqs):
+        by_length.setdefault(len(seq), []).append(index)
+    encoded = {}
+    for seq_len, indices in by_length.items():
+        codes = lookup[np.frombuffer("".join(seqs[i] for i in indices).encode("utf-32-le"), dtype=np.uint32)]
+        encoded[seq_len] = (np.array(indices, dtype=np.int64), codes.reshape(len(indices), seq_len))
+
+    lengths = list(range(min_len, max_len + 1))
+    max_windows = max(by_length) + 1
+    max_patterns = len(wildcard_masks(max_len, max_wildcards))
+    found = []  # (codes, counts, first occurrence key, length) per batch
+    for length_index, length in enumerate(lengths):
+        masks = wildcard_masks(length, max_wildcards)
+        ranks = np.arange(len(masks), dtype=np.int64)
+        powers = base ** np.arange(length - 1, -1, -1, dtype=np.int64)
+        for seq_len, (indices, codes) in encoded.items():
+            if seq_len < length:
+                continue
+            windows = np.lib.stride_tricks.sliding_window_view(codes, length, axis=1)
+            positions = windows.shape[1]
+            windows = windows.reshape(-1, length)
+            for start in range(0, len(windows), MOTIF_BATCH_WINDOWS):
+                batch = windows[start:start + MOTIF_BATCH_WINDOWS]
+                rows = np.arange(start, start + len(batch))
+                plain = batch @ powers
+                # Putting an X at position j adds (X - residue) * base^(length-1-j)
+                motif_codes = plain[:, None] + ((wildcard - batch) * powers) @ masks.T
+                # Order of first occurrence: sequence, window length, position, pattern
+                window_keys = (indices[rows // positions] * len(lengths) + length_index) * max_windows + rows % positions
+                keys = window_keys[:, None] * max_patterns + ranks
+                found.append(_count_codes(motif_codes.ravel(), keys.ravel()) + (length,))
+
+    motifs = []
+    for length in lengths:
+        batches = [batch for batch in found if batch[3] == length]
+        if not batches:
+            continue
+        codes, counts, keys = _merge_counts(batches)
+        keep = counts >= min_count
+        motifs.append((codes[keep], counts[keep], keys[keep], length))
+    if not motifs:
+        return {}
+
+    names = np.concatenate([_decode(codes, length, alphabet, base) for codes, _, _, length in motifs])
+    counts = np.concatenate([counts for _, counts, _, _ in motifs])
+    order = np.argsort(np.concatenate([keys for _, _, keys, _ in motifs]))
+    return dict(zip(names[order].tolist(), counts[order].tolist()))
+
+"""
+_count_codes: np.ndarray, np.ndarray --> np.ndarray, np.ndarray, np.ndarray
+-- Unique motif codes with their counts and first occurrence keys
+"""
+def _count_codes(codes, keys):
+    order = np.argsort(codes)
+    codes, keys = codes[order], keys[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    return codes[starts], np.diff(np.r_[starts, len(codes)]), np.minimum.reduceat(keys, starts)
+
+"""
+_merge_counts: list --> np.ndarray, np.ndarray, np.ndarray
+-- Combines the per-batch counts of one window length
+"""
+def _merge_counts(batches):
+    codes = np.concatenate([batch[0] for batch in batches])
+    counts = np.concatenate([batch[1] for batch in batches])
+    keys = np.concatenate([batch[2] for batch in batches])
+    order = np.argsort(codes)
+    codes, counts, keys = codes[order], counts[order], keys[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    return codes[starts], np.add.reduceat(counts, starts), np.minimum.reduceat(keys, starts)
+
+"""
+_decode: np.ndarray, int, np.ndarray, int --> np.ndarray
+-- Turns motif codes of one length back into strings (alphabet holds code points)
+"""
+def _decode(codes, length, alphabet, base):
+    digits = np.empty((len(codes), length), dtype=np.int64)
+    rest = codes.copy()
+    for j in range(length - 1, -1, -1):
+        rest, digits[:, j] = np.divmod(rest, base)
+    # Code points side by side in UTF-32 are a fixed-width numpy string
+    return np.ascontiguousarray(alphabet[digits]).view(f"<U{length}").ravel()
@@ -0,0 +1,172 @@
+# On-demand plot artifacts of a session.
+# Plots only depend on the result tables they are drawn from, so they are
+# rendered the first time somebody asks for them and saved under a hash of
+# those tables in <session>/plots/. Later requests for the same tables get
+# the saved file; a rerun that changes the tables changes the hash and the
+# plot is drawn again. Plotting libraries are imported by the renderers
+# only, so importing this module stays cheap.
+
+import hashlib
+import json
+import os
+import threading
+
+from capgenie.count_cache import count_cache
+from capgenie.store import result_store
+
+PLOTS_DIR = "plots"
+# Bump when a renderer changes its output so saved plots are drawn again
+PLOTS_VERSION = 1
+
+# Plot kinds: input tables ({dir} is the data directory) and the file extension
+PLOTS = {
+    "bubble.json": (["average_{dir}", "average_enrichment_{dir}"], ".json"),
+    "bubble.html": (["average_{dir}", "average_enrichment_{dir}"], ".html"),
+    "bubble.svg": (["average_{dir}", "average_enrichment_{dir}"], ".svg"),
+    "distribution.svg": (["average_{dir}"], ".svg"),
+}
+
+_digests = {}  # (path, mtime, size) --> content hash, per process
+_digests_lock = threading.Lock()
+
+"""
+plot_inputs: str, str, str --> list
+-- Paths of the tables a plot is drawn from
+* @param [in] session_path (str) - Session folder
+* @param [in] directory (str) - Data directory name
+* @param [in] kind (str) - Plot kind, a key of PLOTS
+* @param [out] paths (list) - Arrow files of the input tables
+** Raises KeyError for an unknown kind
+"""
+def plot_inputs(session_path, directory, kind):
+    tables, _ = PLOTS[kind]
+    store = result_store(session_path)
+    return [store.table_path(directory, table.format(dir=directory)) for table in tables]
+
+"""
+table_digest: str --> str
+-- Content hash of a table file, remembered while the file is unchanged
+* @param [in] path (str) - File to hash
+* @param [out] digest (str) - Hex SHA-256 of the contents
+** Store tables are written once, so size and mtime identify the contents
+"""
+def table_digest(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        if key in _digests:
+            return _digests[key]
+    digest = count_cache.file_digest(path)
+    with _digests_lock:
+        _digests[key] = digest
+    return digest
+
+"""
+plot_key: str, str, str --> str
+-- Hash of everything a plot depends on
+* @param [in] session_path (str) - Session folder
+* @param [in] directory (str) - Data directory name
+* @param [in] kind (str) - Plot kind
+* @param [out] key (str) - Hex SHA-256 of the kind and its input tables
+** Raises FileNotFoundError when an input table does not exist
+"""
+def plot_key(session_path, directory, kind):
+    parts = {"kind": kind, "directory": directory, "version": PLOTS_VERSION,
+             "tables": [table_digest(path) for path in plot_inputs(session_path, directory, kind)]}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+"""
+plot_path: str, str, str, str --> str
+-- Path a plot is saved to
+* @param [in] session_path (str) - Session folder
+* @param [in] directory (str) - Data directory name
+* @param [in] kind (str) - Plot kind
+* @param [in] key (str) - Output of plot_key
+* @param [out] path (str) - <session>/plots/<directory>/<name>-<key>.<ext>
+"""
+def plot_path(session_path, directory, kind, key):
+    name, _ = os.path.splitext(kind)
+    return os.path.join(session_path, PLOTS_DIR, directory, f"{name}-{key[:16]}{PLOTS[kind][1]}")
+
+"""
+render_plot: str, str, str, str --> str
+-- Returns a saved plot, rendering it first if needed
+* @param [in] session_path (str) - Session folder
+* @param [in] directory (str) - Data directory name
+* @param [in] kind (str) - Plot kind
+* @param [in] key (str) - Output of plot_key (computed when None)
+* @param [out] path (str) - Path of the plot file
+** Written to a temporary file and moved into place, so a reader never
+** sees half a plot. Older renders of the same kind are removed.
+"""
+def render_plot(session_path, directory, kind, key=None):
+    key = key or plot_key(session_path, directory, kind)
+    path = plot_path(session_path, directory, kind, key)
+    if os.path.exists(path):
+        return path
+
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp{PLOTS[kind][1]}"
+    try:
+        RENDERERS[kind](session_path, directory, temp)
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+    name, ext = os.path.splitext(os.path.basename(path))
+    stem = name.rsplit("-", 1)[0] + "-"
+    for entry in os.listdir(folder):
+        if entry.startswith(stem) and entry.endswith(ext) and entry != os.path.basename(path) and ".tmp" not in entry:
+            os.remove(os.path.join(folder, entry))
+    return path
+
+"""
+_bubble_data: str, str --> dict
+-- Bubble chart data of a data directory
+"""
+def _bubble_data(session_path, directory):
+    from capgenie.bubble import BUBBLE_PEPTIDES, bubble_data
+    store = result_store(session_path)
+    return bubble_data(store.read(directory, f"average_{directory}"),
+                       store.read(directory, f"average_enrichment_{directory}"), limit=BUBBLE_PEPTIDES)
+
+def _render_bubble_json(session_path, directory, path):
+    from capgenie.bubble import write_bubble_json
+    write_bubble_json(_bubble_data(session_path, directory), path)
+
+def _render_bubble_html(session_path, directory, path):
+    from capgenie.bubble import bubble_figure
+    bubble_figure(_bubble_data(session_path, directory), f"{directory}_data").write_html(path)
+
+def _render_bubble_svg(session_path, directory, path):
+    from capgenie.bubble import bubble_figure
+    bubble_figure(_bubble_data(session_path, directory), f"{directory}_data").write_image(
+        path, format="svg", width=1920, height=1080)
+
+def _render_distribution_svg(session_path, directory, path):
+    from capgenie.biodistribution import draw_bio_graph
+    average = result_store(session_path).read_table(directory, f"average_{directory}", columns=["Average Decimal"])
+    draw_bio_graph(average, f"average_{directory}.svg", path)
+
+RENDERERS = {
+    "bubble.json": _render_bubble_json,
+    "bubble.html": _render_bubble_html,
+    "bubble.svg": _render_bubble_svg,
+    "distribution.svg": _render_distribution_svg,
+}
+
+"""
+warm_up: None --> None
+-- Imports the plotting libraries ahead of the first plot
+** Run once per rendering process. The SVG exporter (kaleido) starts on
+** the first SVG and is then reused by the process for every later one.
+"""
+def warm_up():
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import pyplot  # noqa: F401
+    import plotly.graph_objects  # noqa: F401
+    import capgenie.biodistribution  # noqa: F401
+    import capgenie.bubble  # noqa: F401
@@ -0,0 +1,64 @@
+// Rate-limited progress reporting from the native engines.
+// Engines count bytes and reads as they scan a file and hand the running
+// totals to a ProgressReporter, which calls an optional Python callable
+// progress(bytes_done, reads_done) at most once per interval. It is meant
+// to be used with the GIL released and only takes it to make a call.
+#pragma once
+
+#include <chrono>
+#include <cstddef>
+#include <pybind11/pybind11.h>
+
+namespace py = pybind11;
+
+// Holds a Python object, so it shares pybind11's hidden visibility
+#if defined(__GNUG__) && !defined(_WIN32)
+#define PROGRESS_HIDDEN __attribute__((visibility("hidden")))
+#else
+#define PROGRESS_HIDDEN
+#endif
+
+class PROGRESS_HIDDEN ProgressReporter {
+public:
+    // Minimum time between two calls of the callback
+    static constexpr std::chrono::milliseconds INTERVAL{250};
+
+    explicit ProgressReporter(py::object callback) : callback(std::move(callback)),
+        last_report(std::chrono::steady_clock::now()) {}
+
+    ~ProgressReporter() {
+        // The callback is a Python object, so drop the reference with the GIL held
+        py::gil_scoped_acquire acquire;
+        callback = py::object();
+    }
+
+    bool enabled() const { return !callback.is_none(); }
+
+    /**
+     * update: size_t, size_t, bool --> void
+    -- Reports the running totals if the interval has passed (or force
+    -- is set). Reads the clock, so call it every few thousand reads
+    -- rather than for every read. An exception raised by the callback
+    -- is printed and stops further reports instead of aborting the scan.
+     * @param [in] bytes_done (size_t) - Bytes of the input processed so far
+     * @param [in] reads_done (size_t) - Reads processed so far
+     * @param [in] force (bool) - Report regardless of the interval, e.g. at the end
+    */
+    void update(size_t bytes_done, size_t reads_done, bool force = false) {
+        if (!enabled()) return;
+        auto now = std::chrono::steady_clock::now();
+        if (!force && now - last_report < INTERVAL) return;
+        last_report = now;
+        py::gil_scoped_acquire acquire;
+        try {
+            callback(bytes_done, reads_done);
+        } catch (py::error_already_set& e) {
+            e.discard_as_unraisable("progress callback");
+            callback = py::none();
+        }
+    }
+
+private:
+    py::object callback;
+    std::chrono::steady_clock::time_point last_report;
+};
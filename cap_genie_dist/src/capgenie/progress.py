@@ -0,0 +1,59 @@
+# Typed progress events of a pipeline run.
+# cap_genie reports each step to an optional callback, so callers such as
+# the web app follow a run without parsing its printed output. While
+# files are denoised or counted it also reports the bytes and reads the
+# native engines have scanned every TICK_INTERVAL seconds.
+
+from dataclasses import dataclass
+
+# Stages, in the order a run goes through them
+DENOISE = "denoise"
+MOTIF = "motif"
+COUNT = "count"
+REDUCE = "reduce"
+DONE = "done"
+
+# Seconds between two periodic updates of the scanned bytes and reads
+TICK_INTERVAL = 0.5
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    stage: str
+    message: str = ""
+    directory: str = None
+    file: str = None
+    # Running totals over the FASTQ files of the denoise or counting stage
+    files_done: int = 0
+    files_total: int = 0
+    bytes_done: int = 0
+    bytes_total: int = 0
+    # Reads scanned so far
+    reads_done: int = 0
+    # Scan rate since the stage started and the time left at that rate,
+    # None until there is something to measure
+    bytes_per_second: float = None
+    eta_seconds: float = None
+    # Set on the event that marks the end of a step, e.g. a counted file
+    finished: bool = False
+    # Set on the periodic updates of the scanned bytes and reads
+    tick: bool = False
+
+
+"""
+describe: ProgressEvent --> str
+-- Formats the totals of an event as a one-line summary
+* @param [in] event (ProgressEvent) - Progress event
+* @param [out] line (str) - e.g. "count: 45.1% of 2.6 GB, 1200000 reads, 85.3 MB/s, ETA 0:01:10"
+** Used by the command line progress output
+"""
+def describe(event):
+    percent = 100 * event.bytes_done / event.bytes_total if event.bytes_total else 0
+    size = f"{event.bytes_total / 1e9:.1f} GB" if event.bytes_total >= 1e9 else f"{event.bytes_total / 1e6:.0f} MB"
+    line = f"{event.stage}: {percent:.1f}% of {size}, {event.reads_done} reads"
+    if event.bytes_per_second:
+        line += f", {event.bytes_per_second / 1e6:.1f} MB/s"
+    if event.eta_seconds is not None:
+        minutes, seconds = divmod(int(event.eta_seconds), 60)
+        line += f", ETA {minutes // 60}:{minutes % 60:02d}:{seconds:02d}"
+    return line
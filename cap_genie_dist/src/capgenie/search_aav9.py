@@ -2,23 +2,27 @@
 # Written by Atul Phadke 2025 --> atulphadke8@gmail.com/phadke.at@northeastern.edu
 # Inspired by Killian Hanlon's 'Shuttlecock' package --> killian@transduction.cc
 
+# Bio, ahocorasick and inquirer are imported by the methods that use them,
+# so loading this module stays cheap
 from collections import Counter 
 from collections import OrderedDict
-from scipy.spatial.distance import hamming
 import os
-from Bio.Seq import Seq
 import pandas as pd
 from pandas import DataFrame
 import pickle as pkl
-import ahocorasick
-import os
-import inquirer
 import numpy as np
 from capgenie import mani
 from capgenie import filter_module ## See filter_count.cpp for more info
 from capgenie import fuzzy_match ## See fuzzy_match.cpp for more info
+from capgenie.store import result_store ## See store.py for more info
+from capgenie.manifest import run_manifest ## See manifest.py for more info
+from capgenie.progress import TICK_INTERVAL ## See progress.py for more info
 import json
 import shutil
+import time
+
+# Matches between two looks at the clock while a Python scan reports progress (a power of two minus one)
+PROGRESS_EVERY = (1 << 12) - 1
 
 class color:
 	PURPLE = '\033[95m'
@@ -35,8 +39,8 @@ class color:
 class search_aav9:
     def __init__(self):
         self._save_dir = ""
-        self._pkl_file_path = ""
-        self._instructions_file = ""
+        self._store = None
+        self._manifest = None
         self._cache_folder = ""
 
     # save_dir is where the session is placed in cache
@@ -44,20 +48,20 @@ class search_aav9:
     def save_dir(self):
         return self._save_dir
     
-    # pkl_file_path is the path where the pkl_files are stored
+    # store is the columnar result store for the session
     @property
-    def pkl_file_path(self):
-        return self._pkl_file_path
+    def store(self):
+        return self._store
     
     # points to instructions_file_path
     @property
     def intructions_file_path(self):
-        return self._instructions_file
+        return self._manifest.path
     
     # Loads instruction data
     @property
     def get_instructions_data(self):
-        return pkl.load(open(self._instructions_file, "rb"))
+        return self._manifest.materialize()
     
     """
     confirm_peptide: cls, str, str --> bool or str
@@ -71,6 +75,7 @@ class search_aav9:
     """    
     @classmethod
     def confirm_peptide(cls, seq, peptide):
+        from Bio.Seq import Seq
         seq = Seq(seq) 
         for nuc in [(seq), (seq.reverse_complement())]:
             for frame in range(3):
@@ -180,30 +185,40 @@ class search_aav9:
     ** Extracts DNA sequences from FASTQ file
     """
     def load_dna_seq(self, fastq_file):
+        return self.load_reads(fastq_file)[0]
+
+    """
+    load_reads: str --> str, int
+    -- Like load_dna_seq, but also returns the number of reads
+    * @param [in] fastq_file (str) - Path to FASTQ file
+    * @param [out] dna_seq (str) - Concatenated DNA sequences from file
+    * @param [out] num_reads (int) - Number of reads in the file
+    ** Extracts DNA sequences from FASTQ file
+    """
+    def load_reads(self, fastq_file):
         f=open(os.path.join(fastq_file), "r")
         content = f.read().split("\n")
         f.close()
 
-        dna_seq = "".join(content[1::4])
-        return dna_seq
+        reads = content[1::4]
+        return "".join(reads), len(reads)
     
     """
-    count_known_reads: dict, str, str --> None
+    count_known_reads: dict, str, str, bool --> str
     -- Takes a peptide_map from the given csv file and counts the
     -- number of occurances of every peptide. Then it prunes reads
     -- beyond a given threshold.
     * @param [in] peptide_map (dict) - Map of peptides to sequences
     * @param [in] fastq_file (str) - Path to FASTQ file
     * @param [in] data_directory (str) - Data directory path
-    * @param [out] None - Saves counts to pickle file
+    * @param [in] record (bool) - Whether to record the table in the run manifest
+    * @param [in] progress (callable) - Optional, called as progress(bytes_done, reads_done)
+    * @param [out] table_path (str) - Session-relative path of the saved table
     ** Counts known peptide reads in FASTQ file
     """
-    def count_known_reads(self, peptide_map, fastq_file, data_directory):
-        new_path = os.path.join(self._pkl_file_path, data_directory)
-        if not os.path.exists(new_path):
-            os.mkdir(new_path)
-
-        dna_seq = self.load_dna_seq(fastq_file=fastq_file)
+    def count_known_reads(self, peptide_map, fastq_file, data_directory, record=True, progress=None):
+        import ahocorasick
+        dna_seq, num_reads = self.load_reads(fastq_file)
 
         automaton = ahocorasick.Automaton()
 
@@ -213,8 +228,12 @@ class search_aav9:
         
         counts = {pattern: 0 for pattern in peptide_map.keys()}
 
-        for end_pos, pattern in automaton.iter(dna_seq):
+        report = self._scan_reporter(progress, fastq_file, num_reads, len(dna_seq))
+        for i, (end_pos, pattern) in enumerate(automaton.iter(dna_seq)):
             counts[pattern] += 1
+            if i & PROGRESS_EVERY == 0:
+                report(end_pos)
+        report(len(dna_seq), force=True)
 
         # Ensure all peptides are present, fill missing with 0
         for pattern in peptide_map.keys():
@@ -224,34 +243,27 @@ class search_aav9:
         sorted_count = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
         sorted_count = {peptide_map[k]:v for k,v in sorted_count.items()}
 
-        self.add_decimal(sorted_count, os.path.join(new_path, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"))
+        table_path = self.add_decimal(sorted_count, data_directory, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}")
 
-        with open(self._instructions_file, "rb+") as file:
-            content = pkl.load(file)
-            if "count_known_reads" in content:
-                content["count_known_reads"].append(os.path.join("pkl_files", data_directory, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"))
-            else:
-                content["count_known_reads"] = [os.path.join("pkl_files", data_directory, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl")]
-            file.seek(0)
-            file.truncate()
-            pkl.dump(content, file)
+        if record:
+            self._manifest.append("count_known_reads", table_path)
+        return table_path
 
     """
-    search_by_flank: str, str, str, str --> None
+    search_by_flank: str, str, str, str, bool --> str
     -- Searches for unknown variants between upstream and downstream sequences
     * @param [in] upstream (str) - Upstream flanking sequence
     * @param [in] downstream (str) - Downstream flanking sequence
     * @param [in] fastq_file (str) - Path to FASTQ file
     * @param [in] data_directory (str) - Data directory path
-    * @param [out] None - Saves unknown variants to pickle file
+    * @param [in] record (bool) - Whether to record the table in the run manifest
+    * @param [in] progress (callable) - Optional, called as progress(bytes_done, reads_done)
+    * @param [out] table_path (str) - Session-relative path of the saved table
     ** Searches for unknown variants between flanking sequences
     """
-    def search_by_flank(self, upstream, downstream, fastq_file, data_directory):
-        new_path = os.path.join(self._pkl_file_path, data_directory)
-        if not os.path.exists(new_path):
-            os.mkdir(new_path)
-
-        dna_seq = self.load_dna_seq(fastq_file=fastq_file)
+    def search_by_flank(self, upstream, downstream, fastq_file, data_directory, record=True, progress=None):
+        import ahocorasick
+        dna_seq, num_reads = self.load_reads(fastq_file)
 
         A = ahocorasick.Automaton()
         A.add_word(upstream, 1)
@@ -264,7 +276,11 @@ class search_aav9:
         len_f1 = len(upstream)
         len_f2 = len(downstream)
 
-        for end, tag in A.iter(dna_seq):
+        # Two passes over the reads: finding the flanks, then pairing them
+        report = self._scan_reporter(progress, fastq_file, num_reads, 2 * len(dna_seq))
+        for i, (end, tag) in enumerate(A.iter(dna_seq)):
+            if i & PROGRESS_EVERY == 0:
+                report(end)
             start = end - (len_f1 if tag == 1 else len_f2) + 1
             if tag == 1:
                 f1_pos.append((start, end))
@@ -275,7 +291,9 @@ class search_aav9:
         f2_idx = 0
         f2_len = len(f2_pos)
 
-        for f1_start, f1_end in f1_pos:
+        for i, (f1_start, f1_end) in enumerate(f1_pos):
+            if i & PROGRESS_EVERY == 0:
+                report(len(dna_seq) + f1_start)
             while f2_idx < f2_len and f2_pos[f2_idx][0] <= f1_end:
                 f2_idx += 1
             if f2_idx >= f2_len:
@@ -289,77 +307,94 @@ class search_aav9:
             if 12 <= read_len <= 25:
                 read = dna_seq[read_start:read_end]
                 read_counts[read] += 1
+        report(2 * len(dna_seq), force=True)
 
         sorted_read = dict(sorted(read_counts.items(), key=lambda item: item[1], reverse=True))
         sorted_read = self.prune_reads(0.05, sorted_read)
 
-        self.add_decimal(sorted_read, os.path.join(new_path, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"), merc=True)
+        table_path = self.add_decimal(sorted_read, data_directory, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}", merc=True)
 
-        with open(self._instructions_file, "rb+") as file:
-            content = pkl.load(file)
-            if "unknown_reads" in content:
-                content["unknown_reads"].append(os.path.join("pkl_files", data_directory, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"))
-            else:
-                content["unknown_reads"] = [os.path.join("pkl_files", data_directory, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl")]
-            file.seek(0)
-            file.truncate()
-            pkl.dump(content, file)
+        if record:
+            self._manifest.append("unknown_reads", table_path)
+        return table_path
 
     """
-    _cpp_fuzzy_match: dict, str, str, int, bool --> None
+    _scan_reporter: callable, str, int, int --> callable
+    -- Turns positions in a scan of the concatenated reads into progress
+    -- reports, at most one per TICK_INTERVAL
+    * @param [in] progress (callable) - Optional, called as progress(bytes_done, reads_done)
+    * @param [in] fastq_file (str) - Path to FASTQ file
+    * @param [in] num_reads (int) - Number of reads in the file
+    * @param [in] total (int) - Position at which the scan is done
+    * @param [out] report (callable) - report(position, force=False)
+    ** Positions are scaled to the file's bytes and reads
+    """
+    def _scan_reporter(self, progress, fastq_file, num_reads, total):
+        if progress is None or not total:
+            return lambda position, force=False: None
+        file_size = os.path.getsize(fastq_file)
+        last_report = time.monotonic()
+
+        def report(position, force=False):
+            nonlocal last_report
+            now = time.monotonic()
+            if force or now - last_report >= TICK_INTERVAL:
+                last_report = now
+                progress(file_size * position // total, num_reads * position // total)
+        return report
+
+    """
+    _cpp_fuzzy_match: dict, str, str, int, bool, bool --> str
     -- Fuzzy matches peptides in two ways: substitutions w/o indels.
     * @param [in] peptide_map (dict) - Map of peptides to sequences
     * @param [in] fastq_file (str) - Path to FASTQ file
     * @param [in] data_directory (str) - Data directory path
     * @param [in] mismatches (int) - Number of allowed mismatches
     * @param [in] subOnly (bool) - If True, only allow substitutions; if False, allow indels too
-    * @param [out] None - Saves fuzzy match results to pickle file
+    * @param [in] record (bool) - Whether to record the table in the run manifest
+    * @param [in] progress (callable) - Optional, called as progress(bytes_done, reads_done)
+    * @param [out] table_path (str) - Session-relative path of the saved table
     ** Note: substitutions w indels is much slower than just substitutions, but provides
     ** more accurate results. Powered by edlib. Please visit and give credit at github.com/Martinos/edlib
     """
-    def _cpp_fuzzy_match(self, peptide_map, fastq_file, data_directory, mismatches, subOnly=False):
-        new_path = os.path.join(self._pkl_file_path, data_directory)
-        if not os.path.exists(new_path):
-            os.mkdir(new_path)
+    def _cpp_fuzzy_match(self, peptide_map, fastq_file, data_directory, mismatches, subOnly=False, record=True, progress=None):
+        dna_seq, num_reads = self.load_reads(fastq_file)
 
-        dna_seq = self.load_dna_seq(fastq_file=fastq_file)
+        on_progress = None
+        if progress is not None and dna_seq:
+            # The engine reports its position in the concatenated sequence,
+            # scale it to the FASTQ file
+            file_size = os.path.getsize(fastq_file)
+            on_progress = lambda done, reads_done: progress(file_size * done // len(dna_seq), reads_done)
 
-        counts = fuzzy_match.fuzzy_match(list(peptide_map.keys()), dna_seq.encode(), mismatches, subOnly)
+        counts = fuzzy_match.fuzzy_match(list(peptide_map.keys()), dna_seq.encode(), mismatches, subOnly, on_progress, num_reads)
 
         sorted_count = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
 
         sorted_count = {peptide_map[k]:v for k,v in sorted_count.items()}
 
-        self.add_decimal(sorted_count, os.path.join(new_path, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"))
+        table_path = self.add_decimal(sorted_count, data_directory, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}")
 
-        with open(self._instructions_file, "rb+") as file:
-            content = pkl.load(file)
-            if "count_known_reads" in content:
-                content["count_known_reads"].append(os.path.join("pkl_files", data_directory, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"))
-            else:
-                content["count_known_reads"] = [os.path.join("pkl_files", data_directory, f"variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl")]
-            file.seek(0)
-            file.truncate()
-            pkl.dump(content, file)
+        if record:
+            self._manifest.append("count_known_reads", table_path)
+        return table_path
 
     """
-    _cpp_filter_count: str, str, str --> None
+    _cpp_filter_count: str, str, str, bool --> str
     -- Python wrapper for filter_count.cpp (see for more detail)
     -- Searches fastq files for AAV9 sequence containing 21-mer inserts 
     -- and pulls out, sorts and counts them.
     * @param [in] data_directory (str) - Data directory path
     * @param [in] fastq_file (str) - Path to FASTQ file
     * @param [in] refseq (str) - Reference sequence
-    * @param [out] None - Saves filtered results to pickle file
+    * @param [in] record (bool) - Whether to record the table in the run manifest
+    * @param [in] progress (callable) - Optional, called as progress(bytes_done, reads_done)
+    * @param [out] table_path (str) - Session-relative path of the saved table
     ** Wrapper for C++ filter_count function
     """
-    def _cpp_filter_count(self, data_directory, fastq_file, refseq):
-        new_path = os.path.join(self._pkl_file_path, data_directory)
-        if not os.path.exists(new_path):
-            os.mkdir(new_path)
-
+    def _cpp_filter_count(self, data_directory, fastq_file, refseq, record=True, progress=None):
         result = filter_module.FilterResult()
-        result = filter_module.filter_count(fastq_file.encode(), refseq.encode())
+        result = filter_module.filter_count(fastq_file.encode(), refseq.encode(), progress)
 
         print(len(result.forward_reads))
         print(len(result.reverse_reads))
@@ -369,29 +404,24 @@ class search_aav9:
          
         merc = self.prune_reads(0.05, merc)
 
-        self.add_decimal(merc, os.path.join(new_path, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"), merc=True)
+        table_path = self.add_decimal(merc, data_directory, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}", merc=True)
 
-        with open(self._instructions_file, "rb+") as file:
-            content = pkl.load(file)
-            if "unknown_reads" in content:
-                content["unknown_reads"].append(os.path.join("pkl_files", data_directory, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl"))
-            else:
-                content["unknown_reads"] = [os.path.join("pkl_files", data_directory, f"unknown_variants_{os.path.basename(fastq_file.replace('.fastq', ''))}.pkl")]
-            file.seek(0)
-            file.truncate()
-            pkl.dump(content, file)
+        if record:
+            self._manifest.append("unknown_reads", table_path)
+        return table_path
 
     """
-    add_decimal: dict, str, bool --> None
+    add_decimal: dict, str, str, bool --> str
     -- Add's a Decimal column to a dictionary with Peptide's and there
     -- counts
     * @param [in] data_dict (dict) - Dictionary with peptide counts
-    * @param [in] file (str) - Path to save pickle file
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name in the result store
     * @param [in] merc (bool) - Whether to translate peptides
-    * @param [out] None - Saves DataFrame with decimal column to pickle file
+    * @param [out] table_path (str) - Session-relative path of the saved table
     ** Adds decimal column to peptide count dictionary
     """
-    def add_decimal(self, data_dict, file, merc=False):
+    def add_decimal(self, data_dict, data_directory, name, merc=False):
         df = pd.DataFrame(list(data_dict.items()), columns=["Peptide", "Count"])
         total = df["Count"].sum()
         if total == 0:
@@ -401,17 +431,17 @@ class search_aav9:
         # Do not filter out zeros, keep all peptides
         if merc:
             df["Peptide"] = df["Peptide"].apply(self.translate)
-        df.to_pickle(file)
+        return self._store.write(data_directory, name, df)
 
     """
     create_avg_pkl: str, list, str --> str
-    -- Creates an average pkl file with all the data from the other fastq 
+    -- Creates an average table with all the data from the other fastq 
     -- files. Adds a Decimal Column too.
     * @param [in] data_directory (str) - Data directory path
     * @param [in] files (list) - List of file names
     * @param [in] instruction_link (str) - Instruction link for file extension
     * @param [out] result (str) - Name of the generated average file
-    ** Creates average pickle file from multiple FASTQ files
+    ** Creates average table in the result store from multiple FASTQ files
     """
     def create_avg_pkl(self, data_directory, files, instruction_link):
         if instruction_link == "count_known_reads":
@@ -419,23 +449,25 @@ class search_aav9:
         else:
             file_ext = "unknown_variants_"
 
-        df_list = [pd.read_pickle(os.path.join(self.pkl_file_path, data_directory, f"{file_ext}{file}").replace(".fastq", ".pkl")) for file in files]
+        df_list = [self._store.read(data_directory, f"{file_ext}{file}", columns=["Peptide", "Decimal"]) for file in files]
         foo = []
 
         for d in df_list:
             obj_dict = dict(zip(d.Peptide, d.Decimal))
             foo.append(obj_dict)
         
+        # Peptides in first-seen order and a stable sort keep the row order
+        # reproducible across runs (a set would follow hash randomization)
         bar = {
             k: [d.get(k) for d in foo]
-            for k in set().union(*foo)
+            for k in dict.fromkeys(k for d in foo for k in d)
         }
 
         merged_df = DataFrame.from_dict(bar, orient="index", columns=files)
         merged_df.index.name = "Peptide"
         merged_df["Average Decimal"] = merged_df[files].mean(axis=1)
-        merged_df = merged_df.sort_values("Average Decimal", ascending=False)
-        pkl.dump(merged_df, open(os.path.join(self._pkl_file_path, data_directory, f"average_{data_directory}.pkl"), "wb+"))
+        merged_df = merged_df.sort_values("Average Decimal", ascending=False, kind="stable")
+        self._store.write(data_directory, f"average_{data_directory}", merged_df)
         return f"average_{data_directory}.fastq"
     
     """
@@ -534,49 +566,45 @@ class search_aav9:
     
     """
     save_denoise_result: DenoiseResult, str --> None
-    -- Saves denoising results to instructions file
+    -- Saves denoising results to the run manifest
     * @param [in] result (DenoiseResult) - Denoising result object
     * @param [in] file (str) - File name for saving results
-    * @param [out] None - Saves denoising results to instructions file
+    * @param [out] None - Appends denoising results to the run manifest
     ** Saves denoising statistics to session instructions
     """
     def save_denoise_result(self, result, file):
-        with open(self._instructions_file, "rb") as instruction_file:
-            content = pkl.load(instruction_file)
-        
-        with open(self._instructions_file, "wb") as instruction_file:
-            if "denoise" not in content:
-                content["denoise"] = [{file : {
-                    "avg_quality": result.avg_quality,
-                    "total_chars": result.total_chars,
-                    "low_quality_reads": result.low_quality_reads,
-                    "num_reads": result.num_reads,
-                    "threshold": result.threshold,
-                    "output_filename": result.output_filename
-                }}]
-            else:
-                content["denoise"].append({file : {
-                    "avg_quality": result.avg_quality,
-                    "total_chars": result.total_chars,
-                    "low_quality_reads": result.low_quality_reads,
-                    "num_reads": result.num_reads,
-                    "threshold": result.threshold,
-                    "output_filename": result.output_filename
-                }})
-            print(content)
-            pkl.dump(content, instruction_file)
-            
+        entry = {file : {
+            "avg_quality": result.avg_quality,
+            "total_chars": result.total_chars,
+            "low_quality_reads": result.low_quality_reads,
+            "num_reads": result.num_reads,
+            "threshold": result.threshold,
+            "output_filename": result.output_filename
+        }}
+        print(entry)
+        self._manifest.append("denoise", entry)
+
+    """
+    record_result: str, str --> None
+    -- Records a table produced with record=False in the run manifest.
+    -- Used by parallel runs so entries keep the serial file order.
+    * @param [in] instruction_link (str) - Manifest key, e.g. "count_known_reads"
+    * @param [in] table_path (str) - Session-relative path of the table
+    * @param [out] None - Appends the table to the manifest
+    ** Records a per-file result
+    """
+    def record_result(self, instruction_link, table_path):
+        self._manifest.append(instruction_link, table_path)
 
     """
     _serialize_pkl: None --> None
-    -- Serializes pickle instructions to JSON format
+    -- Compacts the run manifest and materializes it as JSON
     * @param [out] None - Saves instructions as JSON file
-    ** Converts pickle instructions to JSON format for human readability
+    ** Writes the session instructions to instruction.json for human readability
     """
     def _serialize_pkl(self):
-        with open(self._instructions_file, "rb+") as instruction_file:
-            content = pkl.load(instruction_file)
-        
+        content = self._manifest.compact()
+
         with open(os.path.join(self._cache_folder, self._save_dir, "instruction.json"), "w") as f:
             json.dump(content, f)
 
@@ -595,6 +623,7 @@ class search_aav9:
         sessions = os.listdir(self._cache_folder)
 
         if len(sessions) > 0:
+            import inquirer # Only needed for the interactive prompt
             sessions.append("Create new one")
             questions = [
                 inquirer.List("Previous sessions",
@@ -606,24 +635,38 @@ class search_aav9:
             if answers == "Create new one":
                 self._save_dir = input("Type a name for this session: ")
                 os.mkdir(os.path.join(self._cache_folder, self._save_dir))
-                self._instructions_file = os.path.join(self._cache_folder, self._save_dir, "instructions.pkl")
-                with open(self._instructions_file, "wb") as f:
-                    pkl.dump({"Session": self._save_dir}, f)
+                self._manifest = run_manifest(os.path.join(self._cache_folder, self._save_dir))
+                self._manifest.create(self._save_dir)
             else:
                 self._save_dir = answers
-                self._instructions_file = os.path.join(self._cache_folder, self._save_dir, "instructions.pkl")
+                self._manifest = run_manifest(os.path.join(self._cache_folder, self._save_dir))
+                self._migrate_instructions()
         else:
             print("You have no previous sessions, creating a new one...")
             self._save_dir = input("Type a name for this session: ")
-            self._instructions_file = os.path.join(self._cache_folder, self._save_dir, "instructions.pkl")
             os.mkdir(os.path.join(self._cache_folder, self._save_dir))
-            with open(self._instructions_file, "wb") as f:
-                pkl.dump({"Session": self._save_dir}, f)
+            self._manifest = run_manifest(os.path.join(self._cache_folder, self._save_dir))
+            self._manifest.create(self._save_dir)
 
-        self._pkl_file_path = os.path.join(self._cache_folder, self._save_dir, "pkl_files")
-        if not os.path.exists(self._pkl_file_path):
-            os.mkdir(self._pkl_file_path)
+        self._store = result_store(os.path.join(self._cache_folder, self._save_dir))
         
+    """
+    _migrate_instructions: None --> None
+    -- Seeds the run manifest of a session created before manifests
+    -- existed from its instructions.pkl
+    * @param [out] None - Writes the manifest snapshot if needed
+    ** Converts legacy pickle instructions to the run manifest
+    """
+    def _migrate_instructions(self):
+        if self._manifest.exists():
+            return
+        legacy_file = os.path.join(self._cache_folder, self._save_dir, "instructions.pkl")
+        if os.path.exists(legacy_file):
+            with open(legacy_file, "rb") as f:
+                self._manifest.replace(pkl.load(f))
+        else:
+            self._manifest.create(self._save_dir)
+
     """
     _override_session: str --> None
     -- Creates a new session based on session_name,
@@ -639,15 +682,12 @@ class search_aav9:
             os.mkdir(self._cache_folder)
             
         self._save_dir = session_folder
-        self._instructions_file = os.path.join(self._cache_folder, self._save_dir, "instructions.pkl")
         
         os.mkdir(os.path.join(self._cache_folder, self._save_dir))
-        with open(self._instructions_file, "wb") as f:
-            pkl.dump({"Session": self._save_dir}, f)
+        self._manifest = run_manifest(os.path.join(self._cache_folder, self._save_dir))
+        self._manifest.create(self._save_dir)
 
-        self._pkl_file_path = os.path.join(self._cache_folder, self._save_dir, "pkl_files")
-        if not os.path.exists(self._pkl_file_path):
-            os.mkdir(self._pkl_file_path)
+        self._store = result_store(os.path.join(self._cache_folder, self._save_dir))
 
     """
     save_to_output: str --> None
@@ -1,59 +1,159 @@
 # File that processses read data and saves them into spreadsheets
 # calculations for extra fields: mean, range, std, outlier // WIP
 
-import pandas as pd
 import os
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from capgenie.store import result_store
+
+# Rows pulled from the memory-mapped table per write, keeps exports constant memory
+EXPORT_BATCH_ROWS = 65536
+# Hard row limit of a single Excel worksheet (including the header row)
+EXCEL_MAX_ROWS = 1048576
+
+"""
+ * write_csv: pa.Table, str --> None
+-- Streams an Arrow table to a CSV file batch by batch
+ * @param [in] table (pa.Table) - Table to export
+ * @param [in] path (str) - Destination file path
+ * @param [out] None - Writes the CSV file
+** Constant-memory CSV export
+"""
+def write_csv(table, path):
+    with pa_csv.CSVWriter(path, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+            writer.write_batch(batch)
+
+"""
+ * write_parquet: pa.Table, str --> None
+-- Streams an Arrow table to a Parquet file batch by batch
+ * @param [in] table (pa.Table) - Table to export
+ * @param [in] path (str) - Destination file path
+ * @param [out] None - Writes the Parquet file
+** Constant-memory Parquet export
+"""
+def write_parquet(table, path):
+    with pq.ParquetWriter(path, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+            writer.write_batch(batch)
+
+"""
+ * write_excel: pa.Table, str --> None
+-- Streams an Arrow table to an .xlsx workbook using openpyxl's
+-- write-only mode. Tables longer than one worksheet continue on
+-- the next sheet.
+ * @param [in] table (pa.Table) - Table to export
+ * @param [in] path (str) - Destination file path
+ * @param [out] None - Writes the Excel file
+** Constant-memory Excel export
+"""
+def write_excel(table, path):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    rows_in_sheet = EXCEL_MAX_ROWS
+    for batch in table.to_batches(max_chunksize=EXPORT_BATCH_ROWS):
+        columns = [column.to_pylist() for column in batch.columns]
+        for row in zip(*columns):
+            if rows_in_sheet == EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet()
+                sheet.append(table.column_names)
+                rows_in_sheet = 1
+            sheet.append(row)
+            rows_in_sheet += 1
+    if sheet is None:
+        workbook.create_sheet().append(table.column_names)
+    workbook.save(path)
 
 
 class spreadsheet:
-    def __init__(self, session_dir, sheets_dir, cache_folder):
+    # -s/--spreadsheet_extension values mapped to file extensions, "none" skips export
+    FORMATS = {"excel": ".xlsx", "xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet", "none": None}
+    WRITERS = {".xlsx": write_excel, ".csv": write_csv, ".parquet": write_parquet}
+
+    def __init__(self, session_dir, sheets_dir, cache_folder, extension="Excel"):
         self.session_dir = session_dir
         self.sheets_dir = sheets_dir
         self.cache_folder = cache_folder
+        self.extension = self.file_extension(extension)
 
     """
-    save_file: str, str, str, str, bool, bool --> None
-    -- Saves file into an excel spreadsheet
-    * @param [in] pkl_file_path (str) - Path to pickle file directory
+    file_extension: cls, str --> str
+    -- Maps a spreadsheet format name (Excel, CSV, Parquet, none)
+    -- to the file extension it is exported with
+    * @param [in] fmt (str) - Format name or extension
+    * @param [out] extension (str) - File extension, or None to skip export
+    ** Raises ValueError for unknown formats
+    """
+    @classmethod
+    def file_extension(cls, fmt):
+        key = str(fmt).lower().lstrip(".")
+        if key not in cls.FORMATS:
+            raise ValueError(f"Unknown spreadsheet format: {fmt}")
+        return cls.FORMATS[key]
+
+    """
+    register_format: cls, str, str, function --> None
+    -- Registers an additional export format
+    * @param [in] name (str) - Format name accepted by -s/--spreadsheet_extension
+    * @param [in] extension (str) - File extension, including the dot
+    * @param [in] writer (function) - Function taking (pa.Table, path)
+    * @param [out] None - Adds the format to FORMATS and WRITERS
+    ** Extension point for export formats
+    """
+    @classmethod
+    def register_format(cls, name, extension, writer):
+        cls.FORMATS[name.lower()] = extension
+        cls.WRITERS[extension] = writer
+
+    """
+    export_table: cls, result_store, str, str, str --> str
+    -- Streams one table from the result store to a file. The export
+    -- format is picked from the destination's extension and the file
+    -- is renamed into place once complete.
+    * @param [in] store (result_store) - Session result store
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [in] path (str) - Destination file path
+    * @param [out] path (str) - Path of the exported file
+    ** Exports a stored table with the peptide column first
+    """
+    @classmethod
+    def export_table(cls, store, data_directory, name, path):
+        writer = cls.WRITERS[os.path.splitext(path)[1]]
+        table = store.read_table(data_directory, name)
+        index_columns = result_store.index_columns(table)
+        table = table.select(index_columns + [c for c in table.column_names if c not in index_columns])
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        root, ext = os.path.splitext(path)
+        tmp_path = f"{root}.{os.getpid()}.tmp{ext}"
+        writer(table, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    """
+    save_file: result_store, str, str, str, bool, bool --> str
+    -- Exports a table into the spreadsheets folder in the format
+    -- chosen with -s/--spreadsheet_extension
+    * @param [in] store (result_store) - Session result store holding the table
     * @param [in] file (str) - File name to save
     * @param [in] data_directory (str) - Data directory path
     * @param [in] instruction_link (str) - Instruction link for file extension
     * @param [in] avg_file (bool) - Whether this is an average file
     * @param [in] barcode (bool) - Whether to include barcode processing
-    * @param [out] None - Saves Excel file to sheets directory
-    ** Saves processed data to Excel spreadsheet format
+    * @param [out] path (str) - Exported file path, or None when export is disabled
+    ** Saves processed data to spreadsheet format
     """
-    def save_file(self, pkl_file_path, file, data_directory, instruction_link, avg_file=False, barcode=True):
+    def save_file(self, store, file, data_directory, instruction_link, avg_file=False, barcode=True):
+        if self.extension is None:
+            return None
+
         if instruction_link == "count_known_reads":
             file_ext = "variants_"
         else:
             file_ext = "unknown_variants_"
 
-        if not os.path.exists(os.path.join(self.sheets_dir, data_directory)):
-            os.mkdir(os.path.join(self.sheets_dir, data_directory))
-
-        if not avg_file:
-            df = pd.read_pickle(os.path.join(pkl_file_path, data_directory, f"{file_ext}{file}").replace(".fastq", ".pkl"))
-            # Ensure all expected peptides are present, fill missing with 0
-            if "Peptide" in df.columns and "Count" in df.columns:
-                all_peptides = df["Peptide"].unique().tolist()
-                df = df.set_index("Peptide")
-                for peptide in all_peptides:
-                    if peptide not in df.index:
-                        df.loc[peptide] = {"Count": 0, "Decimal": 0.0}
-                df = df.reset_index()
-            df.to_excel(os.path.join(self.sheets_dir, data_directory, f"{file_ext}{file}").replace(".fastq", ".xlsx"))
-        else:
-            df = pd.read_pickle(os.path.join(pkl_file_path, data_directory, file).replace(".fastq", ".pkl"))
-            #extra_columns = ["_".join(column.split("_")[0:2]) for column in df.columns.to_list()[:-1]]
-            #extra_columns.append(df.columns.to_list()[-1])
-            #df.columns = extra_columns
-            df.to_excel(os.path.join(self.sheets_dir, data_directory, file).replace(".fastq", ".xlsx"))
-
-
-
-        
-                
-        
-        
-        
\ No newline at end of file
+        name = result_store.table_name(file if avg_file else f"{file_ext}{file}")
+        return self.export_table(store, data_directory, name, os.path.join(self.sheets_dir, data_directory, name + self.extension))
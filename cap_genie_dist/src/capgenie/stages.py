@@ -0,0 +1,181 @@
+# Dependency-aware executor of the pipeline stages.
+# A run is a graph of stages, each naming the stages whose outputs it
+# reads. A stage starts as soon as those have finished, on the pool that
+# fits its work: CPU stages (counting, averages, enrichment) on the worker
+# processes, IO stages (spreadsheet exports, plots) on threads and LOCAL
+# stages (manifest bookkeeping) in the scheduling thread itself. So the
+# exports and plots of one directory run while the next one is counting.
+# Every stage is timed.
+
+import heapq
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+
+# Pools a stage can run on
+CPU = "cpu"
+IO = "io"
+LOCAL = "local"
+
+
+@dataclass
+class stage:
+    name: str
+    func: object
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    # Stages whose outputs this one reads
+    after: tuple = ()
+    pool: str = CPU
+    # Called in the scheduling thread with the stage's result
+    on_done: object = None
+    # Called in the scheduling thread when the stage starts
+    on_start: object = None
+    # Ready stages with a lower priority start first, then in the order they were added
+    priority: int = 0
+
+
+@dataclass(frozen=True)
+class stage_timing:
+    name: str
+    pool: str
+    # Seconds from the start of the run to the start of the stage
+    start: float
+    seconds: float
+
+    """
+    kind: None --> str
+    -- Kind of stage, the part of its name before the colon
+    """
+    @property
+    def kind(self):
+        return self.name.split(":", 1)[0]
+
+
+class stage_graph:
+    def __init__(self):
+        self.stages = {}
+        self.timings = []
+
+    """
+    add: str, callable, *any, tuple, str, callable, int, callable, **any --> str
+    -- Adds a stage to the graph
+    * @param [in] name (str) - Unique stage name, "<kind>:<what>"
+    * @param [in] func (callable) - Work of the stage; picklable for CPU stages run on processes
+    * @param [in] args (tuple) - Positional arguments of func
+    * @param [in] after (tuple) - Names of the stages it depends on, already added
+    * @param [in] pool (str) - CPU, IO or LOCAL
+    * @param [in] on_done (callable) - Optional, called with the result in the scheduling thread
+    * @param [in] priority (int) - Ready stages with a lower priority start first
+    * @param [in] on_start (callable) - Optional, called without arguments in the scheduling thread as the stage starts
+    * @param [in] kwargs (dict) - Keyword arguments of func
+    * @param [out] name (str) - The stage name, to depend on
+    ** Dependencies must be added first, so the graph has no cycles
+    """
+    def add(self, name, func, *args, after=(), pool=CPU, on_done=None, priority=0, on_start=None, **kwargs):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage {name}")
+        missing = [dep for dep in after if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(missing)}")
+        self.stages[name] = stage(name, func, args, kwargs, tuple(after), pool, on_done, on_start, priority)
+        return name
+
+    """
+    run: dict --> dict
+    -- Runs every stage once its dependencies have finished
+    * @param [in] pools (dict) - CPU and IO pool: (executor, number of workers)
+    * @param [out] results (dict) - Result of each stage by name
+    ** Ready stages start by priority, then in the order they were added.
+    ** No more are submitted to a pool than it has workers, so a stage
+    ** starts (and its on_start runs) when a worker is free for it, and a stage
+    ** that becomes ready (e.g. the average of the first directory) is not
+    ** queued behind every other one already ready. The first failure
+    ** cancels the stages not started and is raised once the running ones
+    ** finish.
+    """
+    def run(self, pools):
+        order = {name: (s.priority, index) for index, (name, s) in enumerate(self.stages.items())}
+        waiting = {name: len(set(s.after)) for name, s in self.stages.items()}
+        dependents = {name: [] for name in self.stages}
+        for name, s in self.stages.items():
+            for dep in set(s.after):
+                dependents[dep].append(name)
+        ready = {CPU: [], IO: [], LOCAL: []}
+        for name, count in waiting.items():
+            if count == 0:
+                heapq.heappush(ready[self.stages[name].pool], (*order[name], name))
+
+        results = {}
+        running = {}  # future --> stage
+        busy = {CPU: 0, IO: 0}
+        self.timings = []
+        started = time.time()
+
+        def start(s):
+            if s.on_start is not None:
+                s.on_start()
+
+        def finish(s, outcome):
+            result, start, seconds = outcome
+            results[s.name] = result
+            self.timings.append(stage_timing(s.name, s.pool, start - started, seconds))
+            if s.on_done is not None:
+                s.on_done(result)
+            for name in dependents[s.name]:
+                waiting[name] -= 1
+                if waiting[name] == 0:
+                    heapq.heappush(ready[self.stages[name].pool], (*order[name], name))
+
+        try:
+            while len(results) < len(self.stages):
+                while ready[LOCAL]:
+                    s = self.stages[heapq.heappop(ready[LOCAL])[2]]
+                    start(s)
+                    finish(s, _timed(s.func, s.args, s.kwargs))
+                for pool in (CPU, IO):
+                    executor, workers = pools[pool]
+                    while ready[pool] and busy[pool] < workers:
+                        s = self.stages[heapq.heappop(ready[pool])[2]]
+                        start(s)
+                        running[executor.submit(_timed, s.func, s.args, s.kwargs)] = s
+                        busy[pool] += 1
+                if ready[LOCAL]:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                # Finish in submission order so callbacks run in a stable order
+                for future in [f for f in running if f in done]:
+                    s = running.pop(future)
+                    busy[s.pool] -= 1
+                    finish(s, future.result())
+        except BaseException:
+            for future in running:
+                future.cancel()
+            wait(running)
+            raise
+        return results
+
+    """
+    summary: None --> list
+    -- Time spent per kind of stage in the last run
+    * @param [out] rows (list) - (kind, stages, seconds), slowest first
+    """
+    def summary(self):
+        totals = {}
+        for timing in self.timings:
+            count, seconds = totals.get(timing.kind, (0, 0.0))
+            totals[timing.kind] = (count + 1, seconds + timing.seconds)
+        return sorted(((kind, count, seconds) for kind, (count, seconds) in totals.items()), key=lambda row: -row[2])
+
+"""
+_timed: callable, tuple, dict --> any, float, float
+-- Runs a stage and measures it where it runs
+* @param [out] result (any) - Result of func
+* @param [out] start (float) - Wall clock start, comparable across processes
+* @param [out] seconds (float) - Duration
+"""
+def _timed(func, args, kwargs):
+    start = time.time()
+    began = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, start, time.perf_counter() - began
@@ -0,0 +1,259 @@
+# Columnar result store for a capgenie session.
+# Every table the pipeline produces (per-FASTQ counts, averages, enrichment)
+# is written once as an uncompressed Arrow IPC file under <session>/store/,
+# so later stages, plots and the web viewer memory-map it instead of
+# unpickling or parsing Excel.
+
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+class result_store:
+    STORE_DIR = "store"
+    EXTENSION = ".arrow"
+    # Sidecar holding the precomputed sort orders of a table
+    ORDER_EXTENSION = ".order"
+
+    def __init__(self, session_path):
+        self.session_path = session_path
+        self.root = os.path.join(session_path, self.STORE_DIR)
+
+    """
+    table_name: cls, str --> str
+    -- Strips the .fastq/.pkl/.arrow extension from a file name so
+    -- pipeline file names map onto store table names
+    * @param [in] file (str) - File or table name
+    * @param [out] name (str) - Table name without extension
+    ** Normalizes file names to table names
+    """
+    @classmethod
+    def table_name(cls, file):
+        name = os.path.basename(file)
+        for ext in (".fastq", ".pkl", cls.EXTENSION):
+            if name.endswith(ext):
+                return name[:-len(ext)]
+        return name
+
+    """
+    table_path: str, str --> str
+    -- Returns the absolute path of a table in the store
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [out] path (str) - Path to the .arrow file
+    ** Resolves a table to its file path
+    """
+    def table_path(self, data_directory, name):
+        return os.path.join(self.root, data_directory, self.table_name(name) + self.EXTENSION)
+
+    """
+    relative_path: str, str --> str
+    -- Returns the path of a table relative to the session folder,
+    -- as recorded in the session instructions
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [out] path (str) - Session-relative path to the .arrow file
+    ** Resolves a table to its session-relative path
+    """
+    def relative_path(self, data_directory, name):
+        return os.path.join(self.STORE_DIR, data_directory, self.table_name(name) + self.EXTENSION)
+
+    """
+    exists: str, str --> bool
+    -- Checks whether a table has been written
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [out] result (bool) - True if the table exists
+    ** Checks for a table in the store
+    """
+    def exists(self, data_directory, name):
+        return os.path.exists(self.table_path(data_directory, name))
+
+    """
+    write: str, str, pd.DataFrame --> str
+    -- Writes a DataFrame to the store with compact dtypes. The file is
+    -- written to a temporary name and renamed so readers never see a
+    -- partially written table.
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [in] df (pd.DataFrame) - Table to write
+    * @param [out] path (str) - Session-relative path of the written table
+    ** Writes a table as an uncompressed Arrow IPC file
+    """
+    def write(self, data_directory, name, df):
+        path = self.table_path(data_directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        table = pa.Table.from_pandas(self.compact(df))
+        self._write_ipc(path, table)
+        try:
+            os.remove(self.order_path(data_directory, name))
+        except FileNotFoundError:
+            pass
+        return self.relative_path(data_directory, name)
+
+    """
+    order_path: str, str --> str
+    -- Returns the path of a table's sort order sidecar
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [out] path (str) - Path to the .order file
+    ** Resolves a table to its sort orders
+    """
+    def order_path(self, data_directory, name):
+        return os.path.join(self.root, data_directory, self.table_name(name) + self.ORDER_EXTENSION)
+
+    """
+    sort_order: str, str, str, bool --> np.ndarray
+    -- Returns the row order of a table sorted by one column. The
+    -- ascending and descending orders of every column are computed
+    -- once, stored next to the table and memory-mapped afterwards.
+    -- Sorts are stable and NaN/null values always come last (Arrow
+    -- places nulls at the end by default).
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [in] column (str) - Column to sort by
+    * @param [in] descending (bool) - Sort from largest to smallest
+    * @param [out] order (np.ndarray) - Row indices in sorted order
+    ** Precomputed sort orders for paginated table views
+    """
+    def sort_order(self, data_directory, name, column, descending=False):
+        key = f"{column}:{'desc' if descending else 'asc'}"
+        table_mtime = str(os.stat(self.table_path(data_directory, name)).st_mtime_ns).encode()
+        path = self.order_path(data_directory, name)
+        try:
+            with pa.memory_map(path, "r") as source:
+                orders = pa.ipc.open_file(source).read_all()
+            if (orders.schema.metadata or {}).get(b"table_mtime") != table_mtime:
+                orders = None
+        except (FileNotFoundError, pa.ArrowInvalid):
+            orders = None
+
+        if orders is None:
+            orders = self.sort_orders(self.read_table(data_directory, name))
+            orders = orders.replace_schema_metadata({b"table_mtime": table_mtime})
+            self._write_ipc(path, orders)
+        return orders.column(key).to_numpy()
+
+    """
+    sort_orders: cls, pa.Table --> pa.Table
+    -- Computes the ascending and descending row order of every column
+    * @param [in] table (pa.Table) - Table to sort
+    * @param [out] orders (pa.Table) - uint32 columns named "<column>:asc" and "<column>:desc"
+    ** Stable sorts with NaN/null values placed last
+    """
+    @classmethod
+    def sort_orders(cls, table):
+        orders = {}
+        for column in table.column_names:
+            for direction, suffix in (("ascending", "asc"), ("descending", "desc")):
+                values = table.column(column)
+                if pa.types.is_floating(values.type):
+                    # NaN sorts as the largest value in Arrow, send it to the end as null
+                    values = pc.if_else(pc.is_nan(values), pa.scalar(None, values.type), values)
+                indices = pc.sort_indices(pa.table({"v": values}), sort_keys=[("v", direction)])
+                orders[f"{column}:{suffix}"] = indices.cast(pa.uint32())
+        return pa.table(orders)
+
+    """
+    _write_ipc: str, pa.Table --> None
+    -- Writes an Arrow table to a temporary file and renames it into
+    -- place so readers never see a partially written file
+    * @param [in] path (str) - Destination path
+    * @param [in] table (pa.Table) - Table to write
+    * @param [out] None - Writes the file
+    ** Atomic Arrow IPC write
+    """
+    def _write_ipc(self, path, table):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    """
+    read_table: str, str, list --> pa.Table
+    -- Memory-maps a table from the store without copying it
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [in] columns (list) - Optional subset of columns to select
+    * @param [out] table (pa.Table) - Zero-copy Arrow table
+    ** Memory-maps an Arrow IPC file
+    """
+    def read_table(self, data_directory, name, columns=None):
+        with pa.memory_map(self.table_path(data_directory, name), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        return table
+
+    """
+    read: str, str, list --> pd.DataFrame
+    -- Reads a table from the store as a DataFrame, restoring its index
+    * @param [in] data_directory (str) - Data directory name
+    * @param [in] name (str) - Table name
+    * @param [in] columns (list) - Optional subset of columns to read
+    * @param [out] df (pd.DataFrame) - Table contents
+    ** Reads a memory-mapped table into pandas
+    """
+    def read(self, data_directory, name, columns=None):
+        table = self.read_table(data_directory, name)
+        if columns is not None:
+            index_columns = [c for c in self.index_columns(table) if c not in columns]
+            table = table.select(index_columns + list(columns))
+        return table.to_pandas()
+
+    """
+    index_columns: cls, pa.Table --> list
+    -- Returns the names of columns that hold a serialized pandas index
+    * @param [in] table (pa.Table) - Arrow table
+    * @param [out] columns (list) - Index column names
+    ** Reads pandas metadata from an Arrow schema
+    """
+    @classmethod
+    def index_columns(cls, table):
+        metadata = table.schema.pandas_metadata or {}
+        return [c for c in metadata.get("index_columns", []) if isinstance(c, str)]
+
+    """
+    tables: str --> list
+    -- Lists the tables written for a data directory
+    * @param [in] data_directory (str) - Data directory name
+    * @param [out] names (list) - Sorted table names
+    ** Lists tables in a data directory
+    """
+    def tables(self, data_directory):
+        path = os.path.join(self.root, data_directory)
+        if not os.path.isdir(path):
+            return []
+        return sorted(self.table_name(f) for f in os.listdir(path) if f.endswith(self.EXTENSION))
+
+    """
+    directories: None --> list
+    -- Lists the data directories in the store
+    * @param [out] dirs (list) - Sorted data directory names
+    ** Lists data directories that have tables
+    """
+    def directories(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    """
+    compact: cls, pd.DataFrame --> pd.DataFrame
+    -- Stores non-negative count columns as uint32 instead of int64.
+    -- Float columns are kept at float64 so averages and enrichment
+    -- values match the previous pickle output exactly.
+    * @param [in] df (pd.DataFrame) - Table to compact
+    * @param [out] df (pd.DataFrame) - Table with compact dtypes
+    ** Shrinks integer columns before writing
+    """
+    @classmethod
+    def compact(cls, df):
+        df = df.copy(deep=False)
+        for column in df.columns:
+            values = df[column]
+            if pd.api.types.is_integer_dtype(values) and (values.empty or (values.min() >= 0 and values.max() < 2**32)):
+                df[column] = values.astype("uint32")
+        return df
@@ -0,0 +1,52 @@
+import functools
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional; responses fall back to gzip
+    brotli = None
+
+# Smaller bodies are not worth the CPU and the extra header
+MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/javascript', 'text/css',
+    'text/html', 'text/plain', 'text/csv', 'image/svg+xml',
+}
+
+def choose_encoding(accept_encodings):
+    """Best content coding the client accepts ('br' or 'gzip'), or None for identity"""
+    for encoding in ('br', 'gzip') if brotli is not None else ('gzip',):
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+def compress(data, encoding):
+    """Encode a body with a content coding returned by choose_encoding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+def is_compressible(response):
+    return (response.status_code == 200 and not response.direct_passthrough and not response.is_streamed
+            and 'Content-Encoding' not in response.headers and response.mimetype in COMPRESSIBLE_TYPES)
+
+def compress_response(response, accept_encodings):
+    """Compress a buffered response in place if the client accepts it; returns the response"""
+    if not is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@functools.lru_cache(maxsize=256)
+def compressed_file(path, version, encoding):
+    """Compressed contents of a static file; version (e.g. its mtime) invalidates old entries"""
+    with open(path, 'rb') as f:
+        return compress(f.read(), encoding)
@@ -0,0 +1,235 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PRIORITIES = {'low': -1, 'normal': 0, 'high': 1}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_queue (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    args TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    slot INTEGER,
+    pid INTEGER,
+    started_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_job_queue_slot ON job_queue (slot);
+"""
+
+class QuotaExceeded(Exception):
+    """Raised when a user already has as many jobs queued as they are allowed"""
+
+class Job:
+    def __init__(self, seq, job_id, user_id, args, priority, slot=None, pid=None):
+        self.seq = seq
+        self.job_id = job_id
+        self.user_id = user_id
+        self.args = args
+        self.priority = priority
+        self.slot = slot
+        self.pid = pid
+
+class JobScheduler:
+    """Bounded pool of processing jobs shared by all gunicorn workers.
+
+    The queue lives in SQLite: every worker submits to it, and admission
+    (the global running slots and the per-user running and queued limits)
+    is decided in one write transaction, so the jobs running across all
+    workers never exceed max_workers. Each slot owns a fixed set of CPUs
+    and hands it to the job it runs, so concurrent jobs never share cores.
+    Waiting jobs are ordered by priority, then by how few jobs their user
+    has running, then by submission order. Once started, a worker runs
+    fn(*args, cpus) for each job it claims, so args must be JSON
+    serializable. A job whose worker died frees its slot and is reported
+    through on_abandoned.
+    """
+    POLL_INTERVAL = 0.5  # Seconds between checks for jobs submitted by other workers
+
+    def __init__(self, path, max_workers=None, cpus_per_job=None, max_running_per_user=1, max_queued_per_user=5,
+                 on_queue_change=None, on_abandoned=None):
+        self.path = path
+        self.fn = None
+        self.cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+        self.cpus_per_job = max(1, min(cpus_per_job or len(self.cpus), len(self.cpus)))
+        self.max_workers = max(1, max_workers or len(self.cpus) // self.cpus_per_job)
+        self.max_running_per_user = max_running_per_user
+        self.max_queued_per_user = max_queued_per_user
+        # Called as on_queue_change(job_id, position) for every waiting job when the queue changes
+        self.on_queue_change = on_queue_change
+        # Called as on_abandoned(job_id) for a running job whose worker process is gone
+        self.on_abandoned = on_abandoned
+        self.local = threading.local()
+        # Wakes this worker's dispatcher as soon as it submits or finishes a job
+        self.condition = threading.Condition()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def start(self, fn):
+        """Claim jobs in this worker and run fn(*args, cpus) for each"""
+        self.fn = fn
+        threading.Thread(target=self.dispatch, daemon=True).start()
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def submit(self, job_id, user_id, args=(), priority=0):
+        """Queue fn(*args, cpus) and return its queue position (1 = next to start)"""
+        conn = self.connection()
+        with conn:
+            # Take the write lock before counting so concurrent submits cannot both pass the quota
+            conn.execute('BEGIN IMMEDIATE')
+            queued = conn.execute('SELECT COUNT(*) FROM job_queue WHERE user_id = ? AND slot IS NULL',
+                                  (str(user_id),)).fetchone()[0]
+            if queued >= self.max_queued_per_user:
+                raise QuotaExceeded(f'At most {self.max_queued_per_user} queued jobs are allowed per user')
+            conn.execute('INSERT INTO job_queue (job_id, user_id, args, priority) VALUES (?, ?, ?, ?)',
+                         (job_id, str(user_id), json.dumps(list(args)), priority))
+        self.wake()
+        positions = self.positions()
+        self.notify_positions(positions)
+        return positions.get(job_id, 0)
+
+    def cancel(self, job_id):
+        """Drop a job that has not started yet; returns True if it was waiting"""
+        with self.connection() as conn:
+            cancelled = conn.execute('DELETE FROM job_queue WHERE job_id = ? AND slot IS NULL', (job_id,)).rowcount > 0
+        if cancelled:
+            self.notify_positions(self.positions())
+        return cancelled
+
+    def position(self, job_id):
+        """1-based queue position of a waiting job, 0 if it is running, None if unknown"""
+        running, pending = self.jobs(self.connection())
+        if any(job.job_id == job_id for job in running):
+            return 0
+        return self.order_pending(running, pending).get(job_id)
+
+    def stats(self):
+        running, pending = self.jobs(self.connection())
+        return {'workers': self.max_workers, 'cpus_per_job': self.cpus_per_job,
+                'running': len(running), 'queued': len(pending)}
+
+    def positions(self):
+        return self.order_pending(*self.jobs(self.connection()))
+
+    def jobs(self, conn):
+        """Running and waiting jobs, in submission order"""
+        running, pending = [], []
+        for seq, job_id, user_id, args, priority, slot, pid in conn.execute(
+                'SELECT seq, job_id, user_id, args, priority, slot, pid FROM job_queue ORDER BY seq'):
+            job = Job(seq, job_id, user_id, json.loads(args), priority, slot, pid)
+            (pending if slot is None else running).append(job)
+        return running, pending
+
+    def order_pending(self, running, pending):
+        # Simulate the order in which the waiting jobs would start
+        running = self.running_per_user(running)
+        pending = list(pending)
+        positions = {}
+        while pending:
+            job = min(pending, key=lambda job: self.order(job, running))
+            pending.remove(job)
+            positions[job.job_id] = len(positions) + 1
+            running[job.user_id] = running.get(job.user_id, 0) + 1
+        return positions
+
+    def running_per_user(self, jobs):
+        running = {}
+        for job in jobs:
+            running[job.user_id] = running.get(job.user_id, 0) + 1
+        return running
+
+    def order(self, job, running):
+        return (-job.priority, running.get(job.user_id, 0), job.seq)
+
+    def claim(self):
+        """Start the next eligible job in a free slot; returns it with its slot set, or None"""
+        conn = self.connection()
+        if conn.execute('SELECT 1 FROM job_queue LIMIT 1').fetchone() is None:
+            return None
+        abandoned = []
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            running, pending = self.jobs(conn)
+            for job in running:
+                if not pid_alive(job.pid):
+                    conn.execute('DELETE FROM job_queue WHERE seq = ?', (job.seq,))
+                    abandoned.append(job.job_id)
+            running = [job for job in running if job.job_id not in abandoned]
+            used = {job.slot for job in running}
+            free = [slot for slot in range(self.max_workers) if slot not in used]
+            counts = self.running_per_user(running)
+            eligible = [job for job in pending if counts.get(job.user_id, 0) < self.max_running_per_user]
+            job = min(eligible, key=lambda job: self.order(job, counts)) if free and eligible else None
+            if job is not None:
+                job.slot, job.pid = free[0], os.getpid()
+                conn.execute('UPDATE job_queue SET slot = ?, pid = ?, started_at = ? WHERE seq = ?',
+                             (job.slot, job.pid, time.time(), job.seq))
+        for job_id in abandoned:
+            print(f"Job {job_id} was abandoned by a worker that stopped")
+            if self.on_abandoned:
+                self.on_abandoned(job_id)
+        return job
+
+    def slot_cpus(self, slot):
+        # Slots beyond the CPU count share cores round-robin
+        start = (slot * self.cpus_per_job) % len(self.cpus)
+        return [self.cpus[(start + i) % len(self.cpus)] for i in range(self.cpus_per_job)]
+
+    def notify_positions(self, positions):
+        if self.on_queue_change:
+            for job_id, position in positions.items():
+                self.on_queue_change(job_id, position)
+
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def dispatch(self):
+        # Claims jobs for this worker; other workers' submits are seen by polling
+        while True:
+            try:
+                job = self.claim()
+            except Exception as e:
+                print(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                with self.condition:
+                    self.condition.wait(self.POLL_INTERVAL)
+                continue
+            self.notify_positions(self.positions())
+            threading.Thread(target=self.run, args=(job,), daemon=True).start()
+
+    def run(self, job):
+        try:
+            self.fn(*job.args, self.slot_cpus(job.slot))
+        except Exception as e:
+            print(f"Job {job.job_id} failed: {e}")
+        finally:
+            with self.connection() as conn:
+                conn.execute('DELETE FROM job_queue WHERE seq = ?', (job.seq,))
+            # A finished job frees a slot and can unblock another job of the same user
+            self.wake()
+            self.notify_positions(self.positions())
+
+def pid_alive(pid):
+    """Whether a process with this id is running on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
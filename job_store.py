@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (closed, updated_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, event_id)
+);
+CREATE TABLE IF NOT EXISTS access_attempts (
+    user_id TEXT NOT NULL,
+    attempted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_access_attempts_user ON access_attempts (user_id, attempted_at);
+"""
+
+class JobEvents:
+    """Handle on one job's event log.
+
+    put() matches queue.Queue.put so the log can be handed to code that
+    writes output messages.
+    """
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+
+    def publish(self, kind, data):
+        return self.store.publish(self.job_id, kind, data)
+
+    def put(self, message):
+        self.publish('output', message)
+
+    def close(self):
+        self.store.close(self.job_id)
+
+class JobStore:
+    """Status and event log of processing jobs, plus failed access attempts, in SQLite.
+
+    Every gunicorn worker opens the same database, so a status poll or event
+    stream sees a job no matter which worker runs it. Finished jobs are kept
+    for ttl seconds; jobs that stop updating (e.g. their worker died) are
+    dropped after stale_after seconds. Event ids increase per job so Server-
+    Sent Events clients can resume with Last-Event-ID.
+    """
+    MAX_EVENTS = 5000  # Oldest events of a job are dropped past this many
+    POLL_INTERVAL = 0.5  # Seconds between checks for events written by other workers
+    PURGE_INTERVAL = 60  # Minimum seconds between purges of expired state
+
+    def __init__(self, path, ttl=3600, stale_after=86400, attempt_window=3600):
+        self.path = path
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.attempt_window = attempt_window
+        self.local = threading.local()
+        # Wakes event readers in this worker as soon as it publishes
+        self.condition = threading.Condition()
+        self.last_purge = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def start(self, job_id, status):
+        """Create (or restart) a job with an empty event log; returns its event log"""
+        self.purge_expired()
+        with self.connection() as conn:
+            conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+            conn.execute('INSERT OR REPLACE INTO jobs (id, status, closed, updated_at) VALUES (?, ?, 0, ?)',
+                         (job_id, json.dumps(status), time.time()))
+        return JobEvents(self, job_id)
+
+    def events(self, job_id):
+        """Event log of a job, or None if it does not exist"""
+        return JobEvents(self, job_id) if self.status(job_id) is not None else None
+
+    def status(self, job_id):
+        """Latest status of a job, or None if it does not exist or has expired"""
+        row = self.connection().execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_status(self, job_id, **fields):
+        """Merge fields into a job's status and publish it as a 'status' event; returns None if the job is gone"""
+        conn = self.connection()
+        with conn:
+            # Take the write lock before reading so concurrent updates do not lose fields
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            status = json.loads(row[0])
+            status.update(fields)
+            conn.execute('UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?',
+                         (json.dumps(status), time.time(), job_id))
+            # Each status supersedes the previous ones, so frequent progress
+            # updates do not push output lines out of the event log
+            event_id = self._append(conn, job_id, 'status', status)
+            conn.execute("DELETE FROM job_events WHERE job_id = ? AND kind = 'status' AND event_id < ?",
+                         (job_id, event_id))
+        self._notify()
+        return status
+
+    def publish(self, job_id, kind, data):
+        """Append an event to a job's log; returns its id, or None if the job is gone"""
+        conn = self.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('UPDATE jobs SET updated_at = ? WHERE id = ?', (time.time(), job_id)).rowcount == 0:
+                return None
+            event_id = self._append(conn, job_id, kind, data)
+        self._notify()
+        return event_id
+
+    def close(self, job_id):
+        """Mark a job's log as complete; readers stop once they have caught up"""
+        with self.connection() as conn:
+            conn.execute('UPDATE jobs SET closed = 1, updated_at = ? WHERE id = ?', (time.time(), job_id))
+        self._notify()
+
+    def events_since(self, job_id, last_id, timeout=None):
+        """(events, closed) after last_id, waiting up to timeout seconds for one to arrive.
+
+        Events are (id, kind, data) tuples. A job that does not exist reads as closed.
+        """
+        deadline = time.time() + (timeout or 0)
+        while True:
+            conn = self.connection()
+            row = conn.execute('SELECT closed FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            rows = conn.execute('SELECT event_id, kind, data FROM job_events WHERE job_id = ? AND event_id > ? ORDER BY event_id',
+                                (job_id, last_id)).fetchall()
+            closed = row is None or bool(row[0])
+            remaining = deadline - time.time()
+            if rows or closed or remaining <= 0:
+                return [(event_id, kind, json.loads(data)) for event_id, kind, data in rows], closed
+            with self.condition:
+                self.condition.wait(min(remaining, self.POLL_INTERVAL))
+
+    def delete(self, job_id):
+        """Remove a job and its event log"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM job_events WHERE job_id = ?', (job_id,))
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        self._notify()
+
+    def record_attempt(self, user_id):
+        """Record a failed dataset access attempt"""
+        with self.connection() as conn:
+            conn.execute('INSERT INTO access_attempts (user_id, attempted_at) VALUES (?, ?)', (str(user_id), time.time()))
+
+    def recent_attempts(self, user_id):
+        """Failed access attempts of a user within the attempt window"""
+        self.purge_expired()
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM access_attempts WHERE user_id = ? AND attempted_at >= ?',
+            (str(user_id), time.time() - self.attempt_window)).fetchone()[0]
+
+    def purge_expired(self, force=False):
+        """Drop finished jobs past ttl, stale jobs and old access attempts (at most once per PURGE_INTERVAL)"""
+        now = time.time()
+        if not force and now - self.last_purge < self.PURGE_INTERVAL:
+            return
+        self.last_purge = now
+        with self.connection() as conn:
+            expired = [row[0] for row in conn.execute(
+                'SELECT id FROM jobs WHERE (closed = 1 AND updated_at < ?) OR updated_at < ?',
+                (now - self.ttl, now - self.stale_after))]
+            conn.executemany('DELETE FROM job_events WHERE job_id = ?', [(job_id,) for job_id in expired])
+            conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+            conn.execute('DELETE FROM access_attempts WHERE attempted_at < ?', (now - self.attempt_window,))
+
+    def _append(self, conn, job_id, kind, data):
+        last_id = conn.execute('SELECT MAX(event_id) FROM job_events WHERE job_id = ?', (job_id,)).fetchone()[0] or 0
+        conn.execute('INSERT INTO job_events (job_id, event_id, kind, data) VALUES (?, ?, ?, ?)',
+                     (job_id, last_id + 1, kind, json.dumps(data)))
+        if last_id + 1 > self.MAX_EVENTS:
+            conn.execute('DELETE FROM job_events WHERE job_id = ? AND event_id <= ?', (job_id, last_id + 1 - self.MAX_EVENTS))
+        return last_id + 1
+
+    def _notify(self):
+        with self.condition:
+            self.condition.notify_all()
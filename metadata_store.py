@@ -0,0 +1,116 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    owner_id INTEGER,
+    status TEXT,
+    created_at REAL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_owner ON datasets (owner_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_datasets_status ON datasets (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_datasets_created ON datasets (created_at);
+"""
+
+class MetadataStore:
+    """Dataset metadata in SQLite, indexed by owner, status and creation time.
+
+    The database runs in WAL mode so every gunicorn worker can read while
+    one writes. Each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, dataset_id):
+        """Metadata of a dataset, or None if it does not exist"""
+        row = self.connection().execute('SELECT metadata FROM datasets WHERE id = ?', (dataset_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def owner_of(self, dataset_id):
+        """Owner id of a dataset (None for datasets without one); raises KeyError if it does not exist"""
+        row = self.connection().execute('SELECT owner_id FROM datasets WHERE id = ?', (dataset_id,)).fetchone()
+        if row is None:
+            raise KeyError(dataset_id)
+        return row[0]
+
+    def put(self, dataset_id, metadata):
+        """Create or replace a dataset's metadata"""
+        with self.connection() as conn:
+            self._write(conn, dataset_id, metadata)
+
+    def update(self, dataset_id, **fields):
+        """Merge fields into a dataset's metadata; returns the new metadata, or None if it does not exist"""
+        conn = self.connection()
+        with conn:
+            # Take the write lock before reading so concurrent updates do not lose fields
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT metadata FROM datasets WHERE id = ?', (dataset_id,)).fetchone()
+            if row is None:
+                return None
+            metadata = json.loads(row[0])
+            metadata.update(fields)
+            self._write(conn, dataset_id, metadata)
+        return metadata
+
+    def delete(self, dataset_id):
+        """Remove a dataset's metadata; returns True if it existed"""
+        with self.connection() as conn:
+            return conn.execute('DELETE FROM datasets WHERE id = ?', (dataset_id,)).rowcount > 0
+
+    def list_for_owner(self, owner_id):
+        """(dataset_id, metadata) pairs of one owner, newest first"""
+        rows = self.connection().execute(
+            'SELECT id, metadata FROM datasets WHERE owner_id = ? ORDER BY created_at DESC', (owner_id,))
+        return [(dataset_id, json.loads(metadata)) for dataset_id, metadata in rows]
+
+    def list_created_before(self, timestamp):
+        """(dataset_id, metadata) pairs of datasets created before timestamp, oldest first"""
+        rows = self.connection().execute(
+            'SELECT id, metadata FROM datasets WHERE created_at < ? ORDER BY created_at', (timestamp,))
+        return [(dataset_id, json.loads(metadata)) for dataset_id, metadata in rows]
+
+    def import_legacy(self, datasets_dir):
+        """Index misc/datasets/<id>/metadata.json files written before the store existed"""
+        if not os.path.isdir(datasets_dir):
+            return 0
+        imported = 0
+        with self.connection() as conn:
+            for dataset_id in os.listdir(datasets_dir):
+                metadata_path = os.path.join(datasets_dir, dataset_id, 'metadata.json')
+                if not os.path.exists(metadata_path):
+                    continue
+                try:
+                    with open(metadata_path, 'r') as f:
+                        metadata = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable metadata for {dataset_id}: {e}")
+                    continue
+                imported += self._write(conn, dataset_id, metadata, replace=False)
+        return imported
+
+    def _write(self, conn, dataset_id, metadata, replace=True):
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        return conn.execute(
+            f'{verb} INTO datasets (id, owner_id, status, created_at, metadata) VALUES (?, ?, ?, ?, ?)',
+            (dataset_id, metadata.get('owner_id'), metadata.get('status'),
+             metadata.get('created_at', time.time()), json.dumps(metadata))).rowcount
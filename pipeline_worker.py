@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from job_store import JobStore
+
+# Progress bar ranges of the pipeline stages (percent)
+DENOISE_PROGRESS = (2, 10)
+COUNT_PROGRESS = (10, 80)
+REDUCE_PROGRESS = 85
+DONE_PROGRESS = 95
+
+class PipelinePool:
+    """Warm worker processes that run the capgenie pipeline in-process.
+
+    Workers import capgenie once and are reused across jobs, so a job pays
+    neither interpreter startup nor the heavy imports. Progress reaches the
+    job store directly from the worker as typed events. A pool broken by a
+    crashed worker is replaced on the next job.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.pool = None
+
+    def executor(self):
+        if self.pool is None:
+            # Spawned workers do not inherit the web app's threads and locks
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=warm_up,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def run(self, job_store_path, dataset_id, options, cpus=None):
+        """Run the pipeline for a dataset in a worker; returns the session folder"""
+        try:
+            return self.executor().submit(run_job, job_store_path, dataset_id, options, cpus).result()
+        except BrokenProcessPool:
+            self.pool = None
+            raise
+
+def warm_up():
+    """Worker initializer: import the pipeline before the first job arrives"""
+    import capgenie.api  # noqa: F401
+
+stores = {}  # job store of each database path, per worker process
+
+def run_job(job_store_path, dataset_id, options, cpus=None):
+    """Run in a worker: pin to the job's cores, run the pipeline and report its progress"""
+    from capgenie import api, progress
+
+    pinned = bool(cpus) and hasattr(os, 'sched_setaffinity')
+    if pinned:
+        # Counting workers started by the pipeline inherit the affinity
+        allowed = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, cpus)
+    if job_store_path not in stores:
+        stores[job_store_path] = JobStore(job_store_path)
+    job_store = stores[job_store_path]
+
+    def on_progress(event):
+        fields = {'processed_files': event.files_done, 'total_files': event.files_total,
+                  'bytes_done': event.bytes_done, 'bytes_total': event.bytes_total,
+                  'reads_done': event.reads_done, 'bytes_per_second': event.bytes_per_second,
+                  'eta_seconds': event.eta_seconds}
+        if not event.tick:
+            fields['message'] = event.message
+        if event.stage in (progress.DENOISE, progress.COUNT):
+            start, end = DENOISE_PROGRESS if event.stage == progress.DENOISE else COUNT_PROGRESS
+            done = event.bytes_done / event.bytes_total if event.bytes_total else 0
+            fields['progress'] = start + (end - start) * done
+            if event.file:
+                fields['current_file'] = event.file
+        elif event.stage == progress.REDUCE:
+            fields['progress'] = REDUCE_PROGRESS
+        elif event.stage == progress.DONE:
+            fields['progress'] = DONE_PROGRESS
+        job_store.update_status(dataset_id, **fields)
+        if event.tick:
+            # Periodic updates only move the progress bar
+            return
+        job_store.publish(dataset_id, 'output', {
+            'timestamp': datetime.now().isoformat(),
+            'type': 'output',
+            'message': event.message
+        })
+
+    try:
+        return api.run(api.PipelineOptions(**options), on_progress=on_progress)
+    finally:
+        if pinned:
+            os.sched_setaffinity(0, allowed)
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as RenderTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from capgenie import plots
+
+class PlotRenderer:
+    """Renders plot artifacts of finished datasets when they are first viewed.
+
+    Plots are saved under a hash of the tables they are drawn from, so a
+    saved plot is returned without touching the worker. Otherwise the plot
+    is drawn by a warm worker process that keeps the plotting libraries
+    loaded between plots; concurrent requests for the same plot share one
+    render. A pool broken by a crashed worker is replaced on the next plot.
+    """
+
+    def __init__(self, max_workers=1, timeout=120):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.pool = None
+        self.lock = threading.RLock()  # a finished future runs its callback at once
+        self.pending = {}  # plot path --> future of the render
+
+    def executor(self):
+        if self.pool is None:
+            # Spawned workers do not inherit the web app's threads and locks
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=plots.warm_up,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return self.pool
+
+    def render(self, session_path, directory, kind):
+        """Path and key of a plot, and whether this call rendered it; raises FileNotFoundError without its input tables"""
+        key = plots.plot_key(session_path, directory, kind)
+        path = plots.plot_path(session_path, directory, kind, key)
+        rendered = False
+        with self.lock:
+            future = self.pending.get(path)
+            if future is None:
+                if os.path.exists(path):
+                    return path, key, False
+                future = self.executor().submit(plots.render_plot, session_path, directory, kind, key)
+                self.pending[path] = future
+                future.add_done_callback(lambda _: self.forget(path))
+                rendered = True  # Requests that join the render leave it to this one
+        try:
+            return future.result(timeout=self.timeout), key, rendered
+        except RenderTimeout:
+            # The render goes on; a later request picks it up
+            raise TimeoutError(f'{kind} is still rendering')
+        except BrokenProcessPool:
+            with self.lock:
+                self.pool = None
+            raise
+
+    def forget(self, path):
+        with self.lock:
+            self.pending.pop(path, None)
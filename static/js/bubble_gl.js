@@ -0,0 +1,238 @@
+// WebGL bubble chart for the columnar bubble data served by the plot API
+// ({peptides, average, enrichment}). Every bubble is drawn in a single
+// draw call, so large tables stay responsive; axes and the tooltip are
+// drawn on a 2D canvas laid over the WebGL one. Use BubbleGL.create, which
+// returns null when WebGL is not available.
+
+const BUBBLE_VERTEX_SHADER = `
+attribute vec2 a_position;
+attribute float a_radius;
+uniform vec2 u_scale;
+uniform vec2 u_offset;
+uniform float u_pixelRatio;
+varying float v_radius;
+void main() {
+  gl_Position = vec4(a_position * u_scale + u_offset, 0.0, 1.0);
+  v_radius = a_radius * u_pixelRatio;
+  gl_PointSize = 2.0 * v_radius;
+}`;
+
+const BUBBLE_FRAGMENT_SHADER = `
+precision mediump float;
+uniform vec4 u_fill;
+uniform vec4 u_stroke;
+varying float v_radius;
+void main() {
+  float d = length(gl_PointCoord * 2.0 - 1.0);
+  if (d > 1.0) discard;
+  gl_FragColor = d > 1.0 - 1.0 / v_radius ? u_stroke : u_fill;
+}`;
+
+class BubbleGL {
+  static create(canvas, data, options = {}) {
+    const gl = canvas.getContext('webgl', { antialias: true, premultipliedAlpha: false });
+    if (!gl || !data || !data.peptides) return null;
+    return new BubbleGL(canvas, gl, data, options);
+  }
+
+  constructor(canvas, gl, data, options) {
+    this.canvas = canvas;
+    this.gl = gl;
+    this.data = data;
+    this.xLabel = options.xLabel || '';
+    this.yLabel = options.yLabel || '';
+    this.padding = { left: 60, right: 16, top: 12, bottom: 44 };
+
+    this.x = Float32Array.from(data.average);
+    this.y = Float32Array.from(data.enrichment);
+    this.r = this.x.map(v => Math.max(5, v * 2)); // Same sizing as the Chart.js version
+    let xMax = 0, yMax = 0;
+    for (let i = 0; i < this.x.length; i++) {
+      if (this.x[i] > xMax) xMax = this.x[i];
+      if (this.y[i] > yMax) yMax = this.y[i];
+    }
+    // Axes start at zero
+    this.bounds = { xMin: 0, xMax: xMax * 1.05 || 1, yMin: 0, yMax: yMax * 1.05 || 1 };
+
+    const parent = canvas.parentElement;
+    if (getComputedStyle(parent).position === 'static') parent.style.position = 'relative';
+    this.overlay = document.createElement('canvas');
+    this.overlay.style.position = 'absolute';
+    this.overlay.style.pointerEvents = 'auto';
+    parent.insertBefore(this.overlay, canvas.nextSibling);
+    this.tooltip = document.createElement('div');
+    this.tooltip.style.cssText = 'position:absolute;display:none;pointer-events:none;background:rgba(0,0,0,0.8);' +
+      'color:#fff;padding:6px 8px;border-radius:6px;font-size:12px;white-space:pre;z-index:5;';
+    parent.appendChild(this.tooltip);
+
+    this.setupProgram();
+    this.onMove = event => this.showTooltip(event);
+    this.onLeave = () => { this.tooltip.style.display = 'none'; };
+    this.overlay.addEventListener('mousemove', this.onMove);
+    this.overlay.addEventListener('mouseleave', this.onLeave);
+    this.observer = new ResizeObserver(() => this.draw());
+    this.observer.observe(canvas);
+    this.draw();
+  }
+
+  setupProgram() {
+    const gl = this.gl;
+    const compile = (type, source) => {
+      const shader = gl.createShader(type);
+      gl.shaderSource(shader, source);
+      gl.compileShader(shader);
+      return shader;
+    };
+    const program = gl.createProgram();
+    gl.attachShader(program, compile(gl.VERTEX_SHADER, BUBBLE_VERTEX_SHADER));
+    gl.attachShader(program, compile(gl.FRAGMENT_SHADER, BUBBLE_FRAGMENT_SHADER));
+    gl.linkProgram(program);
+    gl.useProgram(program);
+    this.program = program;
+
+    // Interleaved x, y, radius
+    const vertices = new Float32Array(this.x.length * 3);
+    for (let i = 0; i < this.x.length; i++) {
+      vertices[i * 3] = this.x[i];
+      vertices[i * 3 + 1] = this.y[i];
+      vertices[i * 3 + 2] = this.r[i];
+    }
+    this.buffer = gl.createBuffer();
+    gl.bindBuffer(gl.ARRAY_BUFFER, this.buffer);
+    gl.bufferData(gl.ARRAY_BUFFER, vertices, gl.STATIC_DRAW);
+    const position = gl.getAttribLocation(program, 'a_position');
+    const radius = gl.getAttribLocation(program, 'a_radius');
+    gl.enableVertexAttribArray(position);
+    gl.vertexAttribPointer(position, 2, gl.FLOAT, false, 12, 0);
+    gl.enableVertexAttribArray(radius);
+    gl.vertexAttribPointer(radius, 1, gl.FLOAT, false, 12, 8);
+
+    gl.uniform4f(gl.getUniformLocation(program, 'u_fill'), 54 / 255, 162 / 255, 235 / 255, 0.5);
+    gl.uniform4f(gl.getUniformLocation(program, 'u_stroke'), 54 / 255, 162 / 255, 235 / 255, 1.0);
+    gl.enable(gl.BLEND);
+    gl.blendFunc(gl.SRC_ALPHA, gl.ONE_MINUS_SRC_ALPHA);
+  }
+
+  // Plot area in CSS pixels
+  plotArea() {
+    const width = this.canvas.clientWidth, height = this.canvas.clientHeight;
+    return {
+      width, height,
+      left: this.padding.left, top: this.padding.top,
+      right: width - this.padding.right, bottom: height - this.padding.bottom
+    };
+  }
+
+  toPixels(x, y, area) {
+    const b = this.bounds;
+    return [
+      area.left + (x - b.xMin) / (b.xMax - b.xMin) * (area.right - area.left),
+      area.bottom - (y - b.yMin) / (b.yMax - b.yMin) * (area.bottom - area.top)
+    ];
+  }
+
+  draw() {
+    const gl = this.gl, ratio = window.devicePixelRatio || 1;
+    const area = this.plotArea();
+    if (area.width === 0 || area.height === 0) return;
+    this.canvas.width = area.width * ratio;
+    this.canvas.height = area.height * ratio;
+    Object.assign(this.overlay, { width: area.width * ratio, height: area.height * ratio });
+    Object.assign(this.overlay.style, {
+      left: this.canvas.offsetLeft + 'px', top: this.canvas.offsetTop + 'px',
+      width: area.width + 'px', height: area.height + 'px'
+    });
+
+    // Data coordinates to clip space, mapped onto the plot area
+    const b = this.bounds;
+    const kx = (area.right - area.left) / (b.xMax - b.xMin);
+    const ky = (area.bottom - area.top) / (b.yMax - b.yMin);
+    gl.viewport(0, 0, this.canvas.width, this.canvas.height);
+    gl.clearColor(0, 0, 0, 0);
+    gl.disable(gl.SCISSOR_TEST);
+    gl.clear(gl.COLOR_BUFFER_BIT);
+    gl.enable(gl.SCISSOR_TEST);
+    gl.scissor(area.left * ratio, (area.height - area.bottom) * ratio,
+               (area.right - area.left) * ratio, (area.bottom - area.top) * ratio);
+    gl.uniform2f(gl.getUniformLocation(this.program, 'u_scale'), 2 * kx / area.width, 2 * ky / area.height);
+    gl.uniform2f(gl.getUniformLocation(this.program, 'u_offset'),
+                 2 * (area.left - b.xMin * kx) / area.width - 1, 1 - 2 * (area.top + b.yMax * ky) / area.height);
+    gl.uniform1f(gl.getUniformLocation(this.program, 'u_pixelRatio'), ratio);
+    gl.drawArrays(gl.POINTS, 0, this.x.length);
+
+    this.drawAxes(area, ratio);
+  }
+
+  drawAxes(area, ratio) {
+    const ctx = this.overlay.getContext('2d');
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, area.width, area.height);
+    ctx.strokeStyle = 'rgba(0, 0, 0, 0.1)';
+    ctx.fillStyle = '#666';
+    ctx.font = '11px sans-serif';
+    const ticks = 5, b = this.bounds;
+    for (let i = 0; i <= ticks; i++) {
+      const xValue = b.xMin + (b.xMax - b.xMin) * i / ticks;
+      const yValue = b.yMin + (b.yMax - b.yMin) * i / ticks;
+      const [x] = this.toPixels(xValue, 0, area);
+      const [, y] = this.toPixels(0, yValue, area);
+      ctx.beginPath();
+      ctx.moveTo(x, area.top); ctx.lineTo(x, area.bottom);
+      ctx.moveTo(area.left, y); ctx.lineTo(area.right, y);
+      ctx.stroke();
+      ctx.textAlign = 'center'; ctx.textBaseline = 'top';
+      ctx.fillText(+xValue.toPrecision(3), x, area.bottom + 4);
+      ctx.textAlign = 'right'; ctx.textBaseline = 'middle';
+      ctx.fillText(+yValue.toPrecision(3), area.left - 6, y);
+    }
+    ctx.textAlign = 'center'; ctx.textBaseline = 'bottom';
+    ctx.fillText(this.xLabel, (area.left + area.right) / 2, area.height - 2);
+    ctx.save();
+    ctx.translate(12, (area.top + area.bottom) / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.textBaseline = 'middle';
+    ctx.fillText(this.yLabel, 0, 0);
+    ctx.restore();
+  }
+
+  // Topmost bubble under the pointer, or -1
+  hitTest(px, py, area) {
+    let hit = -1, best = Infinity;
+    for (let i = 0; i < this.x.length; i++) {
+      const [x, y] = this.toPixels(this.x[i], this.y[i], area);
+      const d = (x - px) ** 2 + (y - py) ** 2;
+      if (d <= this.r[i] ** 2 && d <= best) {
+        best = d;
+        hit = i;
+      }
+    }
+    return hit;
+  }
+
+  showTooltip(event) {
+    const rect = this.overlay.getBoundingClientRect();
+    const px = event.clientX - rect.left, py = event.clientY - rect.top;
+    const i = this.hitTest(px, py, this.plotArea());
+    if (i < 0) {
+      this.tooltip.style.display = 'none';
+      return;
+    }
+    this.tooltip.textContent = `Peptide: ${this.data.peptides[i]}\nPercentage: ${this.x[i].toFixed(3)}` +
+      `\nEnrichment: ${this.y[i].toFixed(3)}`;
+    this.tooltip.style.left = (this.overlay.offsetLeft + px + 12) + 'px';
+    this.tooltip.style.top = (this.overlay.offsetTop + py + 12) + 'px';
+    this.tooltip.style.display = 'block';
+  }
+
+  destroy() {
+    this.observer.disconnect();
+    this.overlay.removeEventListener('mousemove', this.onMove);
+    this.overlay.removeEventListener('mouseleave', this.onLeave);
+    this.overlay.remove();
+    this.tooltip.remove();
+    const gl = this.gl;
+    gl.deleteBuffer(this.buffer);
+    gl.deleteProgram(this.program);
+    gl.clear(gl.COLOR_BUFFER_BIT);
+  }
+}
@@ -516,20 +516,10 @@ async function submitDataset() {
   document.getElementById('progress-section').style.display = 'block';
   
   try {
-    // Prepare form data
-    const formData = new FormData();
-    formData.append('dataset_name', wizardOptions.datasetName);
-    
-    // Add folder files
-    if (wizardOptions.folderFiles) {
-      wizardOptions.folderFiles.forEach(file => {
-        formData.append('files', file);
-      });
-    }
-    
-    // Add CSV file for barcode analysis (enrichment files are already in dataset)
+    // Folder files plus the CSV file for barcode analysis (enrichment files are already in dataset)
+    const files = [...(wizardOptions.folderFiles || [])];
     if (wizardOptions.csvFile) {
-      formData.append('files', wizardOptions.csvFile);
+      files.push(wizardOptions.csvFile);
     }
     
     // Prepare options to match GUI desktop utility format
@@ -543,23 +533,11 @@ async function submitDataset() {
       motif: wizardOptions.motif
     };
     
-    formData.append('options', JSON.stringify(options));
-    
-    // Update progress
-    updateProgressText('Uploading files...', 10);
-    
     // Upload dataset
-    const uploadResponse = await fetch('/api/upload', {
-      method: 'POST',
-      body: formData
+    const uploadResult = await uploadFiles(wizardOptions.datasetName, files, (fraction) => {
+      updateProgressText(`Uploading files... ${Math.round(fraction * 100)}%`, 5 + fraction * 20);
     });
     
-    const uploadResult = await uploadResponse.json();
-    
-    if (!uploadResult.success) {
-      throw new Error(uploadResult.error || 'Upload failed');
-    }
-    
     updateProgressText('Starting analysis...', 30);
     
     // Start processing
@@ -601,6 +579,84 @@ async function submitDataset() {
   }
 }
 
+// Chunks uploaded at once, and attempts per chunk before giving up
+const UPLOAD_PARALLEL_CHUNKS = 4;
+const UPLOAD_CHUNK_ATTEMPTS = 5;
+
+// Upload files with the chunked upload API: chunks go up in parallel, each
+// with its SHA-256 when the browser can compute it, and a failed chunk is
+// retried on its own instead of restarting the whole upload.
+async function uploadFiles(datasetName, files, onProgress) {
+  const createResponse = await fetch('/api/uploads', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      dataset_name: datasetName,
+      files: files.map(file => ({ path: file.webkitRelativePath || file.name, size: file.size }))
+    })
+  });
+  const upload = await createResponse.json();
+  if (!upload.success) {
+    throw new Error(upload.error || 'Upload failed');
+  }
+
+  const chunks = [];
+  upload.files.forEach((entry, index) => {
+    for (let chunk = 0; chunk < entry.chunks; chunk++) {
+      chunks.push({ index, chunk });
+    }
+  });
+  const totalBytes = files.reduce((sum, file) => sum + file.size, 0) || 1;
+  let sentBytes = 0;
+  onProgress(0);
+
+  async function sendChunk({ index, chunk }) {
+    const start = chunk * upload.chunk_size;
+    const body = files[index].slice(start, start + upload.chunk_size);
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    if (window.crypto && crypto.subtle) {
+      const digest = await crypto.subtle.digest('SHA-256', await body.arrayBuffer());
+      headers['X-Chunk-SHA256'] = Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    }
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const response = await fetch(`/api/uploads/${upload.dataset_id}/${index}/${chunk}`, { method: 'PUT', headers, body });
+        if (response.ok) {
+          break;
+        }
+        const result = await response.json();
+        if (response.status < 500 || attempt >= UPLOAD_CHUNK_ATTEMPTS) {
+          throw new Error(result.error || `Upload of ${files[index].name} failed`);
+        }
+      } catch (error) {
+        if (attempt >= UPLOAD_CHUNK_ATTEMPTS || !(error instanceof TypeError)) {
+          throw error;
+        }
+      }
+      // Network error or server hiccup: back off, then resend just this chunk
+      await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+    }
+    sentBytes += body.size;
+    onProgress(sentBytes / totalBytes);
+  }
+
+  // A few workers pull chunks from the shared list until it is empty
+  let next = 0;
+  const workers = Array.from({ length: UPLOAD_PARALLEL_CHUNKS }, async () => {
+    while (next < chunks.length) {
+      await sendChunk(chunks[next++]);
+    }
+  });
+  await Promise.all(workers);
+
+  const completeResponse = await fetch(`/api/uploads/${upload.dataset_id}/complete`, { method: 'POST' });
+  const result = await completeResponse.json();
+  if (!result.success) {
+    throw new Error(result.error || 'Upload failed');
+  }
+  return result;
+}
+
 function updateProgressText(text, percentage) {
   document.getElementById('progress-text').textContent = text;
   document.getElementById('processing-progress').style.width = `${percentage}%`;
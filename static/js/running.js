@@ -38,70 +38,110 @@ function formatOutput(message) {
   </div>`;
 }
 
-// Poll for processing status and output
-async function checkProcessingStatus() {
-  try {
-    // Get status
-    const statusResponse = await fetch(`/api/processing_status/${datasetId}`);
-    const status = await statusResponse.json();
-    
-    // Get output
-    const outputResponse = await fetch(`/api/processing_output/${datasetId}`);
-    const output = await outputResponse.json();
-    
-    // Update status
-    progressText.textContent = status.message;
-    progressFill.style.width = status.progress + '%';
+// Throughput and time left of the scan in progress, if known
+function formatRate(status) {
+  if (status.status !== 'processing' || !status.bytes_per_second) {
+    return '';
+  }
+  let text = ` (${(status.bytes_per_second / 1e6).toFixed(1)} MB/s`;
+  if (status.eta_seconds != null) {
+    const seconds = Math.round(status.eta_seconds);
+    const minutes = Math.floor(seconds / 60);
+    text += `, about ${minutes > 0 ? minutes + ' min ' : ''}${seconds % 60} s left`;
+  }
+  return text + ')';
+}
+
+// Apply a status update pushed by the server
+function applyStatus(status) {
+  progressText.textContent = status.message + formatRate(status);
+  progressFill.style.width = status.progress + '%';
+  
+  // Update file progress if available
+  if (status.total_files > 0) {
+    fileProgress.style.display = 'block';
+    currentFile.textContent = status.current_file || 'Processing files...';
+    fileCount.textContent = `${status.processed_files || 0}/${status.total_files} files`;
+  }
+  
+  // Update step indicators based on progress
+  updateStepIndicators(status.progress);
+  
+  // Handle completion or error
+  if (status.status === 'completed') {
+    progressText.textContent = 'Analysis completed successfully!';
+    progressFill.style.width = '100%';
+    progressFill.style.background = '#28a745';
     
-    // Update file progress if available
-    if (status.total_files > 0) {
-      fileProgress.style.display = 'block';
-      currentFile.textContent = status.current_file || 'Processing files...';
-      fileCount.textContent = `${status.processed_files || 0}/${status.total_files} files`;
+    setTimeout(() => {
+      // Redirect to cache version if available, otherwise web version
+      if (status.cache_available) {
+        window.location.href = `/view_dataset/cache/${datasetId}`;
+      } else {
+        window.location.href = `/view_dataset/web/${datasetId}`;
+      }
+    }, 3000);
+    return true;
+  } else if (status.status === 'error') {
+    progressText.textContent = 'Error: ' + status.message;
+    progressFill.style.width = '0%';
+    progressFill.style.background = '#dc3545';
+    return true;
+  }
+  return false;
+}
+
+// Id of the last event shown, so polling picks up where the stream stopped
+let lastEventId = 0;
+
+function appendOutput(message) {
+  outputContent.innerHTML += formatOutput(message);
+  // Auto-scroll to bottom
+  outputContainer.scrollTop = outputContainer.scrollHeight;
+}
+
+// Follow the job's event stream; the browser reconnects on its own and
+// resumes from the last event it received. A refused stream (the server
+// caps open streams per worker) falls back to polling
+function followProcessingEvents() {
+  const source = new EventSource(`/api/processing_events/${datasetId}`);
+  
+  source.addEventListener('status', (event) => {
+    lastEventId = Number(event.lastEventId) || lastEventId;
+    if (applyStatus(JSON.parse(event.data))) {
+      source.close();
     }
-    
-    // Update output
-    if (output.output && output.output.length > 0) {
-      output.output.forEach(message => {
-        outputContent.innerHTML += formatOutput(message);
-      });
-      // Auto-scroll to bottom
-      outputContainer.scrollTop = outputContainer.scrollHeight;
+  });
+  
+  source.addEventListener('output', (event) => {
+    lastEventId = Number(event.lastEventId) || lastEventId;
+    appendOutput(JSON.parse(event.data));
+  });
+  
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      pollProcessing();
     }
-    
-    // Update step indicators based on progress
-    updateStepIndicators(status.progress);
-    
-    // Handle completion or error
-    if (status.status === 'completed') {
-      progressText.textContent = 'Analysis completed successfully!';
-      progressFill.style.width = '100%';
-      progressFill.style.background = '#28a745';
-      
-      setTimeout(() => {
-        // Redirect to cache version if available, otherwise web version
-        if (status.cache_available) {
-          window.location.href = `/view_dataset/cache/${datasetId}`;
-        } else {
-          window.location.href = `/view_dataset/web/${datasetId}`;
-        }
-      }, 3000);
-      return;
-    } else if (status.status === 'error') {
-      progressText.textContent = 'Error: ' + status.message;
-      progressFill.style.width = '0%';
-      progressFill.style.background = '#dc3545';
+  };
+}
+
+// Poll status and new output every 2 seconds until the job is done
+async function pollProcessing() {
+  try {
+    const output = await fetch(`/api/processing_output/${datasetId}?since=${lastEventId}`);
+    if (output.ok) {
+      const data = await output.json();
+      data.output.forEach(appendOutput);
+      lastEventId = data.last_event_id;
+    }
+    const status = await fetch(`/api/processing_status/${datasetId}`);
+    if (status.ok && applyStatus(await status.json())) {
       return;
     }
-    
-    // Continue polling
-    setTimeout(checkProcessingStatus, 1000);
-    
   } catch (error) {
-    console.error('Error checking processing status:', error);
-    progressText.textContent = 'Error checking status: ' + error.message;
-    setTimeout(checkProcessingStatus, 2000);
+    progressText.textContent = 'Lost connection to the server, retrying...';
   }
+  setTimeout(pollProcessing, 2000);
 }
 
 // Update step indicators
@@ -123,7 +163,7 @@ function updateStepIndicators(progress) {
   });
 }
 
-// Start polling when page loads
+// Start following the job when page loads
 document.addEventListener('DOMContentLoaded', () => {
-  checkProcessingStatus();
+  followProcessingEvents();
 }); 
\ No newline at end of file
@@ -2,9 +2,14 @@
 let currentOption = "percentage";
 let lastParsedData = null;
 let bioChart = null;
+let bioChartRequest = 0;
 let bubbleChart = null;
 let motif_list = [];
 
+// Spreadsheet card state; rows are fetched a page at a time from the table API
+const TABLE_PAGE_ROWS = 100;
+let tableQuery = null;
+
 // Helper: round numbers for display
 function roundStringNumber(str, method, digits) {
   const num = parseFloat(str);
@@ -38,20 +43,14 @@ function showCards(option) {
   }
 }
 
-// Helper: update stat cards
-function updateStats(data, option) {
+// Helper: update stat cards from the server's summary of a subfolder's tables
+function updateStats(maxValues, option) {
   const maxTitle = document.getElementById("MaxTitle");
   const maxPeptide = document.getElementById("MaxPeptide");
-  if (!data || !data[option] || data[option].length < 2) return;
-  let maxVal = -Infinity;
-  let topPeptide = "";
-  for (let i = 1; i < data[option].length; i++) {
-    const val = parseFloat(data[option][i][data[option][i].length - 1]);
-    if (!isNaN(val) && val > maxVal) {
-      maxVal = val;
-      topPeptide = data[option][i][0];
-    }
-  }
+  const top = maxValues && maxValues[option];
+  if (!top) return;
+  const topPeptide = Object.keys(top)[0];
+  const maxVal = parseFloat(top[topPeptide]);
   document.getElementById("max").textContent = roundStringNumber(maxVal, "toFixed", 3);
   document.getElementById("top_peptide").textContent = topPeptide;
   // Update stat card titles based on tab
@@ -96,9 +95,7 @@ function renderTable(data, option) {
       filePicker.appendChild(opt);
     });
     filePicker.style.display = '';
-    if (data.spreadsheets[selectedSubfolder] && data.spreadsheets[selectedSubfolder][option]) {
-      renderTableRows(data.spreadsheets[selectedSubfolder][option]);
-    }
+    startTableQuery(selectedSubfolder, option);
     filePicker.onchange = () => {
       renderTable(data, option);
     };
@@ -154,6 +151,217 @@ function renderTable(data, option) {
   }
 }
 
+// Helper: name of the average table shown for a subfolder and tab
+function tableFileFor(subfolder, option) {
+  if (!lastParsedData || !lastParsedData.subfolders) return null;
+  const files = lastParsedData.subfolders[subfolder] || [];
+  return files.find(f => option === 'enrichment' ? f.includes('enrichment') : !f.includes('enrichment')) || null;
+}
+
+// Helper: URL of one page of a result table
+function tableApiUrl(subfolder, file, params) {
+  const query = new URLSearchParams(params);
+  if (window.source) query.set('source', window.source);
+  return `/api/dataset/${window.dataset_id}/table/${encodeURIComponent(subfolder)}/${encodeURIComponent(file)}?${query}`;
+}
+
+// Helper: subfolder picked in the file picker
+function currentSubfolder() {
+  if (!lastParsedData || !lastParsedData.spreadsheets) return null;
+  const filePicker = document.getElementById('file-picker');
+  return (filePicker && filePicker.value) || Object.keys(lastParsedData.spreadsheets)[0];
+}
+
+// Helper: fetch a downsampled window of a table's rank-abundance curve
+async function fetchCurve(subfolder, file, params) {
+  const query = new URLSearchParams(params);
+  if (window.source) query.set('source', window.source);
+  const response = await fetch(`/api/dataset/${window.dataset_id}/curve/${encodeURIComponent(subfolder)}/${encodeURIComponent(file)}?${query}`);
+  if (!response.ok) throw new Error((await response.json()).error || response.statusText);
+  return response.json();
+}
+
+// Helper: URL of a plot rendered by the server on first request
+function plotUrl(subfolder, kind, download = true) {
+  const query = new URLSearchParams(download ? { download: '1' } : {});
+  if (window.source) query.set('source', window.source);
+  return `/api/dataset/${window.dataset_id}/plot/${encodeURIComponent(subfolder)}/${kind}?${query}`;
+}
+
+// Helper: bubble chart data of a subfolder. Older datasets carry it in the
+// payload; otherwise it is fetched once per payload from the plot API.
+const bubbleRequests = new WeakMap();
+function loadBubble(subfolder) {
+  const sub = lastParsedData && lastParsedData.spreadsheets && lastParsedData.spreadsheets[subfolder];
+  if (!sub || !sub.bubble_plot) return Promise.resolve(sub ? sub.bubble : null);
+  if (!bubbleRequests.has(sub)) {
+    bubbleRequests.set(sub, fetch(plotUrl(subfolder, 'bubble.json', false)).then(response => {
+      if (!response.ok) throw new Error(response.statusText);
+      return response.json();
+    }).catch(error => {
+      bubbleRequests.delete(sub); // Try again next time
+      console.error('Failed to load bubble chart:', error);
+      return null;
+    }));
+  }
+  return bubbleRequests.get(sub);
+}
+
+// Helper: fill a modal's download links; pass no plots to hide them
+function setPlotLinks(containerId, subfolder, links) {
+  const container = document.getElementById(containerId);
+  if (!container) return;
+  container.replaceChildren();
+  if (!subfolder) return;
+  links.forEach(({ label, kind }) => {
+    const link = document.createElement('a');
+    link.href = plotUrl(subfolder, kind);
+    link.textContent = label;
+    link.className = 'btn btn-secondary';
+    container.appendChild(link);
+  });
+}
+
+// Helper: Chart.js config of a rank-abundance curve; percentages use a log axis like the exported charts
+function curveChartConfig(curve, option, title) {
+  const chartLabel = option === "enrichment" ? "Enrichment Value" : "% Percentage";
+  return {
+    type: "line",
+    data: {
+      datasets: [{
+        label: chartLabel,
+        data: curve.x.map((x, i) => ({ x, y: curve.y[i] })),
+        borderColor: "#4e79a7",
+        backgroundColor: "rgba(78, 121, 167, 0.3)",
+        borderWidth: 1,
+        pointRadius: 0,
+        fill: true
+      }]
+    },
+    options: {
+      responsive: true,
+      maintainAspectRatio: false,
+      animation: false,
+      parsing: false,
+      plugins: {
+        legend: { display: false },
+        tooltip: { enabled: true, mode: "nearest", intersect: false },
+        title: { display: !!title, text: title }
+      },
+      scales: {
+        x: { type: "linear", min: curve.start, max: Math.max(curve.end - 1, curve.start), title: { display: true, text: "Rank" } },
+        y: option === "enrichment"
+          ? { beginAtZero: true, title: { display: true, text: chartLabel } }
+          : { type: "logarithmic", title: { display: true, text: chartLabel } }
+      }
+    }
+  };
+}
+
+// Helper: start showing a table in the spreadsheet card from its first page
+function startTableQuery(subfolder, option) {
+  const file = tableFileFor(subfolder, option);
+  const minInput = document.getElementById('min-filter');
+  tableQuery = file ? {
+    subfolder: subfolder,
+    file: file,
+    sort: tableQuery && tableQuery.file === file ? tableQuery.sort : null,
+    order: tableQuery && tableQuery.file === file ? tableQuery.order : 'desc',
+    minimum: minInput && minInput.value !== '' ? parseFloat(minInput.value) : null,
+    columns: null,
+    offset: 0,
+    total: 0,
+    loading: false
+  } : null;
+  document.getElementById('headerRow').innerHTML = '';
+  document.getElementById('spreadData').innerHTML = '';
+  if (tableQuery) loadTablePage();
+}
+
+// Helper: fetch the next page of the current table and append its rows
+async function loadTablePage() {
+  const query = tableQuery;
+  if (!query || query.loading || (query.columns && query.offset >= query.total)) return;
+  query.loading = true;
+  const params = { offset: query.offset, limit: TABLE_PAGE_ROWS, order: query.order };
+  if (query.sort) params.sort = query.sort;
+  const url = new URL(tableApiUrl(query.subfolder, query.file, params), window.location.origin);
+  if (query.minimum !== null && !isNaN(query.minimum) && query.columns) {
+    url.searchParams.append('min', `${query.columns[query.columns.length - 1]}:${query.minimum}`);
+  }
+  try {
+    const response = await fetch(url);
+    const page = await response.json();
+    if (!response.ok) throw new Error(page.error || response.statusText);
+    if (query !== tableQuery) return; // a newer table replaced this one
+    if (!query.columns) {
+      query.columns = page.columns;
+      renderTableHeader(page.columns, page.sort, page.order);
+      // The filter applies to the value column, known once the header arrives
+      if (query.minimum !== null && !isNaN(query.minimum)) {
+        query.loading = false;
+        return await loadTablePage();
+      }
+    }
+    query.sort = page.sort;
+    query.total = page.total;
+    query.offset += page.rows.length;
+    appendTableRows(page.rows);
+  } catch (error) {
+    console.error('Failed to load table page:', error);
+  } finally {
+    query.loading = false;
+  }
+}
+
+// Helper: header row of the spreadsheet card; clicking a column sorts by it
+function renderTableHeader(columns, sort, order) {
+  const headerRow = document.getElementById('headerRow');
+  headerRow.innerHTML = '';
+  columns.forEach((column, i) => {
+    const th = document.createElement('th');
+    th.textContent = column + (column === sort ? (order === 'desc' ? ' \u25BC' : ' \u25B2') : '');
+    th.style.cursor = 'pointer';
+    th.style.background = '#eaeaea';
+    if (i === 0) {
+      th.style.position = 'sticky';
+      th.style.left = '0';
+      th.style.zIndex = '3';
+      th.style.color = '#222';
+    }
+    th.onclick = (event) => {
+      event.stopPropagation();
+      const query = tableQuery;
+      if (!query) return;
+      query.order = query.sort === column && query.order === 'desc' ? 'asc' : 'desc';
+      query.sort = column;
+      startTableQuery(query.subfolder, currentOption);
+    };
+    headerRow.appendChild(th);
+  });
+}
+
+// Helper: append rows to the spreadsheet card
+function appendTableRows(rows) {
+  const body = document.getElementById('spreadData');
+  rows.forEach(rowArr => {
+    const tr = document.createElement('tr');
+    for (let i = 0; i < rowArr.length; i++) {
+      const td = document.createElement('td');
+      td.textContent = i > 0 ? roundStringNumber(rowArr[i], 'toFixed', 3) : rowArr[i];
+      if (i === 0) {
+        td.style.position = 'sticky';
+        td.style.left = '0';
+        td.style.zIndex = '2';
+        td.style.background = '#eaeaea';
+        td.style.color = '#222';
+      }
+      tr.appendChild(td);
+    }
+    body.appendChild(tr);
+  });
+}
+
 // Helper: render motif list
 function renderMotifList(motifData) {
   const motif_list = motifData.motifs || [];
@@ -208,6 +416,8 @@ function renderMotifList(motifData) {
 // Helper: render main chart
 function renderMainChart(data, option) {
   if (bioChart) bioChart.destroy();
+  bioChart = null;
+  bioChartRequest++; // Drop curves still loading for the previous chart
   if (option === "motif" && data.motif && data.motif.motifs && data.motif.motifs.length > 0) {
     // Motif count distribution, sorted greatest to least, limit to top 100
     const sortedMotifs = [...data.motif.motifs].sort((a, b) => (parseInt(b[1]) || 0) - (parseInt(a[1]) || 0));
@@ -301,41 +511,16 @@ function renderMainChart(data, option) {
       }
     });
   } else {
-    // Default: enrichment or percentage
-    const arr = data[option];
-    if (!arr || arr.length < 2) return;
-    const labels = arr.slice(1).map(row => row[0]);
-    const values = arr.slice(1).map(row => parseFloat(row[row.length - 1]));
-    let chartLabel = option === "enrichment" ? "Enrichment Value" : "% Percentage";
-    let chartTitle = option === "enrichment" ? "Enrichment Distribution" : "Percentage Distribution";
-    bioChart = new Chart("bio-chart", {
-      type: "bar",
-      data: {
-        labels,
-        datasets: [{
-          label: chartLabel,
-          backgroundColor: "#4e79a7",
-          borderColor: "#333",
-          borderWidth: 1,
-          data: values
-        }]
-      },
-      options: {
-        responsive: true,
-        maintainAspectRatio: false,
-        plugins: {
-          legend: { display: false },
-          tooltip: { enabled: true },
-          title: {
-            display: false // No header for frequency distribution small chart
-          }
-        },
-        scales: {
-          x: { title: { display: false }, ticks: { display: false } },
-          y: { beginAtZero: true, title: { display: true, text: chartLabel } }
-        }
-      }
-    });
+    // Default: enrichment or percentage, as a downsampled rank-abundance curve
+    const subfolder = currentSubfolder();
+    const file = subfolder && tableFileFor(subfolder, option);
+    if (!file) return;
+    const request = ++bioChartRequest;
+    fetchCurve(subfolder, file, { points: 300 }).then(curve => {
+      if (request !== bioChartRequest) return; // A newer chart was requested meanwhile
+      if (bioChart) bioChart.destroy();
+      bioChart = new Chart("bio-chart", curveChartConfig(curve, option));
+    }).catch(error => console.error('Failed to load distribution:', error));
   }
 }
 
@@ -516,11 +701,11 @@ function updateAll(data) {
       document.getElementById("top_peptide").textContent = "0";
     }
   } else {
-    updateStats(subData, currentOption);
+    updateStats(data.max_values && data.max_values[selectedSubfolder], currentOption);
     renderTable(data, currentOption);
     renderMainChart(subData, currentOption);
     if (currentOption === "motif" && data.motif) renderMotifList(data.motif);
-    updateBubbleChart(subData);
+    updateBubbleChart(selectedSubfolder);
   }
 }
 
@@ -739,45 +924,23 @@ function createCharts(data) {
     }
 }
 
-function updateBubbleChart(data) {
-    // Only run for percentage or enrichment tab
-    if (!data || !data.percentage || !data.enrichment) return;
-    const percentage = data.percentage;
-    const enrichment = data.enrichment;
+// Bubble chart of a subfolder from its columnar bubble data: WebGL when
+// available, Chart.js otherwise. Returns an object with destroy().
+function renderBubbles(canvas, bubble) {
+    if (!canvas || !bubble) return null;
+    const labels = { xLabel: '% Percentage', yLabel: 'Enrichment Value' };
+    const glChart = BubbleGL.create(canvas, bubble, labels);
+    if (glChart) return glChart;
 
-    // Build lookup for enrichment values by peptide
-    const enrichmentMap = {};
-    for (let i = 1; i < enrichment.length; i++) {
-        const peptide = enrichment[i][0];
-        const value = parseFloat(enrichment[i][enrichment[i].length - 1]);
-        if (peptide && !isNaN(value)) {
-            enrichmentMap[peptide] = value;
-        }
-    }
-
-    // Build bubble data: X = percentage, Y = enrichment, r = percentage (scaled)
-    const bubbleDataArr = [];
-    for (let i = 1; i < percentage.length; i++) {
-        const peptide = percentage[i][0];
-        const percValue = parseFloat(percentage[i][percentage[i].length - 1]);
-        const enrichValue = enrichmentMap[peptide];
-        if (peptide && !isNaN(percValue) && typeof enrichValue === 'number' && !isNaN(enrichValue)) {
-            bubbleDataArr.push({
-                x: percValue,
-                y: enrichValue,
-                r: Math.max(5, percValue * 2), // scale for visibility
-                peptide: peptide,
-                percentage: percValue,
-                enrichment: enrichValue
-            });
-        }
-    }
-
-    if (bubbleChart) {
-        bubbleChart.destroy();
-    }
-
-    bubbleChart = new Chart("bubble-chart", {
+    const bubbleDataArr = bubble.peptides.map((peptide, i) => ({
+        x: bubble.average[i],
+        y: bubble.enrichment[i],
+        r: Math.max(5, bubble.average[i] * 2), // scale for visibility
+        peptide: peptide,
+        percentage: bubble.average[i],
+        enrichment: bubble.enrichment[i]
+    }));
+    return new Chart(canvas, {
         type: 'bubble',
         data: {
             datasets: [{
@@ -809,28 +972,27 @@ function updateBubbleChart(data) {
             scales: {
                 x: {
                     beginAtZero: true,
-                    title: { display: true, text: '% Percentage' }
+                    title: { display: true, text: labels.xLabel }
                 },
                 y: {
                     beginAtZero: true,
-                    title: { display: true, text: 'Enrichment Value' }
+                    title: { display: true, text: labels.yLabel }
                 }
             }
         }
     });
 }
 
-function loadMaxes(data) {
-    // Update statistics
-    if (data.percentage && data.percentage.length > 1) {
-        const values = data.percentage.slice(1).map(row => parseFloat(row[row.length - 1]) || 0);
-        const maxValue = Math.max(...values);
-        const maxIndex = values.indexOf(maxValue);
-        const maxPeptide = data.percentage[maxIndex + 1][0];
-        
-        document.getElementById('max').textContent = maxValue.toFixed(2);
-        document.getElementById('top_peptide').textContent = maxPeptide;
-    }
+let bubbleChartRequest = 0;
+function updateBubbleChart(subfolder) {
+    const request = ++bubbleChartRequest;
+    loadBubble(subfolder).then(bubble => {
+        if (request !== bubbleChartRequest || !bubble) return; // A newer chart was requested meanwhile
+        if (bubbleChart) {
+            bubbleChart.destroy();
+        }
+        bubbleChart = renderBubbles(document.getElementById("bubble-chart"), bubble);
+    });
 }
 
 function filterMotifs(searchTerm) {
@@ -860,12 +1022,15 @@ function filterMotifs(searchTerm) {
 
 // Modal chart instances
 let freqChartModalInstance = null;
+let freqChartModalRequest = 0;
 let bubbleChartModalInstance = null;
 
 function renderFreqModalChart(data, option) {
   const ctx = document.getElementById('freq-chart-modal');
   if (!ctx) return;
   if (freqChartModalInstance) freqChartModalInstance.destroy();
+  freqChartModalInstance = null;
+  freqChartModalRequest++; // Drop curves still loading for the previous chart
   // Motif
   if (option === "motif" && data.motif && data.motif.motifs && data.motif.motifs.length > 0) {
     const sortedMotifs = [...data.motif.motifs].sort((a, b) => (parseInt(b[1]) || 0) - (parseInt(a[1]) || 0));
@@ -963,112 +1128,58 @@ function renderFreqModalChart(data, option) {
     return;
   }
   // Enrichment/Percentage
-  const arr = data[option];
-  if (!arr || arr.length < 2) return;
-  const labels = arr.slice(1).map(row => row[0]);
-  const values = arr.slice(1).map(row => parseFloat(row[row.length - 1]));
-  let chartLabel = option === "enrichment" ? "Enrichment Value" : "% Percentage";
-  freqChartModalInstance = new Chart(ctx, {
-    type: "bar",
-    data: {
-      labels,
-      datasets: [{
-        label: chartLabel,
-        backgroundColor: "#4e79a7",
-        borderColor: "#333",
-        borderWidth: 1,
-        data: values
-      }]
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false,
-      plugins: {
-        legend: { display: false },
-        tooltip: { enabled: true },
-        title: {
-          display: false // No header for frequency distribution modal
-        }
-      },
-      scales: {
-        x: { title: { display: false }, ticks: { display: false } },
-        y: { beginAtZero: true, title: { display: true, text: chartLabel } }
-      }
-    }
+  renderCurveModalChart(ctx, option, null);
+}
+
+// Zoomable rank-abundance curve in the frequency modal: drag across the
+// chart to load that range of ranks in full detail, double-click to reset
+function renderCurveModalChart(ctx, option, range) {
+  const subfolder = currentSubfolder();
+  const file = subfolder && tableFileFor(subfolder, option);
+  if (!file) return;
+  const params = { points: 2000 };
+  if (range) {
+    params.start = range[0];
+    params.end = range[1];
+  }
+  const request = ++freqChartModalRequest;
+  fetchCurve(subfolder, file, params).then(curve => {
+    if (request !== freqChartModalRequest) return;
+    if (freqChartModalInstance) freqChartModalInstance.destroy();
+    freqChartModalInstance = new Chart(ctx, curveChartConfig(curve, option, "Drag to zoom, double-click to reset"));
+  }).catch(error => console.error('Failed to load distribution:', error));
+
+  if (ctx.dataset.zoomBound) return;
+  ctx.dataset.zoomBound = "true";
+  ctx.style.cursor = "crosshair";
+  let dragStart = null;
+  ctx.addEventListener('mousedown', event => { dragStart = event.offsetX; });
+  ctx.addEventListener('mouseup', event => {
+    const chart = freqChartModalInstance;
+    if (dragStart === null || !chart || chart.config.type !== "line") return;
+    const from = Math.min(dragStart, event.offsetX), to = Math.max(dragStart, event.offsetX);
+    dragStart = null;
+    if (to - from < 5) return;
+    const start = Math.max(Math.floor(chart.scales.x.getValueForPixel(from)), 0);
+    const end = Math.ceil(chart.scales.x.getValueForPixel(to)) + 1;
+    if (end - start > 1) renderCurveModalChart(ctx, currentOption, [start, end]);
+  });
+  ctx.addEventListener('dblclick', () => {
+    if (freqChartModalInstance && freqChartModalInstance.config.type === "line") renderCurveModalChart(ctx, currentOption, null);
   });
 }
 
-function renderBubbleModalChart(data) {
+let bubbleChartModalRequest = 0;
+function renderBubbleModalChart(subfolder) {
   const ctx = document.getElementById('bubble-chart-modal');
   if (!ctx) return;
   if (bubbleChartModalInstance) bubbleChartModalInstance.destroy();
-  if (!data || !data.percentage || !data.enrichment) return;
-  const percentage = data.percentage;
-  const enrichment = data.enrichment;
-  const enrichmentMap = {};
-  for (let i = 1; i < enrichment.length; i++) {
-    const peptide = enrichment[i][0];
-    const value = parseFloat(enrichment[i][enrichment[i].length - 1]);
-    if (peptide && !isNaN(value)) {
-      enrichmentMap[peptide] = value;
-    }
-  }
-  const bubbleDataArr = [];
-  for (let i = 1; i < percentage.length; i++) {
-    const peptide = percentage[i][0];
-    const percValue = parseFloat(percentage[i][percentage[i].length - 1]);
-    const enrichValue = enrichmentMap[peptide];
-    if (peptide && !isNaN(percValue) && typeof enrichValue === 'number' && !isNaN(enrichValue)) {
-      bubbleDataArr.push({
-        x: percValue,
-        y: enrichValue,
-        r: Math.max(5, percValue * 2),
-        peptide: peptide,
-        percentage: percValue,
-        enrichment: enrichValue
-      });
-    }
-  }
-  bubbleChartModalInstance = new Chart(ctx, {
-    type: 'bubble',
-    data: {
-      datasets: [{
-        label: 'Peptides',
-        data: bubbleDataArr,
-        backgroundColor: 'rgba(54, 162, 235, 0.5)',
-        borderColor: 'rgba(54, 162, 235, 1)',
-        borderWidth: 1
-      }]
-    },
-    options: {
-      responsive: true,
-      maintainAspectRatio: false,
-      plugins: {
-        legend: { display: false },
-        tooltip: {
-          callbacks: {
-            label: function(context) {
-              const d = context.raw;
-              return [
-                `Peptide: ${d.peptide}`,
-                `Percentage: ${d.percentage.toFixed(3)}`,
-                `Enrichment: ${d.enrichment.toFixed(3)}`
-              ];
-            }
-          }
-        }
-      },
-      scales: {
-        x: {
-          beginAtZero: true,
-          title: { display: true, text: '% Percentage' }
-        },
-        y: {
-          beginAtZero: true,
-          title: { display: true, text: 'Enrichment Value' }
-        }
-      }
-    }
+  bubbleChartModalInstance = null;
+  const request = ++bubbleChartModalRequest;
+  loadBubble(subfolder).then(bubble => {
+    // Skip if another chart was requested or the modal was closed meanwhile
+    if (request !== bubbleChartModalRequest || !document.getElementById('bubbleModal').classList.contains('show')) return;
+    bubbleChartModalInstance = renderBubbles(ctx, bubble);
   });
 }
 
@@ -1100,6 +1211,9 @@ function openFreqModal() {
       const selectedSubfolder = (filePicker && filePicker.value) || subfolders[0];
       dataForModal = lastParsedData.spreadsheets[selectedSubfolder];
     }
+    // The exported distribution is the percentage curve
+    setPlotLinks('freq-plot-links', currentOption === 'percentage' ? currentSubfolder() : null,
+                 [{ label: 'Download SVG', kind: 'distribution.svg' }]);
     renderFreqModalChart(dataForModal, currentOption);
   }, 100);
 }
@@ -1109,14 +1223,12 @@ function openBubbleModal() {
   modal.style.display = 'block';
   modal.classList.add('show');
   setTimeout(() => {
-    let dataForModal = lastParsedData;
-    if (lastParsedData && lastParsedData.spreadsheets) {
-      const filePicker = document.getElementById('file-picker');
-      const subfolders = Object.keys(lastParsedData.spreadsheets);
-      const selectedSubfolder = (filePicker && filePicker.value) || subfolders[0];
-      dataForModal = lastParsedData.spreadsheets[selectedSubfolder];
-    }
-    renderBubbleModalChart(dataForModal);
+    const subfolder = currentSubfolder();
+    const sub = subfolder && lastParsedData.spreadsheets[subfolder];
+    // Exports are drawn from the result store, which older datasets lack
+    setPlotLinks('bubble-plot-links', sub && sub.bubble_plot ? subfolder : null,
+                 [{ label: 'Download HTML', kind: 'bubble.html' }, { label: 'Download SVG', kind: 'bubble.svg' }]);
+    renderBubbleModalChart(subfolder);
   }, 100);
 }
 
@@ -1175,9 +1287,19 @@ function openSpreadModal() {
     tableContainer.style.minHeight = 'fit-content';
     modalContent.appendChild(tableContainer);
     // Render table
-    function renderTableFor(folder, option) {
+    async function renderTableFor(folder, option) {
       tableContainer.innerHTML = '';
-      const data = lastParsedData.spreadsheets[folder][option];
+      const file = tableFileFor(folder, option);
+      let data = null;
+      if (file) {
+        try {
+          const response = await fetch(tableApiUrl(folder, file, { top: 100, limit: 100 }));
+          const page = await response.json();
+          if (response.ok) data = [page.columns].concat(page.rows);
+        } catch (error) {
+          console.error('Failed to load table:', error);
+        }
+      }
       if (!data) {
         tableContainer.innerHTML = '<div style="padding:20px;text-align:center;color:#888;">No spreadsheet data available.</div>';
         return;
@@ -1346,6 +1468,35 @@ function setupModalCloseHandlers() {
   });
 }
 
+// Download the table shown in the spreadsheet card; the server exports it on demand
+async function downloadCurrentTable() {
+  if (!lastParsedData || !lastParsedData.subfolders) return;
+  const filePicker = document.getElementById('file-picker');
+  const subfolders = Object.keys(lastParsedData.subfolders);
+  const subfolder = (filePicker && filePicker.value) || subfolders[0];
+  const file = tableFileFor(subfolder, currentOption);
+  if (!file) return;
+  const format = document.getElementById('export-format').value;
+  let url = `/api/dataset/${window.dataset_id}/export/${encodeURIComponent(subfolder)}/${encodeURIComponent(file)}?format=${format}`;
+  if (window.source) url += `&source=${window.source}`;
+  try {
+    const response = await fetch(url);
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.error || response.statusText);
+    }
+    const blob = await response.blob();
+    const link = document.createElement('a');
+    link.href = URL.createObjectURL(blob);
+    link.download = file.replace(/\.xlsx$/, '.' + format);
+    link.click();
+    URL.revokeObjectURL(link.href);
+  } catch (error) {
+    console.error('Failed to download table:', error);
+    alert('Failed to download table: ' + error.message);
+  }
+}
+
 // Ensure modals are shown when clicking on cards
 function setupModalCardClicks() {
   const bubbleCard = document.getElementById('bubbleCard');
@@ -1357,9 +1508,9 @@ function setupModalCardClicks() {
   if (freqCard) freqCard.onclick = openFreqModal;
   if (spreadCard) {
     spreadCard.onclick = function(event) {
-      // Prevent modal if clicking the select or its children
-      const filePicker = document.getElementById('file-picker');
-      if (event.target === filePicker || filePicker.contains(event.target)) {
+      // Prevent modal if clicking the select, the export controls or their children
+      const controls = ['file-picker', 'min-filter', 'export-format', 'export-btn', 'headerRow'].map(id => document.getElementById(id)).filter(Boolean);
+      if (controls.some(el => event.target === el || el.contains(event.target))) {
         event.stopPropagation();
         return;
       }
@@ -1391,4 +1542,19 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     setupModalCardClicks();
     setupModalCloseHandlers(); // Ensure modal X buttons work
+    const exportBtn = document.getElementById('export-btn');
+    if (exportBtn) exportBtn.onclick = downloadCurrentTable;
+    // Fetch further pages as the spreadsheet card is scrolled
+    const spreadCard = document.getElementById('spreadCard');
+    if (spreadCard) {
+      spreadCard.addEventListener('scroll', () => {
+        if (spreadCard.scrollTop + spreadCard.clientHeight >= spreadCard.scrollHeight - 200) loadTablePage();
+      });
+    }
+    const minFilter = document.getElementById('min-filter');
+    if (minFilter) {
+      minFilter.onchange = () => {
+        if (tableQuery) startTableQuery(tableQuery.subfolder, currentOption);
+      };
+    }
 }); 
\ No newline at end of file
@@ -0,0 +1,202 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+# Eviction tiers, evicted in this order
+INTERMEDIATE = 0  # Regenerable files of a session: denoised FASTQs, table exports, plots, legacy pickles
+INPUTS = 1        # Uploaded FASTQs of a dataset whose results exist
+RESULTS = 2       # A dataset's results (or the upload of an unprocessed dataset)
+TIER_NAMES = {INTERMEDIATE: 'intermediate', INPUTS: 'inputs', RESULTS: 'results'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    dataset_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    tier INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (dataset_id, path)
+);
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_tier ON entries (tier);
+"""
+
+def tree_size(path):
+    """Bytes allocated to the files under path (or to path itself if it is a file)"""
+    if os.path.isfile(path):
+        return os.stat(path).st_blocks * 512
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total
+
+class StorageManager:
+    """Disk budget for uploaded datasets and session results, with LRU eviction.
+
+    The size of each dataset is recorded per tier in SQLite whenever its
+    files change, so usage is known without walking the trees. When usage
+    is over budget the least recently used entries are evicted tier by
+    tier: intermediates first, then the inputs of processed datasets and
+    whole datasets last. Busy datasets (queued or processing) are skipped.
+    """
+    # Seconds between two recorded accesses of the same dataset
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path, datasets_root, cache_root, budget, is_busy=None, remove_dataset=None):
+        self.path = path
+        self.datasets_root = datasets_root
+        self.cache_root = cache_root
+        self.budget = budget
+        self.is_busy = is_busy or (lambda dataset_id: False)
+        # Deletes a whole dataset, including its metadata; plain rmtree by default
+        self.remove_dataset = remove_dataset or self.remove_files
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        """This thread's connection, opened on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def classify(self, dataset_id):
+        """(path, tier) pairs of a dataset's files as they are on disk now"""
+        entries = []
+        session = os.path.join(self.cache_root, dataset_id)
+        has_results = os.path.isdir(session)
+        if has_results:
+            # Exports and pickles can be rebuilt from the result store
+            has_store = os.path.isdir(os.path.join(session, 'store'))
+            for name in sorted(os.listdir(session)):
+                if name.startswith('denoised_') or (has_store and name in ('exports', 'plots', 'spreadsheets', 'pkl_files')):
+                    entries.append((os.path.join(session, name), INTERMEDIATE))
+            entries.append((session, RESULTS))
+        upload = os.path.join(self.datasets_root, dataset_id)
+        if os.path.isdir(upload):
+            entries.append((upload, INPUTS if has_results else RESULTS))
+        return entries
+
+    def measure(self, dataset_id):
+        """Record the current size of a dataset's files; returns its total bytes"""
+        sizes = []
+        intermediate = 0
+        for path, tier in self.classify(dataset_id):
+            size = tree_size(path)
+            if tier == INTERMEDIATE:
+                intermediate += size
+            elif path == os.path.join(self.cache_root, dataset_id):
+                # The session's own entry excludes its intermediates
+                size = max(size - intermediate, 0)
+            sizes.append((dataset_id, path, tier, size))
+        with self.connection() as conn:
+            conn.execute('DELETE FROM entries WHERE dataset_id = ?', (dataset_id,))
+            conn.executemany('INSERT INTO entries (dataset_id, path, tier, bytes) VALUES (?, ?, ?, ?)', sizes)
+            if sizes:
+                conn.execute('INSERT OR IGNORE INTO datasets (id, last_access) VALUES (?, ?)', (dataset_id, time.time()))
+            else:
+                conn.execute('DELETE FROM datasets WHERE id = ?', (dataset_id,))
+        return sum(size for _, _, _, size in sizes)
+
+    def touch(self, dataset_id):
+        """Mark a dataset as used now"""
+        now = time.time()
+        with self.connection() as conn:
+            conn.execute('UPDATE datasets SET last_access = ? WHERE id = ? AND last_access < ?',
+                         (now, dataset_id, now - self.TOUCH_INTERVAL))
+
+    def forget(self, dataset_id):
+        """Drop the records of a deleted dataset"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM entries WHERE dataset_id = ?', (dataset_id,))
+            conn.execute('DELETE FROM datasets WHERE id = ?', (dataset_id,))
+
+    def reconcile(self):
+        """Re-measure every dataset on disk and drop records of datasets that are gone"""
+        on_disk = set()
+        for root in (self.datasets_root, self.cache_root):
+            if os.path.isdir(root):
+                on_disk.update(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+        known = {row[0] for row in self.connection().execute('SELECT id FROM datasets')}
+        for dataset_id in known - on_disk:
+            self.forget(dataset_id)
+        for dataset_id in on_disk:
+            self.measure(dataset_id)
+
+    def used(self):
+        return self.connection().execute('SELECT COALESCE(SUM(bytes), 0) FROM entries').fetchone()[0]
+
+    def usage(self, dataset_ids=None):
+        """Budget, bytes used per tier and, for the given datasets, their own usage"""
+        conn = self.connection()
+        tiers = {name: 0 for name in TIER_NAMES.values()}
+        for tier, size in conn.execute('SELECT tier, SUM(bytes) FROM entries GROUP BY tier'):
+            tiers[TIER_NAMES[tier]] = size
+        usage = {'budget': self.budget, 'used': sum(tiers.values()), 'tiers': tiers,
+                 'datasets': conn.execute('SELECT COUNT(*) FROM datasets').fetchone()[0]}
+        if dataset_ids is not None:
+            usage['own'] = {}
+            for dataset_id in dataset_ids:
+                row = conn.execute('SELECT SUM(e.bytes), d.last_access FROM entries e JOIN datasets d ON d.id = e.dataset_id '
+                                   'WHERE e.dataset_id = ?', (dataset_id,)).fetchone()
+                if row[0] is not None:
+                    usage['own'][dataset_id] = {'bytes': row[0], 'last_access': row[1]}
+        return usage
+
+    def candidates(self):
+        """Entries in eviction order: by tier, then least recently used first"""
+        return self.connection().execute(
+            'SELECT e.dataset_id, e.path, e.tier, e.bytes FROM entries e JOIN datasets d ON d.id = e.dataset_id '
+            'WHERE e.bytes > 0 ORDER BY e.tier, d.last_access').fetchall()
+
+    def enforce(self):
+        """Evict until usage is within the budget; returns the (dataset_id, path, tier) evicted"""
+        evicted = []
+        if not self.budget:
+            return evicted
+        # One eviction pass at a time per process; rmtree tolerates other processes racing
+        with self.lock:
+            used = self.used()
+            removed = set()
+            for dataset_id, path, tier, size in self.candidates():
+                if used <= self.budget:
+                    break
+                if dataset_id in removed or self.is_busy(dataset_id):
+                    continue
+                if tier == RESULTS:
+                    # Results go with the whole dataset
+                    size = self.dataset_bytes(dataset_id)
+                    self.remove_dataset(dataset_id)
+                    self.forget(dataset_id)
+                    removed.add(dataset_id)
+                    used -= size
+                else:
+                    shutil.rmtree(path, ignore_errors=True)
+                    used -= size
+                    self.measure(dataset_id)
+                print(f"Evicted {TIER_NAMES[tier]} of {dataset_id} ({size} bytes) to stay within the storage budget")
+                evicted.append((dataset_id, path, tier))
+        return evicted
+
+    def dataset_bytes(self, dataset_id):
+        return self.connection().execute('SELECT COALESCE(SUM(bytes), 0) FROM entries WHERE dataset_id = ?',
+                                         (dataset_id,)).fetchone()[0]
+
+    def remove_files(self, dataset_id):
+        """Delete a dataset's upload and session folders"""
+        for root in (self.datasets_root, self.cache_root):
+            shutil.rmtree(os.path.join(root, dataset_id), ignore_errors=True)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import shutil
+
+class UploadError(Exception):
+    """Raised for an upload request that does not match the upload's manifest"""
+
+class UploadStore:
+    """Resumable uploads made of fixed-size chunks that can arrive in parallel.
+
+    Each upload stages one preallocated .part file per file. A chunk is
+    streamed straight into its place in the part file while its SHA-256 is
+    computed, and a marker holding that digest records it as received, so a
+    client can ask which chunks are missing and resume after a dropped
+    connection. Markers live on disk, so every gunicorn worker sees them.
+    """
+    CHUNK_SIZE = 8 * 1024 * 1024
+    READ_SIZE = 1024 * 1024  # Bytes read from the request stream at a time
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def upload_dir(self, upload_id):
+        return os.path.join(self.root, upload_id)
+
+    def manifest_path(self, upload_id):
+        return os.path.join(self.upload_dir(upload_id), 'manifest.json')
+
+    def part_path(self, upload_id, index):
+        return os.path.join(self.upload_dir(upload_id), f'{index}.part')
+
+    def marker_path(self, upload_id, index, chunk):
+        return os.path.join(self.upload_dir(upload_id), 'chunks', f'{index}.{chunk}')
+
+    def create(self, upload_id, files):
+        """Stage an upload of files ({'path', 'size'} dicts); returns its manifest"""
+        total = sum(f['size'] for f in files)
+        if shutil.disk_usage(self.root).free < total:
+            raise UploadError('Not enough disk space for this upload')
+        os.makedirs(os.path.join(self.upload_dir(upload_id), 'chunks'), exist_ok=True)
+        manifest = {'chunk_size': self.CHUNK_SIZE, 'files': []}
+        for index, f in enumerate(files):
+            # Sparse until the chunks arrive
+            with open(self.part_path(upload_id, index), 'wb') as part:
+                part.truncate(f['size'])
+            manifest['files'].append({'path': f['path'], 'size': f['size'],
+                                      'chunks': max(1, -(-f['size'] // self.CHUNK_SIZE))})
+        with open(self.manifest_path(upload_id), 'w') as out:
+            json.dump(manifest, out)
+        return manifest
+
+    def manifest(self, upload_id):
+        """Manifest of an upload, or None if there is no such upload"""
+        try:
+            with open(self.manifest_path(upload_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_chunk(self, upload_id, index, chunk, stream, sha256=None):
+        """Stream one chunk from a file-like object into its part file; returns its SHA-256"""
+        manifest = self.manifest(upload_id)
+        if manifest is None:
+            raise UploadError('Unknown upload')
+        if not 0 <= index < len(manifest['files']):
+            raise UploadError('Unknown file index')
+        entry = manifest['files'][index]
+        if not 0 <= chunk < entry['chunks']:
+            raise UploadError('Chunk out of range')
+        offset = chunk * manifest['chunk_size']
+        expected = min(manifest['chunk_size'], entry['size'] - offset)
+
+        digest = hashlib.sha256()
+        written = 0
+        with open(self.part_path(upload_id, index), 'r+b') as part:
+            part.seek(offset)
+            while written < expected:
+                block = stream.read(min(self.READ_SIZE, expected - written))
+                if not block:
+                    break
+                part.write(block)
+                digest.update(block)
+                written += len(block)
+        if written != expected or stream.read(1):
+            raise UploadError(f'Chunk {chunk} of file {index} must be {expected} bytes')
+        if sha256 and sha256.lower() != digest.hexdigest():
+            raise UploadError(f'Checksum mismatch for chunk {chunk} of file {index}')
+
+        # The marker appears atomically once the chunk is fully on disk
+        marker = self.marker_path(upload_id, index, chunk)
+        with open(marker + '.tmp', 'w') as f:
+            f.write(digest.hexdigest())
+        os.replace(marker + '.tmp', marker)
+        return digest.hexdigest()
+
+    def received(self, upload_id):
+        """Received chunk numbers of each file index"""
+        received = {}
+        for name in os.listdir(os.path.join(self.upload_dir(upload_id), 'chunks')):
+            if name.endswith('.tmp'):
+                continue
+            index, chunk = name.split('.')
+            received.setdefault(int(index), []).append(int(chunk))
+        return {index: sorted(chunks) for index, chunks in received.items()}
+
+    def missing(self, upload_id):
+        """(file index, chunk) pairs that have not been received yet"""
+        manifest = self.manifest(upload_id)
+        received = self.received(upload_id)
+        return [(index, chunk) for index, entry in enumerate(manifest['files'])
+                for chunk in range(entry['chunks']) if chunk not in set(received.get(index, []))]
+
+    def assemble(self, upload_id, destination):
+        """Move every complete file to destination(path); returns {path: digest}.
+
+        A file's digest is the SHA-256 of its chunk digests in order, so it
+        is available without reading the file again.
+        """
+        manifest = self.manifest(upload_id)
+        if manifest is None:
+            raise UploadError('Unknown upload')
+        missing = self.missing(upload_id)
+        if missing:
+            raise UploadError(f'{len(missing)} chunks have not been received')
+        digests = {}
+        for index, entry in enumerate(manifest['files']):
+            digest = hashlib.sha256()
+            for chunk in range(entry['chunks']):
+                with open(self.marker_path(upload_id, index, chunk), 'r') as f:
+                    digest.update(bytes.fromhex(f.read()))
+            target = destination(entry['path'])
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            shutil.move(self.part_path(upload_id, index), target)
+            digests[entry['path']] = digest.hexdigest()
+        self.discard(upload_id)
+        return digests
+
+    def discard(self, upload_id):
+        shutil.rmtree(self.upload_dir(upload_id), ignore_errors=True)